@@ -1,66 +1,268 @@
 import bpy
-import bmesh
-from mathutils import Vector
-
-# 선택된 오브젝트를 가져옵니다
-obj = bpy.context.active_object
-
-# 카메라 위치를 가져옵니다
-camera = bpy.context.scene.camera
-camera_location = camera.location
-
-# 오브젝트를 카메라 위치로 이동
-obj.location = camera_location
-
-# 각 정점에서 카메라 방향으로 레이를 발사
-mesh = obj.data
-bm = bmesh.new()
-bm.from_mesh(mesh)
-bm.verts.ensure_lookup_table()
-
-depsgraph = bpy.context.evaluated_depsgraph_get()
-ray_direction = camera.matrix_world.to_3x3() @ Vector((0, 0, -1))
-
-# 닿지 않은 정점들을 저장할 리스트
-unhit_verts = []
-
-for v in bm.verts:
-    ray_origin = obj.matrix_world @ v.co  # 오브젝트의 월드 좌표로 변환
-    hit, location, normal, index, hit_obj, matrix = bpy.context.scene.ray_cast(
-        depsgraph, ray_origin, ray_direction)
-
-    # 자신의 오브젝트에 닿으면 추가 레이캐스팅 수행
-    while hit and hit_obj == obj:
-        ray_origin = location + ray_direction * 0.0001  # 약간 이동하여 다시 레이캐스팅
-        hit, location, normal, index, hit_obj, matrix = bpy.context.scene.ray_cast(
-            depsgraph, ray_origin, ray_direction)
-
-    if hit and hit_obj.type == 'MESH':
-        # 레이가 메쉬 오브젝트에 닿으면 정점 위치 업데이트
-        v.co = obj.matrix_world.inverted() @ location  # 월드 좌표를 로컬 좌표로 변환
-    else:
-        # 닿지 않은 정점 또는 메쉬 오브젝트가 아닌 경우에 대한 처리
-        unhit_verts.append(v)
-        
+import os
+import sys
+
+import numpy as np
+
+
+# 같은 폴더에 있는 모듈을 불러올 수 있도록 스크립트 위치를 경로에 추가합니다.
+# (블렌더 텍스트 에디터에서 실행하면 __file__ 대신 텍스트의 파일 경로를 사용합니다)
+def _script_directory():
+    text = bpy.data.texts.get(os.path.basename(__file__))
+    if text is not None and text.filepath:
+        return os.path.dirname(bpy.path.abspath(text.filepath))
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+if _script_directory() not in sys.path:
+    sys.path.append(_script_directory())
+
+import meshProjection
+from landmarkSequence import OBJ_TO_BLENDER_AXES, LandmarkSequence, SequenceWriter, open_sequence
+from meshQuality import build_csr, csr_rows
+from stageProfiler import stage
+
+# 얼굴 메쉬를 붙일 타겟 오브젝트 이름 (렌더링에 사용한 오브젝트)
+TARGET_OBJECT_NAME = "Object_13"
+
+
+# 카메라가 바라보는 방향 (orthographic 카메라이므로 모든 광선이 이 방향과 평행합니다)
+def camera_direction(camera):
+    matrix = np.array(camera.matrix_world, dtype=np.float64)
+    direction = matrix[:3, :3] @ np.array([0.0, 0.0, -1.0])
+    return direction / np.linalg.norm(direction)
+
+
+# 정점마다 이웃 정점 목록 (CSR)
+def vertex_neighbors(edges, vertex_count):
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    return build_csr(edges.ravel(), edges[:, ::-1].ravel(), vertex_count)
+
+
 # 닿지 않은 정점들을 같은 면을 공유하는 정점들의 중간 위치로 이동
-for v in unhit_verts:
-    linked_verts = [edge.other_vert(v) for edge in v.link_edges]
-    if linked_verts:
-        avg_pos = sum((vert.co for vert in linked_verts), Vector()) / len(linked_verts)
-        v.co = avg_pos
-        
-# 변경 사항을 메쉬에 적용
-bm.to_mesh(mesh)
-bm.free()
-
-# Shrinkwrap 모디파이어를 추가합니다
-shrinkwrap_modifier = obj.modifiers.new(name="Shrinkwrap", type='SHRINKWRAP')
-
-# 타겟 오브젝트 설정 (이 예제에서는 타겟 오브젝트를 수동으로 설정해야 합니다)
-# 예를 들어, 타겟 오브젝트의 이름이 "TargetObject"라고 가정합니다
-target_object_name = "Object_13"
-shrinkwrap_modifier.target = bpy.data.objects[target_object_name]
-
-# Shrinkwrap 모디파이어 적용
-# 주의: 실제 모델링 작업에서는 모디파이어를 적용하기 전에 필요한 경우 백업을 해야 합니다
-bpy.ops.object.modifier_apply(modifier=shrinkwrap_modifier.name)
\ No newline at end of file
+# (앞에서 옮긴 정점의 새 위치를 다음 정점이 사용하도록 순서대로 처리합니다)
+def average_unhit_vertices(positions, edges, unhit):
+    neighbors = vertex_neighbors(edges, len(positions))
+    for vertex in np.flatnonzero(unhit).tolist():
+        linked = csr_rows(neighbors, np.array([vertex]))
+        if len(linked):
+            positions[vertex] = positions[linked].mean(axis=0)
+    return positions
+
+
+# 타겟에 닿지 않은 정점을 채우는 방식
+#   'harmonic': 닿은 정점을 경계로 하는 라플라스 방정식을 풀어 빈 영역 전체를 한 번에 채움
+#   'average' : 각 정점을 이웃 정점 평균 위치로 한 번씩 옮김 (이전 방식)
+FILL_MODES = ('harmonic', 'average')
+
+
+def fill_unhit_vertices(positions, edges, unhit, fill='harmonic'):
+    if fill == 'average':
+        return average_unhit_vertices(positions, edges, unhit)
+    if fill != 'harmonic':
+        raise ValueError(f"Unknown fill mode: {fill}")
+    if not unhit.any():
+        return positions
+    return meshProjection.get_harmonic_fill(edges, len(positions), ~unhit).solve(positions)
+
+
+# 투영 방식
+#   'rays' : 타겟 삼각형을 격자에 담아 두고 모든 정점을 한 번에 레이캐스트
+#   'depth': 타겟을 카메라 기준 깊이 맵으로 한 번 래스터화해 두고 정점은 버퍼 조회로 처리
+#            (같은 타겟과 카메라로 여러 프레임/메쉬를 붙일 때 버퍼를 다시 사용합니다)
+PROJECTION_MODES = ('rays', 'depth')
+
+
+# 렌더 설정의 실제 출력 해상도
+def render_resolution(scene):
+    scale = scene.render.resolution_percentage / 100
+    return int(scene.render.resolution_x * scale), int(scene.render.resolution_y * scale)
+
+
+# 타겟 오브젝트의 표면을 (월드 좌표, 삼각형, 내용 해시)로 한 번 읽습니다.
+# 투영 구조와 스냅 인덱스의 캐시 조회는 이 해시를 같이 사용하므로 타겟을 다시 읽거나 해시하지 않습니다.
+def read_target_surface(target, depsgraph):
+    target_positions, target_triangles = meshProjection.read_object_triangles(target, depsgraph)
+    return target_positions, target_triangles, meshProjection.target_key(target_positions, target_triangles)
+
+
+# 타겟 표면의 투영 구조를 가져옵니다. (타겟 모양, 카메라가 같으면 캐시된 것을 사용)
+def get_projector(target_surface, camera, mode='rays', scene=None):
+    if mode not in PROJECTION_MODES:
+        raise ValueError(f"Unknown projection mode: {mode}")
+
+    target_positions, target_triangles, key = target_surface
+    if mode == 'rays':
+        return meshProjection.get_ray_caster(target_positions, target_triangles, camera_direction(camera), key)
+
+    if camera.data.type != 'ORTHO':
+        raise ValueError("Depth map projection requires an orthographic camera")
+    width, height = render_resolution(scene or bpy.context.scene)
+    return meshProjection.get_depth_map(target_positions, target_triangles, np.array(camera.matrix_world),
+                                        camera.data.ortho_scale, width, height, key)
+
+
+# 모든 정점을 한 번에 카메라 방향으로 타겟 표면에 투영합니다.
+# 결과는 (월드 좌표, hit 여부)이며, 닿지 않은 정점은 원래 위치를 유지합니다.
+def project_vertices(world_positions, projector):
+    hit, locations, _, _, _ = projector.cast(world_positions)
+    projected = world_positions.copy()
+    projected[hit] = locations[hit]
+    return projected, hit
+
+
+# 타겟 표면의 가장 가까운 점을 찾는 인덱스 (Shrinkwrap의 Nearest Surface Point 대신 사용)
+def get_snap_index(target_surface):
+    target_positions, target_triangles, key = target_surface
+    return meshProjection.get_closest_point_index(target_positions, target_triangles, key)
+
+
+# 월드 좌표 정점들을 타겟 표면의 가장 가까운 점으로 옮깁니다.
+# max_distance보다 먼 정점은 그대로 두고, offset만큼 면 노멀 방향으로 띄웁니다.
+def snap_vertices(world_positions, target, depsgraph, max_distance=None, offset=0.0):
+    max_distance = np.inf if max_distance is None else max_distance
+    return get_snap_index(read_target_surface(target, depsgraph)).snap(world_positions, max_distance, offset)
+
+
+# 투영 -> 빈 정점 채우기 -> 표면 스냅을 월드 좌표 배열에 적용합니다.
+# world_positions는 (N, 3) 한 프레임 또는 (F, N, 3) 여러 프레임이며, 투영과 스냅은 모든 프레임을 한 번에 처리합니다.
+# 결과는 (부착된 위치, hit 여부)이며 모양은 입력과 같습니다.
+def attach_positions(world_positions, projector, edges, fill='harmonic', snap_index=None,
+                     snap_distance=None, snap_offset=0.0):
+    world_positions = np.asarray(world_positions, dtype=np.float64)
+    frames = world_positions.reshape(-1, world_positions.shape[-2], 3)
+
+    with stage('project', frames=len(frames)):
+        projected, hit = project_vertices(frames.reshape(-1, 3), projector)
+    projected = projected.reshape(frames.shape)
+    hit = hit.reshape(frames.shape[:2])
+
+    # 빈 정점 집합은 프레임마다 다르므로 채우기는 프레임별로 처리합니다. (같은 집합이면 분해 결과를 다시 사용)
+    with stage('fill', frames=len(frames)):
+        for frame in range(len(frames)):
+            projected[frame] = fill_unhit_vertices(projected[frame], edges, ~hit[frame], fill)
+
+    if snap_index is not None:
+        max_distance = np.inf if snap_distance is None else snap_distance
+        with stage('snap', frames=len(frames)):
+            snapped, _ = snap_index.snap(projected.reshape(-1, 3), max_distance, snap_offset)
+        projected = snapped.reshape(frames.shape)
+
+    return projected.reshape(world_positions.shape), hit.reshape(world_positions.shape[:-1])
+
+
+# 얼굴 메쉬 오브젝트를 카메라 위치로 옮기고, 투영에 필요한 구조를 준비합니다.
+def prepare_attach(obj, target, camera, context, mode, snap):
+    # 오브젝트를 카메라 위치로 이동
+    obj.location = camera.location
+    context.view_layer.update()
+    depsgraph = context.evaluated_depsgraph_get()
+
+    with stage('read_target'):
+        target_surface = read_target_surface(target, depsgraph)
+    with stage('build_projector', mode=mode):
+        projector = get_projector(target_surface, camera, mode, context.scene)
+    with stage('build_snap_index'):
+        snap_index = get_snap_index(target_surface) if snap else None
+    return np.array(obj.matrix_world, dtype=np.float64), projector, snap_index
+
+
+# 선택된 얼굴 메쉬 오브젝트를 카메라 위치로 옮긴 뒤 타겟 표면에 부착합니다.
+#   mode          : 투영 방식 (PROJECTION_MODES)
+#   fill          : 닿지 않은 정점 채우기 방식 (FILL_MODES)
+#   snap          : 마지막에 모든 정점을 가장 가까운 표면 점으로 옮길지 여부
+#   snap_distance : 이 거리보다 먼 정점은 옮기지 않음 (None이면 제한 없음)
+#   snap_offset   : 표면에서 면 노멀 방향으로 띄우는 거리
+def attach_mesh(obj, target, camera, context=None, mode='rays', fill='harmonic',
+                snap=True, snap_distance=None, snap_offset=0.0):
+    context = context or bpy.context
+    matrix, projector, snap_index = prepare_attach(obj, target, camera, context, mode, snap)
+
+    mesh = obj.data
+    with stage('read_vertices'):
+        world_positions = meshProjection.to_world(matrix, meshProjection.read_vertex_positions(mesh))
+    attached, hit = attach_positions(world_positions, projector, meshProjection.read_edges(mesh), fill,
+                                     snap_index, snap_distance, snap_offset)
+
+    # 변경 사항을 메쉬에 적용
+    with stage('write_vertices'):
+        meshProjection.write_vertex_positions(mesh, meshProjection.to_local(matrix, attached))
+    return hit
+
+
+# ------------------시퀀스 부착 부분-------------------------
+
+# 한 번에 투영하는 프레임 수 (임시 배열 크기 제한)
+SEQUENCE_BATCH_FRAMES = 64
+
+
+# 시퀀스 파일의 모든 프레임을 같은 타겟에 부착해서 shape key로 기록합니다.
+# 타겟 투영 구조와 스냅 인덱스는 한 번만 만들고, 프레임은 SEQUENCE_BATCH_FRAMES개씩 묶어서 한 번에 투영합니다.
+#   sequence   : .lmseq 경로 또는 LandmarkSequence (faceConstruction.process_sequence의 lmseq 출력)
+#   axes       : 시퀀스(OBJ) 좌표를 오브젝트 로컬 좌표로 바꾸는 회전 (OBJ import와 같은 축 변환)
+#   cache_path : 지정하면 부착된 로컬 좌표를 .lmseq 파일로도 저장합니다. (point cache 용도)
+#   animate    : shape key 값을 프레임마다 하나씩 켜지도록 키프레임을 넣습니다.
+# 얼굴을 찾지 못한 프레임은 이전 프레임의 결과를 그대로 사용합니다.
+def attach_sequence(obj, target, camera, sequence, context=None, mode='rays', fill='harmonic',
+                    snap=True, snap_distance=None, snap_offset=0.0, axes=OBJ_TO_BLENDER_AXES,
+                    frame_start=1, key_prefix="frame", cache_path=None, animate=True):
+    context = context or bpy.context
+    if not isinstance(sequence, LandmarkSequence):
+        sequence = open_sequence(sequence)
+
+    mesh = obj.data
+    if sequence.landmark_count != len(mesh.vertices):
+        raise ValueError(f"Sequence has {sequence.landmark_count} landmarks, mesh has {len(mesh.vertices)} vertices")
+
+    matrix, projector, snap_index = prepare_attach(obj, target, camera, context, mode, snap)
+    edges = meshProjection.read_edges(mesh)
+    rotation = np.asarray(axes if axes is not None else np.eye(3), dtype=np.float64)
+
+    if mesh.shape_keys is None:
+        obj.shape_key_add(name="Basis", from_mix=False)
+    previous = meshProjection.read_vertex_positions(mesh)
+
+    writer = SequenceWriter(cache_path, sequence.triangles, sequence.landmark_count) if cache_path else None
+    key_blocks = []
+    try:
+        for start in range(0, len(sequence), SEQUENCE_BATCH_FRAMES):
+            frames = np.asarray(sequence.frames[start:start + SEQUENCE_BATCH_FRAMES], dtype=np.float64)
+            missing = np.isnan(frames).any(axis=(1, 2))
+            world = meshProjection.to_world(matrix, frames[~missing] @ rotation.T)
+            attached, _ = attach_positions(world, projector, edges, fill, snap_index, snap_distance, snap_offset)
+
+            local = np.empty_like(frames)
+            local[~missing] = meshProjection.to_local(matrix, attached.reshape(-1, 3)).reshape(attached.shape)
+            with stage('write_shape_keys', frames=len(local)):
+                for offset, positions in enumerate(local):
+                    if missing[offset]:
+                        positions = previous
+                    previous = positions
+
+                    key_block = obj.shape_key_add(name=f"{key_prefix}_{start + offset:04d}", from_mix=False)
+                    key_block.data.foreach_set("co", np.ascontiguousarray(positions, dtype=np.float32).ravel())
+                    key_blocks.append(key_block)
+                    if writer is not None:
+                        writer.append(positions)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if animate:
+        animate_shape_keys(key_blocks, frame_start)
+    mesh.update()
+    return key_blocks
+
+
+# shape key를 하나씩 순서대로 켜는 키프레임을 넣습니다. (frame_start + i 프레임에서 i번째 key만 1)
+def animate_shape_keys(key_blocks, frame_start=1):
+    for index, key_block in enumerate(key_blocks):
+        frame = frame_start + index
+        for key_frame, value in ((frame - 1, 0.0), (frame, 1.0), (frame + 1, 0.0)):
+            key_block.value = value
+            key_block.keyframe_insert("value", frame=key_frame)
+
+
+if __name__ == "__main__":
+    # 선택된 오브젝트를 가져옵니다
+    attach_mesh(bpy.context.active_object, bpy.data.objects[TARGET_OBJECT_NAME], bpy.context.scene.camera)
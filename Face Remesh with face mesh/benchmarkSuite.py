@@ -0,0 +1,752 @@
+import argparse
+import importlib.util
+import json
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+
+import numpy as np
+
+# 블렌더와 MediaPipe 없이 일반 리눅스 환경에서 돌리는 성능 측정 도구입니다.
+# 합성 메쉬(얼굴 모양 478 정점 메쉬를 세분화한 것, 구, 격자)를 크기별로 만들어 파이프라인의 주요 계산을 시간과 최대 메모리로 재고,
+# 결과를 JSON으로 저장해 두었다가 다음 실행과 비교합니다.
+# attachMesh.py 는 bpy를 import 하므로, 설치되어 있지 않으면 필요한 만큼의 대용 모듈(bpy, bmesh, mathutils)을 넣고 불러옵니다.
+#
+#   python benchmarkSuite.py --scale small --json baseline.json
+#   python benchmarkSuite.py --scale small --compare baseline.json --json today.json
+#   python benchmarkSuite.py --scale large --filter quality --repeats 3
+
+BENCHMARK_VERSION = 1
+
+# 크기별로 만드는 메쉬 (얼굴: 세분화 단계, 구: icosphere 세분화 단계, 격자: 한 변의 정점 수)
+#   얼굴 0단계 478 정점 / 약 900 면, 한 단계마다 면 수가 4배 (6단계 약 370만 면)
+#   구 n단계 20 * 4^n 면 (9단계 약 520만 면), 격자 n은 2 * (n - 1)^2 면
+SCALES = {
+    'small': {'face': (0, 1, 2), 'sphere': (4, 5), 'grid': (100,)},
+    'medium': {'face': (0, 2, 3, 4), 'sphere': (5, 6, 7), 'grid': (100, 300)},
+    'large': {'face': (0, 2, 4, 5, 6), 'sphere': (5, 7, 8, 9), 'grid': (300, 1000, 1500)},
+}
+
+# bmesh 대용 객체로 면마다 계산하는 기존 방식은 느리므로 이 면 수까지만 측정합니다.
+LEGACY_MAX_FACES = 60000
+
+# 부착(투영) 측정에 쓰는 타겟 구의 세분화 단계와 depth 모드 해상도
+ATTACH_TARGET_SUBDIVISIONS = 6
+ATTACH_DEPTH_RESOLUTION = 1024
+
+# 최근접점 측정에서 찾는 점 수 (표면 근처에 흩뿌린 점, 스냅과 같은 상황)
+CLOSEST_POINT_QUERIES = 30000
+
+# 기준 메쉬 비교에서 스캔 대신 쓰는 조밀한 얼굴 메쉬의 세분화 단계와 표면 잡음 크기
+REFERENCE_FACE_LEVELS = 3
+REFERENCE_NOISE = 2e-3
+
+# 비교할 때 이 비율보다 느려지면 느려진 것으로 표시합니다.
+DEFAULT_THRESHOLD = 1.2
+
+
+# ------------------블렌더 대용 모듈 부분-------------------------
+
+# mathutils.Vector 대용 (아래 기존 면 단위 함수가 쓰는 연산만)
+class Vector:
+    __slots__ = ('x', 'y', 'z')
+
+    def __init__(self, values):
+        self.x, self.y, self.z = (float(value) for value in values)
+
+    def __sub__(self, other):
+        return Vector((self.x - other.x, self.y - other.y, self.z - other.z))
+
+    def __add__(self, other):
+        return Vector((self.x + other.x, self.y + other.y, self.z + other.z))
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def cross(self, other):
+        return Vector((self.y * other.z - self.z * other.y, self.z * other.x - self.x * other.z,
+                       self.x * other.y - self.y * other.x))
+
+    @property
+    def length(self):
+        return math.sqrt(self.dot(self))
+
+    def angle(self, other):
+        cosine = self.dot(other) / (self.length * other.length)
+        return math.acos(max(-1.0, min(1.0, cosine)))
+
+
+# bmesh 정점/변/면 대용
+class BMVert:
+    __slots__ = ('co', 'index', 'link_edges')
+
+    def __init__(self, co, index):
+        self.co = Vector(co)
+        self.index = index
+        self.link_edges = []
+
+
+class BMEdge:
+    __slots__ = ('verts', 'link_faces')
+
+    def __init__(self, verts):
+        self.verts = verts
+        self.link_faces = []
+
+    @property
+    def is_manifold(self):
+        return len(self.link_faces) == 2
+
+
+class BMFace:
+    __slots__ = ('verts', 'edges', 'index')
+
+    def __init__(self, verts, index):
+        self.verts = verts
+        self.edges = []
+        self.index = index
+
+    def calc_area(self):
+        first = self.verts[0].co
+        area = 0.0
+        for i in range(1, len(self.verts) - 1):
+            area += (self.verts[i].co - first).cross(self.verts[i + 1].co - first).length / 2
+        return area
+
+
+# bmesh.types.BMesh 대용. from_mesh에는 StandInMesh를 넘깁니다.
+class BMesh:
+    def __init__(self):
+        self.verts = []
+        self.edges = []
+        self.faces = []
+
+    def from_mesh(self, mesh):
+        self.verts = [BMVert(co, index) for index, co in enumerate(mesh.positions.tolist())]
+        edges = {}
+        for index, polygon in enumerate(mesh.triangles.tolist()):
+            face = BMFace([self.verts[i] for i in polygon], index)
+            for a, b in zip(polygon, polygon[1:] + polygon[:1]):
+                key = (a, b) if a < b else (b, a)
+                edge = edges.get(key)
+                if edge is None:
+                    edge = edges[key] = BMEdge((self.verts[key[0]], self.verts[key[1]]))
+                    self.verts[key[0]].link_edges.append(edge)
+                    self.verts[key[1]].link_edges.append(edge)
+                edge.link_faces.append(face)
+                face.edges.append(edge)
+            self.faces.append(face)
+        self.edges = list(edges.values())
+
+    def free(self):
+        self.verts, self.edges, self.faces = [], [], []
+
+
+# bpy 메쉬 데이터 대용 (배열만 들고 있습니다)
+class StandInMesh:
+    def __init__(self, positions, triangles):
+        self.positions = np.asarray(positions, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+
+def bmesh_from_arrays(positions, triangles):
+    bm = BMesh()
+    bm.from_mesh(StandInMesh(positions, triangles))
+    return bm
+
+
+class _Properties:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+# 설치되어 있지 않은 블렌더 모듈만 대용 모듈로 등록합니다. (블렌더 안에서 실행하면 아무것도 바꾸지 않습니다)
+def install_blender_stand_ins():
+    def missing(name):
+        return name not in sys.modules and importlib.util.find_spec(name) is None
+
+    if missing('mathutils'):
+        sys.modules['mathutils'] = types.ModuleType('mathutils')
+        sys.modules['mathutils'].Vector = Vector
+
+    if missing('bmesh'):
+        sys.modules['bmesh'] = types.ModuleType('bmesh')
+        sys.modules['bmesh'].new = BMesh
+
+    if missing('bpy'):
+        class Operator:
+            def report(self, level, message):
+                pass
+
+        class Object:
+            pass
+
+        bpy = types.ModuleType('bpy')
+        bpy.types = types.SimpleNamespace(Operator=Operator, Panel=object, Scene=types.SimpleNamespace(),
+                                          Object=Object)
+        bpy.props = _Properties()
+        bpy.app = types.SimpleNamespace(handlers=types.SimpleNamespace(persistent=lambda function: function,
+                                                                       depsgraph_update_post=[]))
+        bpy.utils = types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+        bpy.data = types.SimpleNamespace(texts={}, objects={})
+        bpy.path = types.SimpleNamespace(abspath=lambda path: path)
+        bpy.context = types.SimpleNamespace(mode='OBJECT')
+        sys.modules['bpy'] = bpy
+
+
+# ------------------기존 면 단위 계산 부분-------------------------
+
+# meshQuality로 바꾸기 전에 evaluateMesh가 bmesh 면마다 계산하던 함수들입니다. (애드온에서는 더 쓰지 않습니다)
+# quality_legacy 측정과 tests의 비교 기준으로만 쓰며, 위의 대용 객체나 블렌더의 bmesh 객체를 그대로 받습니다.
+
+# Aspect Ratios 계산 함수
+def calculate_aspect_ratio(face):
+    vertices = [v.co for v in face.verts]
+    edge_lengths = [(vertices[i] - vertices[(i + 1) % 3]).length for i in range(3)]
+    max_length = max(edge_lengths)
+    min_length = min(edge_lengths)
+    return max_length / min_length if min_length > 0 else float('inf')
+
+
+# Skewness 계산 함수
+def calculate_skewness(angles):
+    theta_max = max(angles)
+    theta_min = min(angles)
+    skewness = max((theta_max - 60) / (180 - 60), (60 - theta_min) / 60)
+    return skewness
+
+# 폴리곤 각도 계산 함수
+def calculate_polygon_angles(bm, face):
+    angles = []
+    vertices = [v.co for v in face.verts]
+
+    num_vertices = len(vertices)
+    for i in range(num_vertices):
+        current_vertex = vertices[i]
+        prev_vertex = vertices[i - 1]
+        next_vertex = vertices[(i + 1) % num_vertices]
+
+        vec1 = prev_vertex - current_vertex
+        vec2 = next_vertex - current_vertex
+
+        angle = vec1.angle(vec2)
+        angles.append(math.degrees(angle))
+
+    return angles
+
+
+# 삼각형의 면적 계산 함수
+def calculate_triangle_area(v1, v2, v3):
+    a = (v2 - v1).length
+    b = (v3 - v2).length
+    c = (v1 - v3).length
+    s = (a + b + c) / 2
+    return math.sqrt(s * (s - a) * (s - b) * (s - c))
+
+# 인접한 폴리곤들과의 size ratio계산
+def calculate_size_ratio_for_polygon(bm, face):
+    
+    main_area = calculate_triangle_area(*[v.co for v in face.verts])
+    max_area = main_area
+    min_area = main_area
+
+    # 인접한 폴리곤들의 면적 계산
+    for edge in face.edges:
+        for linked_face in edge.link_faces:
+            if linked_face != face:
+                area = calculate_triangle_area(*[v.co for v in linked_face.verts])
+                max_area = max(max_area, area)
+                min_area = min(min_area, area)
+
+    size_ratio = max_area / min_area if min_area > 0 else float('inf')
+    return size_ratio
+
+# Shape factor 계산 함수
+def calculate_shape_factor(face):
+    # 삼각형의 면적 계산
+    vertices = [v.co for v in face.verts]
+    area = calculate_triangle_area(*vertices)
+
+    # 외접원 반지름 계산
+    a, b, c = (vertices[1] - vertices[0]).length, (vertices[2] - vertices[1]).length, (vertices[0] - vertices[2]).length
+    s = (a + b + c) / 2
+    radius = (a * b * c) / (4 * math.sqrt(s * (s - a) * (s - b) * (s - c)))
+
+    # 이상적인 삼각형의 면적 (정삼각형)
+    ideal_area = (math.sqrt(3) / 4) * radius ** 2
+
+    # Shape Factor 계산
+    shape_factor = area / ideal_area if ideal_area > 0 else float('inf')
+    return shape_factor
+
+
+# Max/Min Element 계산 함수
+def calculate_max_min_element(bm):
+    max_area = 0
+    min_area = float('inf')
+    max_face_index = -1
+    min_face_index = -1
+
+    for face in bm.faces:
+        vertices = [v.co for v in face.verts]
+        area = calculate_triangle_area(*vertices)
+
+        if area > max_area:
+            max_area = area
+            max_face_index = face.index
+        if area < min_area:
+            min_area = area
+            min_face_index = face.index
+
+    return max_face_index, min_face_index, max_area, min_area
+
+
+
+# 토폴로지 분석(점, 선, 면, 끊어진 선,끊어진 점)
+def analyze_topology(obj):
+    bm = BMesh()
+    bm.from_mesh(obj.data)
+
+    vertices_count = len(bm.verts)
+    edges_count = len(bm.edges)
+    faces_count = len(bm.faces)
+    non_manifold_edges = sum(1 for e in bm.edges if not e.is_manifold)
+    loose_verts = sum(1 for v in bm.verts if len(v.link_edges) == 0)
+
+    bm.free()
+
+    return vertices_count, edges_count, faces_count, non_manifold_edges, loose_verts
+
+
+# ------------------합성 메쉬 생성 부분-------------------------
+
+# 세분화 stencil (행, 열, 가중치)을 좌표에 적용합니다.
+def _apply_weights(stencil, positions, vertex_count):
+    rows, columns, weights = stencil
+    return np.stack([np.bincount(rows, weights=weights * positions[columns, axis], minlength=vertex_count)
+                     for axis in range(3)], axis=1)
+
+
+def subdivide_mesh(positions, triangles, levels, scheme='loop'):
+    from meshSubdivision import subdivide_once
+
+    for _ in range(levels):
+        stencil, vertex_count, triangles = subdivide_once(triangles, len(positions), scheme)
+        positions = _apply_weights(stencil, positions, vertex_count)
+    return positions, np.asarray(triangles, dtype=np.int64)
+
+
+# 안쪽 고리에서 바깥 고리로 각도 순서대로 이어서 두 고리 사이를 삼각형 띠로 채웁니다. (+z에서 볼 때 반시계 방향)
+def _ring_strip(inner, outer):
+    triangles = []
+    i = j = 0
+    while i < len(inner) or j < len(outer):
+        inner_next = (i + 1) / len(inner)
+        outer_next = (j + 1) / len(outer)
+        if j >= len(outer) or (i < len(inner) and inner_next < outer_next):
+            triangles.append((inner[i % len(inner)], outer[j % len(outer)], inner[(i + 1) % len(inner)]))
+            i += 1
+        else:
+            triangles.append((inner[i % len(inner)], outer[j % len(outer)], outer[(j + 1) % len(outer)]))
+            j += 1
+    return triangles
+
+
+# MediaPipe 얼굴 메쉬와 같은 478 정점의 얼굴 모양 메쉬 (+z 방향을 바라보는 타원형 곡면과 코)
+# 고리 13개를 바깥쪽으로 늘어놓고 삼각형 띠로 잇습니다. levels만큼 Loop 세분화합니다.
+def synthetic_face(levels=0):
+    ring_counts = [1] + [6 * ring for ring in range(1, 12)] + [81]
+    positions = []
+    rings = []
+    for ring, count in enumerate(ring_counts):
+        radius = ring / (len(ring_counts) - 1)
+        angles = 2 * np.pi * np.arange(count) / count
+        rings.append(list(range(len(positions), len(positions) + count)))
+        positions.extend(zip(radius * np.cos(angles), radius * np.sin(angles)))
+
+    xy = np.array(positions) * (0.8, 1.0)
+    nose = 0.25 * np.exp(-(xy[:, 0] ** 2 + (xy[:, 1] + 0.05) ** 2) / 0.02)
+    z = 0.5 * np.sqrt(np.maximum(1 - (xy ** 2).sum(axis=1), 0.0)) + nose
+    positions = np.column_stack([xy, z])
+
+    triangles = [(rings[0][0], rings[1][i], rings[1][(i + 1) % len(rings[1])]) for i in range(len(rings[1]))]
+    for inner, outer in zip(rings[1:], rings[2:]):
+        triangles += _ring_strip(inner, outer)
+    return subdivide_mesh(positions, np.array(triangles, dtype=np.int64), levels)
+
+
+# 반지름 1인 icosphere (20 * 4^levels 면)
+def icosphere(levels=0):
+    t = (1 + 5 ** 0.5) / 2
+    positions = np.array([(-1, t, 0), (1, t, 0), (-1, -t, 0), (1, -t, 0), (0, -1, t), (0, 1, t),
+                          (0, -1, -t), (0, 1, -t), (t, 0, -1), (t, 0, 1), (-t, 0, -1), (-t, 0, 1)], dtype=np.float64)
+    triangles = np.array([(0, 11, 5), (0, 5, 1), (0, 1, 7), (0, 7, 10), (0, 10, 11), (1, 5, 9), (5, 11, 4),
+                          (11, 10, 2), (10, 7, 6), (7, 1, 8), (3, 9, 4), (3, 4, 2), (3, 2, 6), (3, 6, 8),
+                          (3, 8, 9), (4, 9, 5), (2, 4, 11), (6, 2, 10), (8, 6, 7), (9, 8, 1)], dtype=np.int64)
+
+    positions, triangles = subdivide_mesh(positions, triangles, levels, 'linear')
+    return positions / np.linalg.norm(positions, axis=1, keepdims=True), triangles
+
+
+# 한 변에 size개 정점이 있는 [-1, 1] 격자. 높이에 물결을 넣어 면 모양이 조금씩 다르게 합니다.
+def grid(size):
+    coordinates = np.linspace(-1.0, 1.0, size)
+    x, y = np.meshgrid(coordinates, coordinates)
+    z = 0.05 * np.sin(7 * x) * np.cos(5 * y)
+    positions = np.column_stack([x.ravel(), y.ravel(), z.ravel()])
+
+    corner = (np.arange(size - 1)[:, None] * size + np.arange(size - 1)[None, :]).ravel()
+    triangles = np.concatenate([np.stack([corner, corner + 1, corner + size + 1], 1),
+                                np.stack([corner, corner + size + 1, corner + size], 1)])
+    return positions, triangles
+
+
+MESH_GENERATORS = {
+    'face': synthetic_face,
+    'sphere': icosphere,
+    'grid': grid,
+}
+
+
+class SyntheticMesh:
+    def __init__(self, kind, size):
+        self.kind = kind
+        self.size = size
+        self.name = f"{kind}-{size}"
+        self.positions, self.triangles = MESH_GENERATORS[kind](size)
+
+    @property
+    def vertex_count(self):
+        return len(self.positions)
+
+    @property
+    def face_count(self):
+        return len(self.triangles)
+
+
+# ------------------측정 항목 부분-------------------------
+# 각 항목은 (이름, 사용하는 메쉬 종류, 준비 함수)이며, 준비 함수는 메쉬를 받아 측정할 함수를 돌려줍니다.
+# 준비 과정(대용 bmesh 생성, 타겟 메쉬 생성 등)은 시간에 포함하지 않습니다. 건너뛸 때는 None을 돌려줍니다.
+
+# 내보내기 측정에서 파일을 쓰는 임시 폴더 (프로세스가 끝나면 지워집니다)
+_scratch = None
+
+
+def _scratch_path(filename):
+    global _scratch
+    if _scratch is None:
+        _scratch = tempfile.TemporaryDirectory(prefix="face_remesh_benchmark_")
+    return os.path.join(_scratch.name, filename)
+
+
+# LandmarkMesh.from_landmarks: landmark 배열에서 메쉬 객체 만들기 (기존 create_faces 대신)
+def prepare_landmark_mesh(mesh):
+    from landmarkMesh import LandmarkMesh
+    landmarks = mesh.positions.astype(np.float32)
+    return lambda: LandmarkMesh.from_landmarks(landmarks, mesh.triangles)
+
+
+# faceConstruction.export_landmarks_to_obj / export_landmarks: 카메라 좌표 변환과 파일 쓰기 (임시 폴더)
+def _prepare_export(mesh_format):
+    def prepare(mesh):
+        import faceConstruction
+        from meshIO import MESH_FORMATS
+        landmarks = mesh.positions.astype(np.float32)
+        filename = _scratch_path(mesh.name + MESH_FORMATS[mesh_format])
+        if mesh_format == 'obj':
+            return lambda: faceConstruction.export_landmarks_to_obj(landmarks, mesh.triangles, filename)
+        return lambda: faceConstruction.export_landmarks(landmarks, mesh.triangles, filename, mesh_format=mesh_format)
+    return prepare
+
+
+# 내보내기 전 세분화 1단계 (stencil은 미리 만들어 두고 적용만 측정)
+def prepare_subdivide(mesh):
+    from meshSubdivision import build_stencil
+    stencil = build_stencil(mesh.triangles, mesh.vertex_count, 1)
+    return lambda: stencil.apply(mesh.positions)
+
+
+def prepare_quality(mesh):
+    import meshQuality
+    return lambda: meshQuality.evaluate_quality(mesh.positions, mesh.triangles)
+
+
+# 정점 1%를 옮긴 뒤 주변 면만 다시 계산
+def prepare_quality_update(mesh):
+    import meshQuality
+    evaluation = meshQuality.evaluate_quality(mesh.positions, mesh.triangles)
+    moved = mesh.positions.copy()
+    rng = np.random.default_rng(0)
+    indices = rng.choice(mesh.vertex_count, max(1, mesh.vertex_count // 100), replace=False)
+    moved[indices] += rng.normal(scale=1e-3, size=(len(indices), 3))
+    frames = [mesh.positions, moved]
+    state = {'frame': 0}
+
+    def run():
+        state['frame'] ^= 1
+        evaluation.update(frames[state['frame']])
+    return run
+
+
+# 면 단위 기존 함수 (bmesh 대용 객체 사용)
+def prepare_quality_legacy(mesh):
+    if mesh.face_count > LEGACY_MAX_FACES:
+        return None
+    bm = bmesh_from_arrays(mesh.positions, mesh.triangles)
+
+    def run():
+        for face in bm.faces:
+            calculate_aspect_ratio(face)
+            calculate_skewness(calculate_polygon_angles(bm, face))
+            calculate_size_ratio_for_polygon(bm, face)
+            calculate_shape_factor(face)
+        calculate_max_min_element(bm)
+        analyze_topology(types.SimpleNamespace(data=StandInMesh(mesh.positions, mesh.triangles)))
+    return run
+
+
+# 얼굴 메쉬를 카메라(-z) 방향으로 구 타겟에 부착합니다. (투영 구조 생성, 투영, 빈 정점 채우기, 표면 스냅)
+# 얼굴이 구보다 조금 크므로 가장자리 정점은 구에 닿지 않아 채우기 단계도 함께 측정됩니다.
+def _prepare_attach(mode):
+    def prepare(mesh):
+        install_blender_stand_ins()
+        import attachMesh
+        import meshProjection
+        from meshQuality import polygon_edges
+
+        target_positions, target_triangles = icosphere(ATTACH_TARGET_SUBDIVISIONS)
+        world_positions = mesh.positions * 1.1 + (0.0, 0.0, 1.0)
+        edges = polygon_edges(mesh.triangles.ravel(), np.full(mesh.face_count, 3))[0]
+        camera_matrix = np.eye(4)
+        camera_matrix[2, 3] = 5.0
+
+        def run():
+            meshProjection.clear_cache()
+            if mode == 'rays':
+                projector = meshProjection.OrthographicRayCaster(target_positions, target_triangles, (0.0, 0.0, -1.0))
+            else:
+                projector = meshProjection.DepthMap(target_positions, target_triangles, camera_matrix, 3.0,
+                                                    ATTACH_DEPTH_RESOLUTION, ATTACH_DEPTH_RESOLUTION)
+            snap_index = meshProjection.ClosestPointIndex(target_positions, target_triangles)
+            return attachMesh.attach_positions(world_positions, projector, edges, 'harmonic', snap_index)
+        return run
+    return prepare
+
+
+# 구 타겟의 최근접점 인덱스를 만들고 표면 근처의 점들을 찾습니다.
+def prepare_closest_point(mesh):
+    import meshProjection
+    rng = np.random.default_rng(0)
+    directions = rng.normal(size=(CLOSEST_POINT_QUERIES, 3))
+    radii = rng.normal(1.0, 0.01, (CLOSEST_POINT_QUERIES, 1))
+    points = directions / np.linalg.norm(directions, axis=1, keepdims=True) * radii
+    return lambda: meshProjection.ClosestPointIndex(mesh.positions, mesh.triangles).find_nearest(points)
+
+
+# 얼굴 메쉬와 잡음을 넣은 조밀한 얼굴 메쉬(스캔 대용) 사이의 양방향 거리 (기준 메쉬 비교)
+def prepare_compare_surfaces(mesh):
+    import meshProjection
+    import meshQuality
+    reference_positions, reference_triangles = synthetic_face(REFERENCE_FACE_LEVELS)
+    reference_positions = reference_positions + np.random.default_rng(0).normal(
+        scale=REFERENCE_NOISE, size=reference_positions.shape)
+
+    def run():
+        meshProjection.clear_cache()
+        return meshQuality.compare_surfaces(mesh.positions, mesh.triangles, reference_positions, reference_triangles)
+    return run
+
+
+BENCHMARKS = (
+    ('landmark_mesh', ('face',), prepare_landmark_mesh),
+    ('export_obj', ('face', 'grid'), _prepare_export('obj')),
+    ('export_ply', ('face', 'grid'), _prepare_export('ply')),
+    ('export_npy', ('face', 'grid'), _prepare_export('npy')),
+    ('subdivide', ('face',), prepare_subdivide),
+    ('quality', ('face', 'sphere', 'grid'), prepare_quality),
+    ('quality_update', ('face', 'grid'), prepare_quality_update),
+    ('quality_legacy', ('face', 'sphere', 'grid'), prepare_quality_legacy),
+    ('attach_rays', ('face',), _prepare_attach('rays')),
+    ('attach_depth', ('face',), _prepare_attach('depth')),
+    ('closest_point', ('sphere',), prepare_closest_point),
+    ('compare_surfaces', ('face',), prepare_compare_surfaces),
+)
+
+
+# ------------------측정 실행 부분-------------------------
+
+# repeats번 실행해서 가장 빠른 시간과 중앙값을 잽니다. 한 번이 min_time보다 오래 걸리면 그 한 번만 잽니다.
+def measure(run, repeats=5, min_time=1.0):
+    times = []
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+        if times[0] >= min_time:
+            break
+    return {'repeats': len(times), 'best': min(times), 'median': float(np.median(times))}
+
+
+# tracemalloc으로 한 번 더 실행해서 최대 메모리(바이트)를 잽니다. (numpy 배열 할당도 포함)
+def measure_memory(run):
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - start
+    if not was_tracing:
+        tracemalloc.stop()
+    return peak
+
+
+def environment():
+    try:
+        import scipy
+        scipy_version = scipy.__version__
+    except ImportError:
+        scipy_version = None
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+# scale 크기의 메쉬로 선택된 항목을 모두 측정하고 결과 목록을 돌려줍니다.
+# only가 있으면 이름에 그 문자열이 들어간 항목만 측정합니다.
+def run_benchmarks(scale='small', only=None, repeats=5, memory=True, verbose=True):
+    selected = [benchmark for benchmark in BENCHMARKS if not only or any(text in benchmark[0] for text in only)]
+    kinds = {kind for _, benchmark_kinds, _ in selected for kind in benchmark_kinds}
+
+    results = []
+    for kind, sizes in SCALES[scale].items():
+        if kind not in kinds:
+            continue
+        for size in sizes:
+            mesh = SyntheticMesh(kind, size)
+            for name, benchmark_kinds, prepare in selected:
+                if kind not in benchmark_kinds:
+                    continue
+                run = prepare(mesh)
+                if run is None:
+                    continue
+
+                record = {'benchmark': name, 'mesh': mesh.name, 'vertices': mesh.vertex_count,
+                          'faces': mesh.face_count}
+                record.update(measure(run, repeats))
+                if memory:
+                    record['peak_memory'] = measure_memory(run)
+                results.append(record)
+                if verbose:
+                    print(format_record(record), flush=True)
+            del mesh
+    return results
+
+
+def result_key(record):
+    return f"{record['benchmark']}/{record['mesh']}"
+
+
+def format_record(record):
+    text = (f"{result_key(record):<32} {record['faces']:>9} faces  {record['best'] * 1000:>10.2f} ms"
+            f"  (median {record['median'] * 1000:.2f})")
+    if 'peak_memory' in record:
+        text += f"  {record['peak_memory'] / (1024 * 1024):>8.1f} MB"
+    return text
+
+
+# ------------------결과 저장, 비교 부분-------------------------
+
+def write_results(json_path, results, scale):
+    report = {
+        'version': BENCHMARK_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'scale': scale,
+        'environment': environment(),
+        'results': results,
+    }
+    tmp_path = json_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    os.replace(tmp_path, json_path)
+
+
+def load_results(json_path):
+    with open(json_path, encoding='utf-8') as file:
+        report = json.load(file)
+    if report.get('version') != BENCHMARK_VERSION:
+        raise ValueError(f"{json_path} was written by benchmark format {report.get('version')}, "
+                         f"expected {BENCHMARK_VERSION}")
+    return report
+
+
+# 기준 결과와 같은 항목/메쉬끼리 가장 빠른 시간을 비교합니다.
+# (항목, 현재 결과, 기준 결과, 비율)을 돌려주며 비율이 threshold보다 크면 느려진 것입니다.
+def compare_results(results, baseline_results):
+    baseline = {result_key(record): record for record in baseline_results}
+    return [(result_key(record), record, baseline[result_key(record)],
+             record['best'] / baseline[result_key(record)]['best'])
+            for record in results if result_key(record) in baseline]
+
+
+def format_comparison(comparison, threshold=DEFAULT_THRESHOLD):
+    lines = []
+    for key, record, baseline, ratio in comparison:
+        if ratio > threshold:
+            status = "slower"
+        elif ratio < 1 / threshold:
+            status = "faster"
+        else:
+            status = ""
+        line = (f"{key:<32} {baseline['best'] * 1000:>10.2f} ms -> {record['best'] * 1000:>10.2f} ms"
+                f"  x{ratio:.2f}  {status}")
+        if 'peak_memory' in record and 'peak_memory' in baseline:
+            line += (f"  (memory {baseline['peak_memory'] / (1024 * 1024):.1f} -> "
+                     f"{record['peak_memory'] / (1024 * 1024):.1f} MB)")
+        lines.append(line.rstrip())
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the remesh pipeline on synthetic meshes.")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                        help="mesh sizes to run (large reaches millions of faces)")
+    parser.add_argument('--filter', dest='only', action='append',
+                        help="only run benchmarks whose name contains this text (repeatable)")
+    parser.add_argument('--repeats', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the tracemalloc run")
+    parser.add_argument('--json', dest='json_path', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', dest='baseline_path', help="compare against a previous JSON baseline")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="ratio above which a benchmark counts as a regression")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline_path) if args.baseline_path else None
+    results = run_benchmarks(args.scale, args.only, args.repeats, args.memory)
+    if args.json_path:
+        write_results(args.json_path, results, args.scale)
+        print(f"Results written to {args.json_path}")
+
+    if baseline is None:
+        return 0
+    comparison = compare_results(results, baseline['results'])
+    print(f"\nCompared with {args.baseline_path} ({baseline['created']})")
+    print(format_comparison(comparison, args.threshold))
+    return 1 if any(ratio > args.threshold for _, _, _, ratio in comparison) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
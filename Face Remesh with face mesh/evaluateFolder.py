@@ -0,0 +1,160 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import time
+
+import meshQuality
+import stageProfiler
+from meshIO import MESH_READERS, polygons_to_triangles, read_mesh
+
+# 블렌더 없이 폴더 안의 OBJ/PLY 메쉬 품질을 평가하는 명령줄 도구입니다.
+# evaluateMesh.py 패널과 같은 지표(meshQuality)를 사용하며, 파일별 분포(평균, 최소/최대, 백분위수)를 보고서로 씁니다.
+#
+#   python evaluateFolder.py "Exported Landmarks" --json report.json --csv report.csv --workers 8
+
+STATUS_EVALUATED = "evaluated"
+STATUS_FAILED = "failed"
+
+# 보고서에 분포를 기록하는 값 (면적 + 품질 지표)
+REPORT_METRICS = (('areas', "Area"),) + tuple((key, label) for key, label, _ in meshQuality.METRICS)
+
+# 이 개수보다 파일이 적으면 프로세스를 띄우는 비용이 더 크므로 현재 프로세스에서 처리합니다.
+MIN_FILES_FOR_POOL = 64
+
+
+def find_mesh_files(folder_path, recursive=False):
+    extensions = tuple('.' + mesh_format for mesh_format in MESH_READERS)
+    if not recursive:
+        return sorted(os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith(extensions))
+
+    paths = []
+    for root, _, filenames in os.walk(folder_path):
+        paths.extend(os.path.join(root, f) for f in filenames if f.lower().endswith(extensions))
+    return sorted(paths)
+
+
+# 메쉬 파일 하나를 읽어서 평가하고 보고서 항목(dict)을 돌려줍니다. 워커 프로세스에서도 이 함수를 사용합니다.
+def evaluate_file(mesh_path, percentiles=meshQuality.DEFAULT_PERCENTILES):
+    start = time.perf_counter()
+    record = {'file': mesh_path, 'status': STATUS_FAILED}
+
+    try:
+        with stageProfiler.stage('read_mesh', file=os.path.basename(mesh_path)):
+            mesh = read_mesh(mesh_path)
+            positions = mesh['positions']
+            triangles, _ = polygons_to_triangles(mesh['loop_vertices'], mesh['loop_totals'])
+        with stageProfiler.stage('evaluate_quality', faces=len(triangles)):
+            evaluation = meshQuality.evaluate_quality(positions, triangles)
+
+        with stageProfiler.stage('topology'):
+            edges, loop_edges = meshQuality.polygon_edges(mesh['loop_vertices'], mesh['loop_totals'])
+            topology = meshQuality.topology_counts(len(positions), edges, len(mesh['loop_totals']), loop_edges)
+        total_area = float(evaluation.metrics['areas'].sum())
+
+        with stageProfiler.stage('statistics'):
+            record.update(
+                status=STATUS_EVALUATED,
+                triangles=int(len(triangles)),
+                topology=topology,
+                vertex_density=meshQuality.vertex_density(len(positions), total_area),
+                summary=evaluation.summary(),
+                metrics={key: meshQuality.metric_statistics(evaluation.metrics[key], percentiles)
+                         for key, _ in REPORT_METRICS},
+            )
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return record
+
+
+# 파일 목록을 평가합니다. 결과는 입력 순서대로 돌려줍니다.
+def evaluate_files(mesh_paths, workers=None):
+    workers = workers or multiprocessing.cpu_count()
+    if workers <= 1 or len(mesh_paths) < MIN_FILES_FOR_POOL:
+        return [evaluate_file(mesh_path) for mesh_path in mesh_paths]
+
+    # 파일 하나는 금방 끝나므로 여러 개씩 묶어서 보내 프로세스 간 통신 횟수를 줄입니다.
+    chunksize = max(1, len(mesh_paths) // (workers * 8))
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers) as pool:
+        records = pool.map(evaluate_file, mesh_paths, chunksize)
+        # terminate 대신 정상 종료시켜서 워커의 종료 처리(프로파일 기록 등)가 실행되도록 합니다.
+        pool.close()
+        pool.join()
+    return records
+
+
+# ------------------보고서 쓰기 부분-------------------------
+
+def write_json_report(report_path, records):
+    tmp_path = report_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({'files': records}, file, indent=1)
+    os.replace(tmp_path, report_path)
+
+
+# CSV는 파일 하나당 한 줄이며, 지표별 통계는 "<지표>_<통계>" 열로 펼칩니다.
+def write_csv_report(report_path, records, percentiles=meshQuality.DEFAULT_PERCENTILES):
+    statistics = ['mean', 'min', 'max'] + [f'p{percentile}' for percentile in percentiles] + ['non_finite']
+    topology_keys = ['vertices_count', 'edges_count', 'faces_count', 'non_manifold_edges', 'loose_verts']
+    columns = (['file', 'status', 'error', 'seconds', 'triangles'] + topology_keys + ['vertex_density'] +
+               [f'{key}_{statistic}' for key, _ in REPORT_METRICS for statistic in statistics])
+
+    tmp_path = report_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.DictWriter(file, columns, restval='')
+        writer.writeheader()
+        for record in records:
+            row = {key: record[key] for key in ('file', 'status', 'error', 'seconds', 'triangles',
+                                                'vertex_density') if key in record}
+            row.update(record.get('topology', {}))
+            for key, stats in record.get('metrics', {}).items():
+                row.update({f'{key}_{statistic}': stats[statistic] for statistic in statistics if statistic in stats})
+            writer.writerow(row)
+    os.replace(tmp_path, report_path)
+
+
+# 폴더 안의 모든 메쉬를 평가하고 보고서를 씁니다.
+def evaluate_folder(folder_path, json_path=None, csv_path=None, workers=None, recursive=False):
+    start = time.perf_counter()
+    mesh_paths = find_mesh_files(folder_path, recursive)
+    records = evaluate_files(mesh_paths, workers)
+
+    if json_path:
+        write_json_report(json_path, records)
+    if csv_path:
+        write_csv_report(csv_path, records)
+
+    failed = [record for record in records if record['status'] == STATUS_FAILED]
+    for record in failed:
+        print(f"Failed: {record['file']} ({record['error']})")
+    print(f"Evaluated {len(records) - len(failed)} of {len(records)} meshes in {time.perf_counter() - start:.2f}s")
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the quality of every OBJ/PLY mesh in a folder.")
+    parser.add_argument('folder', help="folder containing .obj/.ply meshes")
+    parser.add_argument('--json', dest='json_path', help="write a per-file JSON report")
+    parser.add_argument('--csv', dest='csv_path', help="write a per-file CSV report")
+    parser.add_argument('--workers', type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument('--recursive', action='store_true', help="also evaluate meshes in sub-folders")
+    parser.add_argument('--profile', metavar='TRACE', help="write per-stage timings as a Chrome trace JSON")
+    parser.add_argument('--profile-memory', action='store_true', help="also record peak memory per stage")
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        stageProfiler.profile_to(args.profile, args.profile_memory)
+
+    if not args.json_path and not args.csv_path:
+        args.json_path = os.path.join(args.folder, "quality_report.json")
+
+    records = evaluate_folder(args.folder, args.json_path, args.csv_path, args.workers, args.recursive)
+    return 1 if any(record['status'] == STATUS_FAILED for record in records) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,239 +1,504 @@
 import bpy
-import bmesh
-import math
-from mathutils import Vector
+import os
+import sys
+import time
+from collections import OrderedDict
 
+import numpy as np
 
-# ------------------계산에 필요한 함수 정의-------------------------
 
-# Aspect Ratios 계산 함수
-def calculate_aspect_ratio(face):
-    vertices = [v.co for v in face.verts]
-    edge_lengths = [(vertices[i] - vertices[(i + 1) % 3]).length for i in range(3)]
-    max_length = max(edge_lengths)
-    min_length = min(edge_lengths)
-    return max_length / min_length if min_length > 0 else float('inf')
+# 같은 폴더에 있는 meshQuality 모듈을 불러올 수 있도록 스크립트 위치를 경로에 추가합니다.
+# (블렌더 텍스트 에디터에서 실행하면 __file__ 대신 텍스트의 파일 경로를 사용합니다)
+def _script_directory():
+    text = bpy.data.texts.get(os.path.basename(__file__))
+    if text is not None and text.filepath:
+        return os.path.dirname(bpy.path.abspath(text.filepath))
+    return os.path.dirname(os.path.abspath(__file__))
 
 
-# Skewness 계산 함수
-def calculate_skewness(angles):
-    theta_max = max(angles)
-    theta_min = min(angles)
-    skewness = max((theta_max - 60) / (180 - 60), (60 - theta_min) / 60)
-    return skewness
+if _script_directory() not in sys.path:
+    sys.path.append(_script_directory())
 
-# 폴리곤 각도 계산 함수
-def calculate_polygon_angles(bm, face):
-    angles = []
-    vertices = [v.co for v in face.verts]
+import meshProjection
+import meshQuality
+from stageProfiler import stage
 
-    num_vertices = len(vertices)
-    for i in range(num_vertices):
-        current_vertex = vertices[i]
-        prev_vertex = vertices[i - 1]
-        next_vertex = vertices[(i + 1) % num_vertices]
 
-        vec1 = prev_vertex - current_vertex
-        vec2 = next_vertex - current_vertex
+# ------------------메쉬 데이터 읽기-------------------------
 
-        angle = vec1.angle(vec2)
-        angles.append(math.degrees(angle))
+# 메쉬 데이터를 foreach_get으로 한 번에 numpy 배열로 가져옵니다.
+# 삼각형은 블렌더가 미리 계산해 두는 loop_triangles를 사용하므로 bmesh를 만들거나 삼각화할 필요가 없습니다.
+def read_mesh_arrays(obj):
+    mesh = obj.data
+    mesh.calc_loop_triangles()
 
-    return angles
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    matrix = np.array(obj.matrix_world, dtype=np.float64)
+    positions = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]  # 월드 좌표계로 변환
 
+    triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+    mesh.loop_triangles.foreach_get("vertices", triangles)
+    triangle_polygons = np.empty(len(mesh.loop_triangles), dtype=np.int32)
+    mesh.loop_triangles.foreach_get("polygon_index", triangle_polygons)
 
-# 삼각형의 면적 계산 함수
-def calculate_triangle_area(v1, v2, v3):
-    a = (v2 - v1).length
-    b = (v3 - v2).length
-    c = (v1 - v3).length
-    s = (a + b + c) / 2
-    return math.sqrt(s * (s - a) * (s - b) * (s - c))
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    loop_edges = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("edge_index", loop_edges)
 
-# 인접한 폴리곤들과의 size ratio계산
-def calculate_size_ratio_for_polygon(bm, face):
-    
-    main_area = calculate_triangle_area(*[v.co for v in face.verts])
-    max_area = main_area
-    min_area = main_area
+    vertex_select = np.empty(len(mesh.vertices), dtype=bool)
+    mesh.vertices.foreach_get("select", vertex_select)
+    polygon_select = np.empty(len(mesh.polygons), dtype=bool)
+    mesh.polygons.foreach_get("select", polygon_select)
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+
+    return {
+        'positions': positions,
+        'triangles': triangles.reshape(-1, 3),
+        'triangle_polygons': triangle_polygons,
+        'edges': edges.reshape(-1, 2),
+        'loop_edges': loop_edges,
+        'polygon_count': len(mesh.polygons),
+        'vertex_select': vertex_select,
+        'polygon_select': polygon_select,
+        'loop_totals': loop_totals,
+    }
 
-    # 인접한 폴리곤들의 면적 계산
-    for edge in face.edges:
-        for linked_face in edge.link_faces:
-            if linked_face != face:
-                area = calculate_triangle_area(*[v.co for v in linked_face.verts])
-                max_area = max(max_area, area)
-                min_area = min(min_area, area)
 
-    size_ratio = max_area / min_area if min_area > 0 else float('inf')
-    return size_ratio
+# ------------------결과 캐시 부분-------------------------
 
-# Shape factor 계산 함수
-def calculate_shape_factor(face):
-    # 삼각형의 면적 계산
-    vertices = [v.co for v in face.verts]
-    area = calculate_triangle_area(*vertices)
+# 계산 결과는 Scene 문자열 프로퍼티 대신 오브젝트별 numpy 배열로 보관합니다.
+# 키는 오브젝트의 session_uid라서 이름을 바꿔도 결과가 따라가고, 같은 이름의 다른 오브젝트와 섞이지 않습니다.
+# 토폴로지가 같으면(topology revision이 같으면) 저장된 결과에서 움직인 정점 주변만 다시 계산합니다.
+RESULT_CACHE_SIZE = 8
+
+# 패널에서 보여줄 수 있는 나쁜 면 목록의 최대 길이
+WORST_LIST_LIMIT = 1000
 
-    # 외접원 반지름 계산
-    a, b, c = (vertices[1] - vertices[0]).length, (vertices[2] - vertices[1]).length, (vertices[0] - vertices[2]).length
-    s = (a + b + c) / 2
-    radius = (a * b * c) / (4 * math.sqrt(s * (s - a) * (s - b) * (s - c)))
+_result_cache = OrderedDict()
 
-    # 이상적인 삼각형의 면적 (정삼각형)
-    ideal_area = (math.sqrt(3) / 4) * radius ** 2
+# 결과를 계산한 뒤 지오메트리나 변환이 바뀐 오브젝트. 패널은 이 표시만 보고 결과를 숨깁니다.
+# (revision 비교는 메쉬 전체를 읽어야 하므로 오퍼레이터에서만 합니다)
+_stale_results = set()
 
-    # Shape Factor 계산
-    shape_factor = area / ideal_area if ideal_area > 0 else float('inf')
-    return shape_factor
+# 오퍼레이터가 면 속성/히트맵을 쓰면서 생기는 depsgraph 갱신은 편집으로 보지 않도록 표시해 둡니다.
+_own_updates = set()
 
 
-# Max/Min Element 계산 함수
-def calculate_max_min_element(bm):
-    max_area = 0
-    min_area = float('inf')
-    max_face_index = -1
-    min_face_index = -1
+# 정점 수, 면 구성과 삼각형 배열의 해시로 메쉬의 연결 구조를 구분하는 값을 만듭니다.
+# (정점 위치는 포함하지 않으므로 정점만 움직인 경우에는 같은 값이 나옵니다)
+def mesh_topology_revision(data):
+    checksum = meshProjection.geometry_key(data['triangles'], data['loop_totals'])
+    return (len(data['positions']), len(data['triangles']), data['polygon_count'], checksum)
 
-    for face in bm.faces:
-        vertices = [v.co for v in face.verts]
-        area = calculate_triangle_area(*vertices)
 
-        if area > max_area:
-            max_area = area
-            max_face_index = face.index
-        if area < min_area:
-            min_area = area
-            min_face_index = face.index
+# 월드 좌표계 정점 위치의 해시 (정점 이동과 오브젝트 변환을 모두 구분합니다)
+def mesh_vertex_revision(data):
+    return meshProjection.geometry_key(data['positions'])
+
+
+# 패널/히트맵용: 저장된 결과를 그대로 돌려줍니다. 메쉬를 읽지 않으므로 draw()에서 불러도 됩니다.
+# 결과가 지금 메쉬와 맞는지는 is_result_outdated()로 확인합니다.
+def get_cached_result(obj):
+    result = _result_cache.get(obj.session_uid)
+    if result is None or result['mesh_uid'] != obj.data.session_uid:
+        return None
+    return result
 
-    return max_face_index, min_face_index, max_area, min_area
+
+def is_result_outdated(obj):
+    return obj.session_uid in _stale_results
+
+
+# 오퍼레이터용: 읽어 온 배열로 저장된 결과의 revision을 확인합니다.
+# 메쉬 데이터나 토폴로지가 다르면 결과를 버리고, 토폴로지가 같으면 정점이 움직였더라도 증분 계산에 쓰도록 돌려줍니다.
+def validate_result(obj, data):
+    key = obj.session_uid
+    result = _result_cache.get(key)
+    if result is None:
+        return None
+    if result['mesh_uid'] != obj.data.session_uid or result['topology_revision'] != mesh_topology_revision(data):
+        discard_result(key)
+        return None
+    if result['vertex_revision'] == mesh_vertex_revision(data):
+        _stale_results.discard(key)
+    return result
+
+
+# 결과를 저장하면서 계산에 쓴 메쉬 데이터와 정점 위치의 revision을 함께 기록합니다.
+def store_result(obj, data, result):
+    key = obj.session_uid
+    result['mesh_uid'] = obj.data.session_uid
+    result['vertex_revision'] = mesh_vertex_revision(data)
+    _stale_results.discard(key)
+
+    _result_cache[key] = result
+    _result_cache.move_to_end(key)
+    while len(_result_cache) > RESULT_CACHE_SIZE:
+        discard_result(next(iter(_result_cache)))
+
+
+def discard_result(key):
+    _result_cache.pop(key, None)
+    _stale_results.discard(key)
+    _own_updates.discard(key)
+
+
+# 오퍼레이터가 메쉬에 결과를 쓴 뒤 바로 이어지는 depsgraph 갱신은 건너뛰도록 표시합니다.
+def expect_own_update(obj):
+    _own_updates.add(obj.session_uid)
+
+
+# depsgraph 갱신마다 결과가 있는 오브젝트의 지오메트리/변환이 바뀌었는지만 표시해 둡니다.
+# 오퍼레이터가 쓴 갱신은 다음 한 번의 호출에서만 건너뜁니다. (register()에서 persistent로 등록합니다)
+def _mark_stale_results(scene, depsgraph):
+    for update in depsgraph.updates:
+        if not (update.is_updated_geometry or update.is_updated_transform):
+            continue
+        if isinstance(update.id, bpy.types.Object):
+            key = update.id.original.session_uid
+            if key in _result_cache and key not in _own_updates:
+                _stale_results.add(key)
+    _own_updates.clear()
 
 
+# 지표별 분포 요약(백분위수)과 가장 나쁜 면 WORST_LIST_LIMIT개를 오퍼레이터에서 한 번만 계산해 둡니다.
+# 패널의 draw()는 저장된 값을 읽기만 하고, 목록은 잘라서 페이지로 보여줍니다.
+def summarize_result(result):
+    metrics = result['evaluation'].metrics
+    for key, _, higher_is_worse in meshQuality.METRICS:
+        if key not in result['statistics']:
+            result['statistics'][key] = meshQuality.metric_statistics(metrics[key])
+        if key not in result['worst_faces']:
+            result['worst_faces'][key] = meshQuality.worst_faces(metrics[key], WORST_LIST_LIMIT,
+                                                                 higher_is_worse=higher_is_worse)
+
+
+METRIC_DIRECTIONS = {key: higher_is_worse for key, _, higher_is_worse in meshQuality.METRICS}
+
+
+# 면별 지표를 FACE 도메인 float 속성으로 한 번에 기록하고,
+# 선택된 지표는 CORNER 도메인 색상 속성(quality_heatmap)으로 만들어 뷰포트에서 히트맵으로 볼 수 있게 합니다.
+def write_quality_attributes(mesh, result, heatmap_metric):
+    polygon_count = result['polygon_count']
+    if len(mesh.polygons) != polygon_count:
+        return
+
+    float_max = np.finfo(np.float32).max
+    for key, _, higher_is_worse in meshQuality.METRICS:
+        values = meshQuality.triangles_to_polygons(result['evaluation'].metrics[key], result['triangle_polygons'],
+                                                   polygon_count, higher_is_worse)
+        values = np.nan_to_num(values, nan=0.0, posinf=float_max, neginf=-float_max).astype(np.float32)
+
+        name = f"quality_{key}"
+        attribute = mesh.attributes.get(name)
+        if attribute is None or attribute.domain != 'FACE' or attribute.data_type != 'FLOAT':
+            if attribute is not None:
+                mesh.attributes.remove(attribute)
+            attribute = mesh.attributes.new(name, 'FLOAT', 'FACE')
+        attribute.data.foreach_set("value", values)
+
+    write_heatmap(mesh, result, heatmap_metric)
+
+
+def write_heatmap(mesh, result, metric_key):
+    if len(mesh.polygons) != result['polygon_count']:
+        return
+
+    higher_is_worse = METRIC_DIRECTIONS[metric_key]
+    values = meshQuality.triangles_to_polygons(result['evaluation'].metrics[metric_key], result['triangle_polygons'],
+                                               result['polygon_count'], higher_is_worse)
+    stats = result['statistics'][metric_key]
+    colors = meshQuality.heatmap_colors(values, stats.get('p5', 0.0), stats.get('p95', 1.0), higher_is_worse)
+    loop_colors = np.repeat(colors, result['loop_totals'], axis=0)
+
+    attribute = mesh.color_attributes.get("quality_heatmap")
+    if attribute is None or attribute.domain != 'CORNER':
+        if attribute is not None:
+            mesh.color_attributes.remove(attribute)
+        attribute = mesh.color_attributes.new("quality_heatmap", 'FLOAT_COLOR', 'CORNER')
+    attribute.data.foreach_set("color", loop_colors.ravel())
+    mesh.color_attributes.active_color = attribute
+    mesh.update()
+
+
+# 패널에서 히트맵 지표를 바꾸면 저장된 결과로 색상만 다시 기록합니다.
+def _update_heatmap_metric(self, context):
+    obj = context.active_object
+    if obj is None or obj.type != 'MESH' or obj.mode == 'EDIT':
+        return
+    result = get_cached_result(obj)
+    if result is not None and not is_result_outdated(obj):
+        expect_own_update(obj)
+        write_heatmap(obj.data, result, self.quality_metric)
 
-# 토폴로지 분석(점, 선, 면, 끊어진 선,끊어진 점)
-def analyze_topology(obj):
-    bm = bmesh.new()
-    bm.from_mesh(obj.data)
 
-    vertices_count = len(bm.verts)
-    edges_count = len(bm.edges)
-    faces_count = len(bm.faces)
-    non_manifold_edges = sum(1 for e in bm.edges if not e.is_manifold)
-    loose_verts = sum(1 for v in bm.verts if len(v.link_edges) == 0)
+# ------------------연산 수행 부분-------------------------
 
-    bm.free()
+# 새로 평가한 결과를 캐시에 넣을 형태로 묶습니다.
+def build_result(data, evaluation):
+    return {
+        'topology_revision': mesh_topology_revision(data),
+        'evaluation': evaluation,
+        'statistics': {},
+        'topology': meshQuality.topology_counts(len(data['positions']), data['edges'],
+                                                data['polygon_count'], data['loop_edges']),
+        'triangle_polygons': data['triangle_polygons'],
+        'polygon_count': data['polygon_count'],
+        'loop_totals': data['loop_totals'],
+        'worst_faces': {},
+    }
+
+
+# 평가 결과를 씬 프로퍼티와 면 속성에 기록합니다. (일반/modal 오퍼레이터가 함께 사용)
+def apply_result(operator, context, obj, data, result):
+    with stage('summarize_result'):
+        summarize_result(result)
+    summary = result['evaluation'].summary()
+    topology = result['topology']
+
+    # Calculate Density (Edit mode에서는 선택된 정점과 면만 사용)
+    areas = result['evaluation'].metrics['areas']
+    if bpy.context.mode == 'EDIT_MESH':
+        vertex_count = int(np.count_nonzero(data['vertex_select']))
+        selected_triangles = data['polygon_select'][data['triangle_polygons']]
+        total_area = float(areas[selected_triangles].sum())
+    else:
+        vertex_count = len(data['positions'])
+        total_area = float(areas.sum())
+    density = meshQuality.vertex_density(vertex_count, total_area)
+
+    total_aspect_ratio = summary['total_aspect_ratio']
+    total_skewness = summary['total_skewness']
+    total_size_ratio = summary['total_size_ratio']
+    total_shape_factor = summary['total_shape_factor']
+
+    max_face_index, min_face_index = summary['max_face_index'], summary['min_face_index']
+    max_area, min_area = summary['max_area'], summary['min_area']
+
+    topology_result = (topology['vertices_count'], topology['edges_count'], topology['faces_count'],
+                       topology['non_manifold_edges'], topology['loose_verts'])
+
+    # 면별 값은 면 속성으로 한 번에 기록 (Edit mode에서는 나갈 때 덮어써지므로 Object mode에서만 기록)
+    if obj.mode == 'EDIT':
+        operator.report({'INFO'}, "Face attributes and heat map are written in Object Mode only")
+    else:
+        expect_own_update(obj)
+        with stage('write_attributes'):
+            write_quality_attributes(obj.data, result, context.scene.quality_metric)
+    context.scene.quality_page = 0
+
+    # 결과 저장
+    context.scene.t_aspect_ratios = f'Total_aspect_ratio: {total_aspect_ratio}'
+    context.scene.t_skewness_values =  f'Total_skewness: {total_skewness}'
+    context.scene.t_size_ratios =  f'Total_size_ratio: {total_size_ratio}'
+    context.scene.t_shape_factors =  f'Total_shape_factor: {total_shape_factor}'
+    
+    context.scene.mesh_max_element = f'Max Element: Face {max_face_index} (Area: {max_area:.2f})'
+    context.scene.mesh_min_element = f'Min Element: Face {min_face_index} (Area: {min_area:.2f})'
+    
+    context.scene.vertices_count = f'Vertices Count: {topology_result[0]}'
+    context.scene.edges_count = f'Edges Count: {topology_result[1]}'
+    context.scene.faces_count = f'Faces Count: {topology_result[2]}'
+    context.scene.non_manifold_edges = f'Non Manifold Edges: {topology_result[3]}'
+    context.scene.loose_verts = f'Loose Verts: {topology_result[4]}'
+    
+    context.scene.vertex_density_report = f"Vertex Density: {density:.2f}"  
 
-    return vertices_count, edges_count, faces_count, non_manifold_edges, loose_verts
 
+# 활성 오브젝트의 메쉬 데이터를 배열로 읽습니다. 메쉬가 아니면 None을 돌려줍니다.
+def read_active_mesh(operator, context):
+    obj = context.active_object
 
-# 정점 밀도 계산
-def calculate_vertex_density(bm, verts, faces):
-    total_area = sum(f.calc_area() for f in faces)
-    vertex_density = len(verts) / total_area if total_area > 0 else 0
-    return vertex_density
+    # 활성 오브젝트인지 확인
+    if obj is None or obj.type != 'MESH':
+        operator.report({'ERROR'}, "Active object is not a Mesh")
+        return None, None
 
+    # Edit mode에서 편집 중인 내용을 메쉬 데이터에 반영
+    if obj.mode == 'EDIT':
+        obj.update_from_editmode()
 
+    with stage('read_mesh_arrays', object=obj.name):
+        return obj, read_mesh_arrays(obj)
 
-# ------------------연산 수행 부분-------------------------
 
 class MESH_OT_calculate(bpy.types.Operator):
     bl_idname = "mesh.calculate_aspect_ratio"
     bl_label = "Calculate Aspect Ratio and Skewness"
     bl_options = {'REGISTER', 'UNDO'}
 
+    # 이전 결과가 있고 토폴로지가 같으면 움직인 정점 주변의 면만 다시 계산합니다.
+    incremental: bpy.props.BoolProperty(name="Incremental", default=True)
+
     # 실행 부분
     def execute(self, context):
-        obj = context.active_object     
-        
-        # 활성 오브젝트인지 확인
-        if obj.type != 'MESH':
-            self.report({'ERROR'}, "Active object is not a Mesh")
+        obj, data = read_active_mesh(self, context)
+        if data is None:
             return {'CANCELLED'}
 
-        # bmesh 생성 및 바운딩
-        bm = bmesh.new()
-        bm.from_mesh(obj.data)
-        bm.transform(obj.matrix_world)  # 월드 좌표계로 변환
-
-        
-        # 계산결과를 위한 리스트
-        aspect_ratios = {}
-        skewness_values = {}
-        size_ratios = {}
-        shape_factors = {} 
-        
-        # Edit mode에서의 개별 메쉬 선택시
-        if bpy.context.mode == 'EDIT_MESH':
-            selected_verts = [v for v in bm.verts if v.select]
-            selected_faces = [f for f in bm.faces if f.select]
+        # 메쉬 데이터를 배열로 한 번에 가져온 뒤 모든 면의 지표를 배열 연산으로 계산
+        result = validate_result(obj, data)
+
+        if self.incremental and result is not None:
+            # 이전 좌표와 비교해 움직인 정점 주변의 면만 다시 계산
+            evaluation = result['evaluation']
+            if evaluation.update(data['positions']):
+                result['statistics'] = {}
+                result['worst_faces'] = {}
+            self.report({'INFO'}, f"Re-evaluated {evaluation.last_updated_count} of "
+                                  f"{len(evaluation.triangles)} faces")
         else:
-            selected_verts = bm.verts
-            selected_faces = bm.faces
-            
-        bmesh.ops.triangulate(bm, faces=bm.faces[:]) # Triangulate
-        
-        # 계산
-        for face in bm.faces:
-            
-            # Calculate aspect ratio
-            aspect_ratio = calculate_aspect_ratio(face)
-            aspect_ratios[face.index] = aspect_ratio
-            
-            # Calculate skewness
-            angles = calculate_polygon_angles(bm, face)
-            skewness = calculate_skewness(angles)
-            skewness_values[face.index] = skewness           
-            
-            # Calculate size ratio
-            size_ratio = calculate_size_ratio_for_polygon(bm, face)
-            size_ratios[face.index] = size_ratio
-            
-            # Calculate shape factor
-            shape_factor = calculate_shape_factor(face)
-            shape_factors[face.index] = shape_factor
-            
-        # total value
-        total_aspect_ratio = sum(aspect_ratios.values()) / len(aspect_ratios)
-        total_skewness = sum(skewness_values.values()) / len(skewness_values)
-        total_size_ratio = sum(size_ratios.values()) / len(size_ratios)
-        total_shape_factor = sum(shape_factors.values()) / len(shape_factors)
-        
-        # Calculate max min element    
-        max_face_index, min_face_index, max_area, min_area = calculate_max_min_element(bm) 
-        
-        # Analyze Topology
-        topology_result = analyze_topology(obj)
-        
-        # Calculate Density
-        density = calculate_vertex_density(bm, selected_verts, selected_faces) 
-            
-        bm.free()
-
-        # 결과 저장
-        context.scene.mesh_aspect_ratios = str(aspect_ratios)
-        context.scene.mesh_skewness_values = str(skewness_values)
-        context.scene.mesh_size_ratios = str(size_ratios)
-        context.scene.mesh_shape_factors = str(shape_factors)
-        
-        context.scene.t_aspect_ratios = f'Total_aspect_ratio: {total_aspect_ratio}'
-        context.scene.t_skewness_values =  f'Total_skewness: {total_skewness}'
-        context.scene.t_size_ratios =  f'Total_size_ratio: {total_size_ratio}'
-        context.scene.t_shape_factors =  f'Total_shape_factor: {total_shape_factor}'
-        
-        context.scene.mesh_max_element = f'Max Element: Face {max_face_index} (Area: {max_area:.2f})'
-        context.scene.mesh_min_element = f'Min Element: Face {min_face_index} (Area: {min_area:.2f})'
-        
-        context.scene.vertices_count = f'Vertices Count: {topology_result[0]}'
-        context.scene.edges_count = f'Edges Count: {topology_result[1]}'
-        context.scene.faces_count = f'Faces Count: {topology_result[2]}'
-        context.scene.non_manifold_edges = f'Non Manifold Edges: {topology_result[3]}'
-        context.scene.loose_verts = f'Loose Verts: {topology_result[4]}'
-        
-        context.scene.vertex_density_report = f"Vertex Density: {density:.2f}"  
+            with stage('evaluate_quality', faces=len(data['triangles'])):
+                result = build_result(data, meshQuality.evaluate_quality(data['positions'], data['triangles']))
+        store_result(obj, data, result)
+
+        apply_result(self, context, obj, data, result)
+        return {'FINISHED'}
+
 
+# ------------------기준 메쉬 비교 부분-------------------------
 
+# 정점별 기준 표면까지의 거리를 POINT 도메인 float 속성(deviation_error)으로 기록합니다.
+# 기준 표면을 찾지 못한 정점(max distance보다 먼 정점)은 -1로 기록합니다.
+def write_deviation_attribute(mesh, vertex_error):
+    if len(mesh.vertices) != len(vertex_error):
+        return
+
+    values = np.where(np.isfinite(vertex_error), vertex_error, -1.0).astype(np.float32)
+    attribute = mesh.attributes.get("deviation_error")
+    if attribute is None or attribute.domain != 'POINT' or attribute.data_type != 'FLOAT':
+        if attribute is not None:
+            mesh.attributes.remove(attribute)
+        attribute = mesh.attributes.new("deviation_error", 'FLOAT', 'POINT')
+    attribute.data.foreach_set("value", values)
+    mesh.update()
+
+
+def format_deviation(label, stats):
+    if 'hausdorff' not in stats:
+        return f"{label}: no vertices within range"
+    text = f"{label}: max {stats['hausdorff']:.4f} / mean {stats['mean']:.4f} / RMS {stats['rms']:.4f}"
+    if stats['missing']:
+        text += f" ({stats['missing']} out of range)"
+    return text
+
+
+# 활성 메쉬를 기준 오브젝트(원본 스캔 등)의 표면과 비교합니다.
+# 기준 오브젝트는 모디파이어가 적용된 상태로 읽으며, 두 메쉬 모두 월드 좌표계에서 비교합니다.
+class MESH_OT_compare_reference(bpy.types.Operator):
+    bl_idname = "mesh.compare_reference"
+    bl_label = "Compare with Reference"
+
+    def execute(self, context):
+        reference = context.scene.quality_reference
+        if reference is None or reference.type != 'MESH':
+            self.report({'ERROR'}, "Select a reference mesh object")
+            return {'CANCELLED'}
+
+        obj, data = read_active_mesh(self, context)
+        if data is None:
+            return {'CANCELLED'}
+        if obj == reference:
+            self.report({'ERROR'}, "Reference object must differ from the active object")
+            return {'CANCELLED'}
+
+        start = time.perf_counter()
+        with stage('read_reference', object=reference.name):
+            reference_positions, reference_triangles = meshProjection.read_object_triangles(
+                reference, context.evaluated_depsgraph_get())
+        max_distance = context.scene.deviation_max_distance or np.inf
+        comparison = meshQuality.compare_surfaces(data['positions'], data['triangles'], reference_positions,
+                                                  reference_triangles, max_distance)
+
+        if obj.mode == 'EDIT':
+            self.report({'INFO'}, "Deviation attribute is written in Object Mode only")
+        else:
+            with stage('write_attributes'):
+                write_deviation_attribute(obj.data, comparison['vertex_error'])
+
+        scene = context.scene
+        scene.deviation_forward = format_deviation("Mesh -> Reference", comparison['forward'])
+        scene.deviation_backward = format_deviation("Reference -> Mesh", comparison['backward'])
+        scene.deviation_hausdorff = f"Hausdorff (symmetric): {comparison['hausdorff']:.4f}"
+        self.report({'INFO'}, f"Compared {len(data['positions'])} vertices with {len(reference_positions)} "
+                              f"reference vertices in {time.perf_counter() - start:.2f}s")
         return {'FINISHED'}
 
 
+# 큰 메쉬용: 면을 나눠서 평가하며, 타이머 이벤트마다 정해진 시간만큼만 계산하고 UI에 제어를 돌려줍니다.
+# 진행률은 커서와 헤더에 표시되고, ESC 또는 오른쪽 클릭으로 취소할 수 있습니다.
+class MESH_OT_calculate_modal(bpy.types.Operator):
+    bl_idname = "mesh.calculate_quality_modal"
+    bl_label = "Calculate Mesh Quality (Background)"
+
+    chunk_size: bpy.props.IntProperty(name="Chunk Size", default=meshQuality.DEFAULT_CHUNK_SIZE, min=1000)
+    # 타이머 이벤트 한 번에 계산에 쓰는 시간 (초)
+    time_budget: bpy.props.FloatProperty(name="Time Budget", default=0.05, min=0.005, max=1.0)
+
+    def invoke(self, context, event):
+        obj, data = read_active_mesh(self, context)
+        if data is None:
+            return {'CANCELLED'}
+
+        # 토폴로지가 바뀐 이전 결과는 여기서 버리고, 계산이 끝나면 새 결과로 바꿉니다.
+        validate_result(obj, data)
+        self._object_name = obj.name
+        self._data = data
+        self._task = meshQuality.EvaluationTask(data['positions'], data['triangles'], self.chunk_size)
+
+        window_manager = context.window_manager
+        self._timer = window_manager.event_timer_add(0.01, window=context.window)
+        window_manager.progress_begin(0, 100)
+        window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type in {'ESC', 'RIGHTMOUSE'}:
+            self._finish(context)
+            self.report({'WARNING'}, "Mesh quality calculation cancelled")
+            return {'CANCELLED'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        # 오브젝트가 지워졌거나 이름이 바뀌었으면 중단
+        obj = context.scene.objects.get(self._object_name)
+        if obj is None:
+            self._finish(context)
+            self.report({'ERROR'}, "Object was removed during calculation")
+            return {'CANCELLED'}
+
+        deadline = time.perf_counter() + self.time_budget
+        while not self._task.done and time.perf_counter() < deadline:
+            self._task.step()
+
+        progress = self._task.progress
+        context.window_manager.progress_update(int(progress * 100))
+        # 타이머 이벤트에서는 context.area가 없을 수 있습니다.
+        if context.area is not None:
+            context.area.header_text_set(f"Mesh quality: {progress * 100:.0f}% (ESC to cancel)")
+
+        if not self._task.done:
+            return {'RUNNING_MODAL'}
+
+        result = build_result(self._data, self._task.evaluation)
+        store_result(obj, self._data, result)
+        apply_result(self, context, obj, self._data, result)
+        self._finish(context)
+        return {'FINISHED'}
+
+    def _finish(self, context):
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self._timer)
+        window_manager.progress_end()
+        if context.area is not None:
+            context.area.header_text_set(None)
+            context.area.tag_redraw()
+        self._data = None
+        self._task = None
 
 
 
@@ -253,48 +518,53 @@ class MESH_PT_panel(bpy.types.Panel):
         layout = self.layout
         scene = context.scene
         layout.operator(MESH_OT_calculate.bl_idname, text="Calculate Aspect Ratios and Skewness")
-    
-        # Aspect Ratios 
-        layout.prop(scene, "show_aspect_ratios", text="Show Aspect Ratios")
-        if scene.show_aspect_ratios:
-            if "mesh_aspect_ratios" in scene:
-                aspect_ratios = eval(scene.mesh_aspect_ratios)
-                for face_index, ratio in aspect_ratios.items():
-                    layout.label(text=f"Face {face_index}: {ratio:.2f}")
-            else:
-                layout.label(text="No aspect ratios calculated.")
-
-        # Skewness 
-        layout.prop(scene, "show_skewness_values", text="Show Skewness Values")
-        if scene.show_skewness_values:
-            if "mesh_skewness_values" in scene:
-                skewness_values = eval(scene.mesh_skewness_values)
-                for face_index, skewness in skewness_values.items():
-                    layout.label(text=f"Face {face_index} skewness: {skewness:.2f}")
-            else:
-                layout.label(text="No skewness values calculated.")
-                
-        # Size Ratios 
-        layout.prop(scene, "show_size_ratios", text="Show Size Ratios")
-        if scene.show_size_ratios:
-            if "mesh_size_ratios" in scene:
-                size_ratios = eval(scene.mesh_size_ratios)
-                for face_index, size_ratio in size_ratios.items():
-                    layout.label(text=f"Face {face_index} Size Ratio: {size_ratio:.2f}")
-            else:
-                layout.label(text="No size ratios calculated.")
-
-        # Shape Factors 
-        layout.prop(scene, "show_shape_factors", text="Show Shape Factors")
-        if scene.show_shape_factors:
-            if "mesh_shape_factors" in scene:
-                shape_factors = eval(scene.mesh_shape_factors)
-                for face_index, factor in shape_factors.items():
-                    layout.label(text=f"Face {face_index} shape factor: {factor:.2f}")
-            else:
-                layout.label(text="No shape factors calculated.")
-                
-                
+        layout.operator(MESH_OT_calculate_modal.bl_idname, text="Calculate in Background")
+
+        # 기준 메쉬와의 거리 (Hausdorff / 평균 / RMS)
+        box = layout.box()
+        box.prop(scene, "quality_reference", text="Reference")
+        box.prop(scene, "deviation_max_distance", text="Max Distance")
+        box.operator(MESH_OT_compare_reference.bl_idname, text="Compare with Reference")
+        if scene.deviation_hausdorff:
+            box.label(text=scene.deviation_forward)
+            box.label(text=scene.deviation_backward)
+            box.label(text=scene.deviation_hausdorff)
+
+        obj = context.active_object
+        result = get_cached_result(obj) if obj is not None and obj.type == 'MESH' else None
+        if result is None:
+            layout.label(text="No quality results calculated.")
+            return
+        if is_result_outdated(obj):
+            layout.label(text="Mesh changed since the last calculation. Recalculate to update.")
+            return
+
+        # 지표별 분포 요약 (평균, 백분위수)
+        box = layout.box()
+        for key, label, _ in meshQuality.METRICS:
+            stats = result['statistics'][key]
+            box.label(text=f"{label}")
+            if 'mean' in stats:
+                box.label(text=f"  mean {stats['mean']:.3f} / min {stats['min']:.3f} / max {stats['max']:.3f}")
+                box.label(text=f"  p5 {stats['p5']:.3f} / p50 {stats['p50']:.3f} / p95 {stats['p95']:.3f}")
+            if stats['non_finite']:
+                box.label(text=f"  degenerate faces: {stats['non_finite']}")
+
+        # 가장 나쁜 면 목록 (페이지 단위로 보여줍니다)
+        layout.prop(scene, "quality_metric", text="Worst Faces")
+        worst = result['worst_faces'][scene.quality_metric]
+        page_size = scene.quality_page_size
+        page_count = max(1, (len(worst) + page_size - 1) // page_size)
+        page = min(scene.quality_page, page_count - 1)
+
+        row = layout.row(align=True)
+        row.prop(scene, "quality_page", text=f"Page (of {page_count})")
+        row.prop(scene, "quality_page_size", text="Size")
+
+        values = result['evaluation'].metrics[scene.quality_metric]
+        for face_index in worst[page * page_size:(page + 1) * page_size].tolist():
+            layout.label(text=f"Face {face_index}: {values[face_index]:.2f}")
+
         # Total
         layout.label(text=context.scene.t_aspect_ratios)
         layout.label(text=context.scene.t_skewness_values)
@@ -324,24 +594,26 @@ class MESH_PT_panel(bpy.types.Panel):
 # 등록 및 해제 함수
 def register():
     bpy.utils.register_class(MESH_OT_calculate)
+    bpy.utils.register_class(MESH_OT_calculate_modal)
+    bpy.utils.register_class(MESH_OT_compare_reference)
     bpy.utils.register_class(MESH_PT_panel)
+    bpy.app.handlers.depsgraph_update_post.append(bpy.app.handlers.persistent(_mark_stale_results))
     
-    # 프로퍼티 추가 (계산 + 토클)
-    # Aspect_ratios 
-    bpy.types.Scene.mesh_aspect_ratios = bpy.props.StringProperty() # aspect ratios 프로퍼티 추가
-    bpy.types.Scene.show_aspect_ratios = bpy.props.BoolProperty(name="Show Aspect Ratios", default=True) # 토글 프로퍼티 추가
-    
-    # Skewness
-    bpy.types.Scene.mesh_skewness_values = bpy.props.StringProperty()
-    bpy.types.Scene.show_skewness_values = bpy.props.BoolProperty(name="Show Skewness Values", default=True)
+    # 프로퍼티 추가 (목록/히트맵 지표 선택 + 페이지)
+    bpy.types.Scene.quality_metric = bpy.props.EnumProperty(
+        name="Quality Metric",
+        items=[(key, label, "") for key, label, _ in meshQuality.METRICS],
+        update=_update_heatmap_metric)
+    bpy.types.Scene.quality_page = bpy.props.IntProperty(name="Page", default=0, min=0)
+    bpy.types.Scene.quality_page_size = bpy.props.IntProperty(name="Page Size", default=20, min=1, max=200)
     
-    # Size Ratios
-    bpy.types.Scene.mesh_size_ratios = bpy.props.StringProperty()  
-    bpy.types.Scene.show_size_ratios = bpy.props.BoolProperty(name="Show Size Ratios", default=True)  
-    
-    # Shape Factors
-    bpy.types.Scene.mesh_shape_factors = bpy.props.StringProperty()
-    bpy.types.Scene.show_shape_factors = bpy.props.BoolProperty(name="Show Shape Factors", default=True)
+    # 기준 메쉬 비교 (max distance가 0이면 거리 제한 없음)
+    bpy.types.Scene.quality_reference = bpy.props.PointerProperty(
+        name="Reference", type=bpy.types.Object, poll=lambda self, obj: obj.type == 'MESH')
+    bpy.types.Scene.deviation_max_distance = bpy.props.FloatProperty(name="Max Distance", default=0.0, min=0.0)
+    bpy.types.Scene.deviation_forward = bpy.props.StringProperty()
+    bpy.types.Scene.deviation_backward = bpy.props.StringProperty()
+    bpy.types.Scene.deviation_hausdorff = bpy.props.StringProperty()
     
     # total
     bpy.types.Scene.t_aspect_ratios = bpy.props.StringProperty()
@@ -368,23 +640,26 @@ def register():
 
 def unregister():
     bpy.utils.unregister_class(MESH_OT_calculate)
+    bpy.utils.unregister_class(MESH_OT_calculate_modal)
+    bpy.utils.unregister_class(MESH_OT_compare_reference)
     bpy.utils.unregister_class(MESH_PT_panel)
+    if _mark_stale_results in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_mark_stale_results)
+    _result_cache.clear()
+    _stale_results.clear()
+    _own_updates.clear()
     
-    # Aspect_ratios
-    del bpy.types.Scene.mesh_aspect_ratios
-    del bpy.types.Scene.show_aspect_ratios
-    
-    # Skewness
-    del bpy.types.Scene.mesh_skewness_values
-    del bpy.types.Scene.show_skewness_values
-    
-    # Size Ratios
-    del bpy.types.Scene.mesh_size_ratios
-    del bpy.types.Scene.show_size_ratios
+    # 목록/히트맵
+    del bpy.types.Scene.quality_metric
+    del bpy.types.Scene.quality_page
+    del bpy.types.Scene.quality_page_size
     
-    # Shape Factors
-    del bpy.types.Scene.mesh_shape_factors
-    del bpy.types.Scene.show_shape_factors
+    # 기준 메쉬 비교
+    del bpy.types.Scene.quality_reference
+    del bpy.types.Scene.deviation_max_distance
+    del bpy.types.Scene.deviation_forward
+    del bpy.types.Scene.deviation_backward
+    del bpy.types.Scene.deviation_hausdorff
     
     # total
     del bpy.types.Scene.t_aspect_ratios 
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from faceConstruction import export_mesh
+from faceDetector import DEFAULT_DETECTOR_SETTINGS, DetectorPool, FaceMeshSession, get_worker_session, \
+    landmarks_to_array
+from faceTopology import get_face_triangles
+from landmarkCache import DEFAULT_MAX_BYTES, get_landmark_cache
+from landmarkMesh import LandmarkMesh
+from meshIO import MESH_FORMATS
+from stageProfiler import stage
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# 파일 처리 상태
+STATUS_EXPORTED = "exported"
+STATUS_NO_FACE = "no_face"
+STATUS_FAILED = "failed"
+
+# 이미 처리가 끝난 것으로 보고 다시 실행할 때 건너뛰는 상태
+DONE_STATUSES = (STATUS_EXPORTED, STATUS_NO_FACE)
+
+# 이 개수만큼 결과가 모일 때마다 manifest를 저장해서 중간에 멈춰도 진행 상황이 남도록 합니다.
+MANIFEST_SAVE_INTERVAL = 50
+
+
+# 입력 파일 이름에서 항상 같은 출력 파일 이름을 만듭니다.
+def output_name_for(filename, output_format='obj'):
+    return os.path.splitext(filename)[0] + MESH_FORMATS[output_format]
+
+
+def hash_bytes(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def load_manifest(output_folder):
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {'version': MANIFEST_VERSION, 'files': {}}
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    return manifest
+
+
+# 임시 파일에 쓴 뒤 교체해서 저장 도중 중단되어도 manifest가 깨지지 않도록 합니다.
+def save_manifest(output_folder, manifest):
+    manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+# 이전 실행 기록과 비교해 다시 처리해야 하는 파일인지 판단합니다.
+# mtime과 크기가 같으면 바뀌지 않은 것으로 보고, 다르면 내용 해시까지 비교합니다.
+def needs_processing(image_path, output_folder, record, output_format='obj', subdivision_levels=0):
+    if record is None or record.get('status') not in DONE_STATUSES:
+        return True
+
+    # 세분화 단계가 바뀌면 같은 이름의 출력 파일이라도 내용이 다르므로 다시 처리합니다.
+    if record.get('subdivision_levels', 0) != subdivision_levels:
+        return True
+
+    # 출력 형식이 바뀌었거나 출력 파일이 지워졌으면 다시 처리합니다.
+    if record.get('output') != output_name_for(os.path.basename(image_path), output_format):
+        return True
+    if record['status'] == STATUS_EXPORTED:
+        if not os.path.exists(os.path.join(output_folder, record['output'])):
+            return True
+
+    stat = os.stat(image_path)
+    if stat.st_mtime == record.get('mtime') and stat.st_size == record.get('size'):
+        return False
+
+    with open(image_path, 'rb') as file:
+        if hash_bytes(file.read()) != record.get('sha1'):
+            return True
+
+    # 내용은 같고 mtime만 바뀐 경우 다음 실행에서 다시 해시하지 않도록 기록을 갱신합니다.
+    record.update(mtime=stat.st_mtime, size=stat.st_size)
+    return False
+
+
+# 이미지 하나를 읽고, 해시를 계산하고, landmark를 찾아 OBJ로 내보낸 뒤 manifest 기록을 돌려줍니다.
+# 워커 프로세스와 단일 프로세스 모두 이 함수를 사용합니다.
+# cache(LandmarkCache)를 넘기면 내용이 같은 이미지는 디코딩과 추론 없이 저장된 landmark를 사용합니다.
+def process_image(image_path, output_folder, session=None, output_format='obj', subdivision_levels=0, cache=None):
+    session = session or get_worker_session()
+    filename = os.path.basename(image_path)
+    start = time.perf_counter()
+    record = {'status': STATUS_FAILED, 'output': output_name_for(filename, output_format),
+              'subdivision_levels': subdivision_levels}
+
+    with stage('process_image', file=filename):
+        try:
+            with stage('read_file'):
+                stat = os.stat(image_path)
+                with open(image_path, 'rb') as file:
+                    data = file.read()
+            with stage('hash'):
+                record.update(mtime=stat.st_mtime, size=stat.st_size, sha1=hash_bytes(data))
+
+            with stage('cache_lookup'):
+                cached, landmarks = cache.get(record['sha1']) if cache is not None else (False, None)
+            record['cached'] = cached
+            if not cached:
+                # 파일을 한 번만 읽어서 해시 계산과 디코딩에 같이 사용합니다.
+                import cv2
+                with stage('decode'):
+                    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError("could not decode image")
+
+                landmarks = session.process(image)
+                if landmarks is not None:
+                    landmarks = landmarks_to_array(landmarks)
+                if cache is not None:
+                    with stage('cache_store'):
+                        cache.put(record['sha1'], landmarks)
+
+            if landmarks is None:
+                record['status'] = STATUS_NO_FACE
+            else:
+                output_path = os.path.join(output_folder, record['output'])
+                with stage('landmark_mesh'):
+                    mesh = LandmarkMesh.from_landmarks(landmarks, get_face_triangles())
+                export_mesh(mesh, output_path, mesh_format=output_format, subdivision_levels=subdivision_levels)
+                record['status'] = STATUS_EXPORTED
+        except Exception as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    return filename, record
+
+
+# 폴더 안의 PNG를 병렬로 처리합니다.
+# 처리 중인 작업은 최대 max_pending개로 제한되며, 결과는 입력 이름 순서대로 manifest에 기록됩니다.
+# resume=True이면 이전 manifest를 읽어 바뀌지 않고 이미 끝난 파일은 건너뜁니다.
+# use_cache=True이면 이미지 내용 해시로 찾는 landmark 캐시(landmarkCache)를 사용해 다른 출력 폴더나 설정으로
+# 다시 실행할 때도 바뀌지 않은 이미지는 추론하지 않습니다.
+def run_batch(folder_path, output_folder, workers=1, resume=True, max_pending=None, output_format='obj',
+              subdivision_levels=0, use_cache=True, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+    os.makedirs(output_folder, exist_ok=True)
+    cache = get_landmark_cache(cache_dir, cache_max_bytes, DEFAULT_DETECTOR_SETTINGS) if use_cache else None
+    manifest = load_manifest(output_folder) if resume else {'version': MANIFEST_VERSION, 'files': {}}
+    records = manifest['files']
+
+    filenames = sorted(f for f in os.listdir(folder_path) if f.endswith(".png"))
+    image_paths = [os.path.join(folder_path, f) for f in filenames
+                   if needs_processing(os.path.join(folder_path, f), output_folder, records.get(f), output_format,
+                                       subdivision_levels)]
+
+    summary = {'total': len(filenames), 'skipped': len(filenames) - len(image_paths),
+               STATUS_EXPORTED: 0, STATUS_NO_FACE: 0, STATUS_FAILED: 0, 'cached': 0}
+
+    def add_record(filename, record):
+        records[filename] = record
+        summary[record['status']] += 1
+        summary['cached'] += bool(record.get('cached'))
+        if record['status'] == STATUS_FAILED:
+            print(f"Failed: {filename} ({record.get('error')})")
+        if sum(summary[s] for s in (STATUS_EXPORTED, STATUS_NO_FACE, STATUS_FAILED)) % MANIFEST_SAVE_INTERVAL == 0:
+            save_manifest(output_folder, manifest)
+
+    try:
+        if workers > 1:
+            max_pending = max_pending or workers * 4
+            pending = deque()
+            with DetectorPool(workers) as pool:
+                for image_path in image_paths:
+                    # 대기열이 가득 차면 가장 오래된 작업이 끝날 때까지 기다립니다.
+                    if len(pending) >= max_pending:
+                        add_record(*pending.popleft().get())
+                    pending.append(pool.apply_async(process_image, (image_path, output_folder, None, output_format,
+                                                                    subdivision_levels, cache)))
+                while pending:
+                    add_record(*pending.popleft().get())
+        elif image_paths:
+            with FaceMeshSession() as session:
+                for image_path in image_paths:
+                    add_record(*process_image(image_path, output_folder, session, output_format, subdivision_levels,
+                                              cache))
+    finally:
+        save_manifest(output_folder, manifest)
+
+    print(f"Batch finished: {summary}")
+    return summary
@@ -1,136 +1,361 @@
-import cv2
-import mediapipe as mp
+import argparse
+import contextlib
 import os
+import queue
+import re
+import threading
 
-# MediaPipe Face Mesh의 연결 인덱스
-FACE_MESH_CONNECTIONS = mp.solutions.face_mesh.FACEMESH_TESSELATION
+from faceDetector import FaceMeshSession
+from faceRoi import RoiFaceMesh, imread_reduced
+from faceTopology import get_face_triangles
+from landmarkMesh import LandmarkMesh
+from landmarkSequence import SEQUENCE_EXTENSION, SequenceWriter
+from meshIO import MESH_FORMATS, apply_camera_transform, write_mesh
+from meshSubdivision import MAX_SUBDIVISION_LEVELS
+import stageProfiler
+from stageProfiler import stage
 
-class Vertex:
-    def __init__(self, id, x, y, z):
-        self.id = id
-        self.x = x
-        self.y = y
-        self.z = z
+# refine_landmarks=True 일 때의 landmark 개수
+FACE_LANDMARK_COUNT = 478
 
-class Face:
-    def __init__(self, vertices):
-        self.vertices = vertices
+# 스트리밍 처리에서 사용하는 동영상 확장자
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
 
-def create_edge_hash_table():
-    edge_hash_table = {}
-    for connection in FACE_MESH_CONNECTIONS:
-        idx1, idx2 = connection
 
-        if idx1 not in edge_hash_table:
-            edge_hash_table[idx1] = []
-        edge_hash_table[idx1].append(idx2)
+# session을 넘기면 이미 만들어 둔 FaceMesh를 재사용합니다.
+# 넘기지 않으면 이 이미지 하나만을 위한 세션을 만들고 바로 닫습니다.
+def get_face_mesh_coordinates(image, session=None):
+    if session is None:
+        with FaceMeshSession() as session:
+            return get_face_mesh_coordinates(image, session)
 
-        # 양방향 연결을 고려하고 싶다면 아래 코드를 활성화하세요.
-        # if idx2 not in edge_hash_table:
-        #     edge_hash_table[idx2] = []
-        # edge_hash_table[idx2].append(idx1)
+    landmarks = session.process(image)
+    if landmarks is None:
+        print("Face not detected.")
+    return landmarks
 
-    return edge_hash_table
 
-def vector_subtract(v1, v2):
-    return (v1.x - v2.x, v1.y - v2.y, v1.z - v2.z)
+# 이미지에서 얼굴을 찾아 공유 삼각형 테이블을 가진 LandmarkMesh(정규화 좌표)로 돌려줍니다.
+def get_face_mesh(image, session=None):
+    landmarks = get_face_mesh_coordinates(image, session)
+    if landmarks is None:
+        return None
+    return LandmarkMesh.from_landmarks(landmarks, get_face_triangles())
 
-def cross_product(v1, v2):
-    x = v1[1] * v2[2] - v1[2] * v2[1]
-    y = v1[2] * v2[0] - v1[0] * v2[2]
-    z = v1[0] * v2[1] - v1[1] * v2[0]
-    return (x, y, z)
 
-def dot_product(v1, v2):
-    return v1[0] * v2[0] + v1[1] * v2[1] + v1[2] * v2[2]
+def export_landmarks_to_obj(landmarks, triangles, filename, camera_transform=None):
+    export_landmarks(landmarks, triangles, filename, camera_transform, mesh_format='obj')
 
-def create_faces(vertices, edge_hash_table):
-    faces = []
-    used_edges = set()
-    existing_faces = set()  # 이미 생성된 면을 추적하기 위한 집합
 
-    for v in vertices:
-        if v.id not in edge_hash_table:
-            continue
+def export_landmarks(landmarks, triangles, filename, camera_transform=None, mesh_format=None):
+    export_mesh(LandmarkMesh.from_landmarks(landmarks, triangles), filename, camera_transform, mesh_format)
 
-        for next_vertex_id in edge_hash_table[v.id]:
-            if (v.id, next_vertex_id) in used_edges:
-                continue
 
-            if next_vertex_id not in edge_hash_table:
-                continue
+# 메쉬 전체를 한 번에 카메라 좌표로 변환한 뒤 확장자(obj, ply, npy)에 맞는 형식으로 씁니다.
+# camera_transform을 지정하지 않으면 1920 x 1080, orthographic Scale = 1 기준으로 블렌더 3d좌표계에 맞춥니다.
+# subdivision_levels가 1 이상이면 미리 계산해 둔 세분화 stencil로 고해상도 메쉬를 만들어서 씁니다.
+def export_mesh(mesh, filename, camera_transform=None, mesh_format=None, subdivision_levels=0,
+                subdivision_scheme='loop'):
+    positions, triangles = export_arrays(mesh, camera_transform, subdivision_levels, subdivision_scheme)
+    with stage('write_mesh', format=mesh_format or os.path.splitext(filename)[1]):
+        write_mesh(filename, positions, triangles, mesh_format)
 
-            for third_vertex_id in edge_hash_table[next_vertex_id]:
-                if third_vertex_id == v.id or (next_vertex_id, third_vertex_id) in used_edges:
-                    continue
 
-                next_vertex = vertices[next_vertex_id]
-                third_vertex = vertices[third_vertex_id]
+# 내보낼 (정점 좌표, 삼각형) 배열을 만듭니다. 파일 대신 메모리로 보낼 때(landmarkService)도 사용합니다.
+def export_arrays(mesh, camera_transform=None, subdivision_levels=0, subdivision_scheme='loop'):
+    positions = apply_camera_transform(mesh.positions, camera_transform)
+    triangles = mesh.triangles
+    if subdivision_levels > 0:
+        from meshSubdivision import get_subdivision_stencil
+        with stage('subdivision_stencil'):
+            stencil = get_subdivision_stencil(triangles, mesh.vertex_count, subdivision_levels, subdivision_scheme)
+        with stage('subdivide', levels=subdivision_levels):
+            positions, triangles = stencil.apply(positions), stencil.triangles
+    return positions, triangles
 
-                # 정점 ID를 정렬하여 면의 중복을 확인합니다.
-                sorted_vertex_ids = tuple(sorted([v.id, next_vertex_id, third_vertex_id]))
 
-                if v.id in edge_hash_table[third_vertex_id]: # 면 완성 확인
-                    if sorted_vertex_ids not in existing_faces: # 면 중복 확인
-                        faces.append(Face([v, next_vertex, third_vertex]))
-                        used_edges.add((v.id, next_vertex_id))
-                        existing_faces.add(sorted_vertex_ids)
-                        break
+# 기존의 process_folder 함수에서 export_landmarks_to_obj 호출 부분을 수정합니다.
+# 실제 처리는 faceBatch.run_batch 가 담당합니다.
+# workers가 2 이상이면 워커 프로세스마다 FaceMesh 세션을 하나씩 두고 이미지를 나눠서 처리하며,
+# resume=True이면 output_folder의 manifest를 보고 이미 내보낸 파일은 건너뜁니다.
+# use_cache=True이면 이미지 내용이 같은 파일은 landmark 캐시(~/.cache/face_remesh)에서 읽어 추론을 건너뜁니다.
+def process_folder(folder_path, output_folder, workers=1, resume=True, output_format='obj', subdivision_levels=0,
+                   use_cache=True):
+    # faceBatch 가 이 모듈을 import 하므로 순환 import를 피하기 위해 함수 안에서 불러옵니다.
+    from faceBatch import run_batch
+    return run_batch(folder_path, output_folder, workers=workers, resume=resume, output_format=output_format,
+                     subdivision_levels=subdivision_levels, use_cache=use_cache)
+
 
-    return faces
+# ------------------스트리밍 처리 부분-------------------------
 
+# 동영상 파일에서 프레임을 하나씩 읽어 (프레임 번호, 이름, 이미지)를 돌려줍니다.
+def iter_video_frames(video_path):
+    import cv2
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise OSError(f"Could not open video: {video_path}")
 
-def get_face_mesh_coordinates(image):
-    mp_face_mesh = mp.solutions.face_mesh
-    face_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, max_num_faces=1, refine_landmarks=True)
-    results = face_mesh.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    try:
+        index = 0
+        while True:
+            with stage('decode', frame=index):
+                ok, image = capture.read()
+            if not ok:
+                break
+            yield index, f"{stem}_{index:05d}", image
+            index += 1
+    finally:
+        capture.release()
 
-    if results.multi_face_landmarks:
-        return results.multi_face_landmarks[0].landmark
+
+def _natural_key(filename):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', filename)]
+
+
+# 번호가 붙은 이미지 시퀀스를 순서대로 읽습니다.
+# 폴더를 넘기면 안의 PNG를 번호 순으로, 'render_%04d.png' 같은 패턴을 넘기면 start 번부터 파일이 없을 때까지 읽습니다.
+# start를 지정하지 않으면 0번 또는 1번 중 존재하는 번호부터 시작합니다.
+# 폴더도 패턴도 아닌 경로는 ValueError, 첫 프레임 파일이 없으면 FileNotFoundError를 냅니다.
+# reduction이 1보다 크면 이미지를 1/reduction 해상도로 디코딩합니다.
+def iter_image_sequence(sequence, start=None, reduction=1):
+    if os.path.isdir(sequence):
+        filenames = sorted((f for f in os.listdir(sequence) if f.endswith(".png")), key=_natural_key)
+        paths = (os.path.join(sequence, f) for f in filenames)
     else:
-        print("Face not detected.")
-        return None
+        paths = _iter_pattern_paths(sequence, start)
 
-def export_landmarks_to_obj(landmarks, faces, filename):
-    with open(filename, 'w') as file:
-        # 정점 데이터 작성
-        for landmark in landmarks:
-            # 1920 x 1080, orthographic Scale = 1 일 때 블렌더 3d좌표계에 맞추기 위해 조정을 해줍니다.
-            x = (landmark.x - 0.5) * 1
-            y = (landmark.y - 0.5) * -0.5625
-            z = -landmark.z
-            file.write(f"v {x} {y} {z}\n")
+    for index, image_path in enumerate(paths):
+        with stage('decode', frame=index):
+            image = imread_reduced(image_path, reduction)
+        if image is None:
+            raise OSError(f"Could not read image: {image_path}")
+        yield index, os.path.splitext(os.path.basename(image_path))[0], image
 
-        # 면 데이터 작성
-        for face in faces:
-            vertices = face.vertices
-            # OBJ 파일의 인덱스는 1부터 시작하므로 1을 더합니다.
-            file.write(f"f {vertices[0].id + 1} {vertices[1].id + 1} {vertices[2].id + 1}\n")
 
+def _iter_pattern_paths(pattern, start):
+    if '%' not in pattern:
+        raise ValueError(f"Image sequence must be a folder or a pattern like render_%04d.png: {pattern}")
+    try:
+        first = pattern % (0 if start is None else start)
+    except (TypeError, ValueError):
+        raise ValueError(f"Image sequence pattern must contain one integer field like %04d: {pattern}") from None
 
-# 기존의 process_folder 함수에서 export_landmarks_to_obj 호출 부분을 수정합니다.
-def process_folder(folder_path, output_folder):
-    for filename in os.listdir(folder_path):
-        if filename.endswith(".png"):
-            image_path = os.path.join(folder_path, filename)
-            image = cv2.imread(image_path)
-            landmarks = get_face_mesh_coordinates(image)
-
-            # 해시 테이블 생성 
-            edge_hash_table = create_edge_hash_table()
-            
-            if landmarks:
-                # Vertex 객체 리스트 생성
-                vertices = [Vertex(i, lm.x, lm.y, lm.z) for i, lm in enumerate(landmarks)]
-                # 면 생성
-                faces = create_faces(vertices, edge_hash_table)
-
-                output_filename = os.path.join(output_folder, f"{os.path.splitext(filename)[0]}.obj")
-                export_landmarks_to_obj(landmarks, faces, output_filename)
-
-
-
-# 렌더링된 이미지가 저장된 폴더 경로
-folder_path = 'C:\\Project Result\\Render Result'
-output_folder = 'C:\\Project Result\\Exported Landmarks'
-process_folder(folder_path, output_folder)
+    if start is None:
+        start = 0 if os.path.exists(first) else 1
+    # 패턴에 맞는 파일이 하나도 없으면 0 프레임으로 끝내지 않고 알려 줍니다.
+    if not os.path.exists(pattern % start):
+        raise FileNotFoundError(f"First frame of the image sequence does not exist: {pattern % start}")
+
+    number = start
+    while os.path.exists(pattern % number):
+        yield pattern % number
+        number += 1
+
+
+def iter_frames(source, reduction=1):
+    if source.lower().endswith(VIDEO_EXTENSIONS):
+        return iter_video_frames(source)
+    return iter_image_sequence(source, reduction=reduction)
+
+
+# 스레드 사이에서 작업을 넘겨주는 단계. 끝을 알리는 값과 예외를 함께 전달합니다.
+_END_OF_STREAM = object()
+
+
+def _run_stage(target, output_queue, errors):
+    try:
+        target()
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        if output_queue is not None:
+            output_queue.put(_END_OF_STREAM)
+
+
+# 받는 쪽 스레드가 살아 있는 동안만 기다리며 넣습니다. 받는 쪽이 오류로 끝났으면 False를 돌려줍니다.
+def _put_while_alive(output_queue, item, consumer):
+    while consumer.is_alive():
+        try:
+            output_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+# 동영상 또는 이미지 시퀀스를 디코딩 -> landmark 추출 -> 내보내기 단계로 흘려보냅니다.
+# 단계 사이의 큐는 prefetch 개수로 제한되어 있어서 시퀀스 길이와 관계없이 메모리 사용량이 일정합니다.
+# FaceMesh는 tracking 모드(static_image_mode=False)로 동작하여 이전 프레임의 얼굴 위치를 이어서 사용합니다.
+# roi=True이면 이전 프레임의 얼굴 영역만 잘라서(roi_scale 배율로) 변환과 추론을 수행하고,
+# reduction으로 이미지 시퀀스를 낮은 해상도로 디코딩할 수 있습니다. 결과 좌표는 항상 전체 프레임 기준입니다.
+# output_format='lmseq'이면 프레임별 파일 대신 output_folder/<source 이름>.lmseq 하나에 모든 프레임을 이어 붙입니다.
+# (얼굴을 찾지 못한 프레임은 NaN으로 채워서 프레임 번호가 입력과 같게 유지됩니다)
+# subdivision_levels가 1 이상이면 모든 프레임을 같은 stencil로 세분화해서 내보냅니다.
+def process_sequence(source, output_folder, prefetch=8, roi=False, roi_scale=1.0, reduction=1, output_format='obj',
+                     subdivision_levels=0, subdivision_scheme='loop'):
+    os.makedirs(output_folder, exist_ok=True)
+    triangles = get_face_triangles()
+    stencil = None
+    if subdivision_levels > 0:
+        from meshSubdivision import get_subdivision_stencil
+        stencil = get_subdivision_stencil(triangles, FACE_LANDMARK_COUNT, subdivision_levels, subdivision_scheme)
+
+    decoded = queue.Queue(maxsize=prefetch)
+    detected = queue.Queue(maxsize=prefetch)
+    errors = []
+    stop = threading.Event()
+    summary = {'frames': 0, 'exported': 0, 'no_face': 0}
+
+    def decode():
+        for frame in iter_frames(source, reduction):
+            if stop.is_set():
+                break
+            decoded.put(frame)
+
+    def export():
+        while True:
+            item = detected.get()
+            if item is _END_OF_STREAM:
+                break
+            name, mesh = item
+            if sequence_writer is not None:
+                positions = None if mesh is None else apply_camera_transform(mesh.positions)
+                if positions is not None and stencil is not None:
+                    with stage('subdivide', levels=subdivision_levels):
+                        positions = stencil.apply(positions)
+                with stage('write_sequence'):
+                    sequence_writer.append(positions)
+            elif mesh is not None:
+                output_filename = os.path.join(output_folder, name + MESH_FORMATS[output_format])
+                export_mesh(mesh, output_filename, mesh_format=output_format, subdivision_levels=subdivision_levels,
+                            subdivision_scheme=subdivision_scheme)
+
+    sequence_writer = None
+    if output_format == 'lmseq':
+        stem = os.path.splitext(os.path.basename(os.path.normpath(source)))[0].replace('%', '')
+        sequence_path = os.path.join(output_folder, stem + SEQUENCE_EXTENSION)
+        # 같은 파일이 이미 있으면 뒤에 이어서 쓰지 않고 새로 만듭니다.
+        if os.path.exists(sequence_path):
+            os.remove(sequence_path)
+        if stencil is None:
+            sequence_writer = SequenceWriter(sequence_path, triangles, FACE_LANDMARK_COUNT)
+        else:
+            sequence_writer = SequenceWriter(sequence_path, stencil.triangles, stencil.vertex_count)
+
+    decoder = threading.Thread(target=_run_stage, args=(decode, decoded, errors), daemon=True)
+    exporter = threading.Thread(target=_run_stage, args=(export, None, errors), daemon=True)
+    decoder.start()
+    exporter.start()
+
+    try:
+        with contextlib.ExitStack() as stack:
+            detector = stack.enter_context(FaceMeshSession(static_image_mode=False))
+            if roi:
+                detector = stack.enter_context(RoiFaceMesh(detector, scale=roi_scale))
+
+            while not errors:
+                item = decoded.get()
+                if item is _END_OF_STREAM:
+                    break
+                index, name, image = item
+                summary['frames'] += 1
+
+                with stage('detect', frame=index):
+                    landmarks = detector.process(image)
+                if landmarks is None:
+                    summary['no_face'] += 1
+                    print(f"Face not detected: frame {index}")
+                    if sequence_writer is not None and not _put_while_alive(detected, (name, None), exporter):
+                        break
+                    continue
+
+                # 내보내기 스레드로 넘기기 전에 배열 기반 메쉬로 바꿔서 다음 프레임 처리와 겹치지 않도록 합니다.
+                with stage('landmark_mesh'):
+                    mesh = LandmarkMesh.from_landmarks(landmarks, triangles)
+                # 내보내기 스레드가 오류로 끝났으면 더 기다리지 않고 멈춥니다.
+                if not _put_while_alive(detected, (name, mesh), exporter):
+                    break
+                summary['exported'] += 1
+    finally:
+        stop.set()
+        # 디코딩 스레드가 가득 찬 큐에서 멈춰 있지 않도록 남은 프레임을 비웁니다.
+        while decoder.is_alive():
+            try:
+                decoded.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        _put_while_alive(detected, _END_OF_STREAM, exporter)
+        exporter.join()
+        if sequence_writer is not None:
+            sequence_writer.close()
+
+    if errors:
+        raise errors[0]
+    return summary
+
+
+# ------------------명령줄 실행 부분-------------------------
+
+#   python faceConstruction.py folder "Render Result" "Exported Landmarks" --workers 8
+#   python faceConstruction.py sequence take01.mp4 out --format lmseq --roi
+#   python faceConstruction.py serve --port 8765
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract MediaPipe face meshes from renders, image sequences or videos.")
+    parser.add_argument('--profile', metavar='TRACE', help="write per-stage timings as a Chrome trace JSON")
+    parser.add_argument('--profile-memory', action='store_true', help="also record peak memory per stage")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    folder = commands.add_parser('folder', help="export one mesh per PNG in a folder")
+    folder.add_argument('input', help="folder containing rendered .png images")
+    folder.add_argument('output', help="folder to write meshes and the manifest to")
+    folder.add_argument('--workers', type=int, default=1, help="number of detector processes")
+    folder.add_argument('--format', dest='output_format', choices=sorted(MESH_FORMATS), default='obj')
+    folder.add_argument('--subdivision', type=int, default=0, choices=range(MAX_SUBDIVISION_LEVELS + 1),
+                        help="subdivision levels applied before export")
+    folder.add_argument('--no-resume', dest='resume', action='store_false', help="reprocess every image")
+    folder.add_argument('--no-cache', dest='use_cache', action='store_false', help="do not use the landmark cache")
+
+    sequence = commands.add_parser('sequence', help="export a video or image sequence frame by frame")
+    sequence.add_argument('source', help="video file, image folder or printf-style pattern")
+    sequence.add_argument('output', help="folder to write meshes to")
+    sequence.add_argument('--format', dest='output_format', choices=sorted(MESH_FORMATS) + ['lmseq'], default='obj')
+    sequence.add_argument('--subdivision', type=int, default=0, choices=range(MAX_SUBDIVISION_LEVELS + 1),
+                          help="subdivision levels applied before export")
+    sequence.add_argument('--prefetch', type=int, default=8, help="number of frames decoded ahead")
+    sequence.add_argument('--roi', action='store_true', help="track the face region instead of the full frame")
+    sequence.add_argument('--roi-scale', type=float, default=1.0)
+    sequence.add_argument('--reduction', type=int, default=1, choices=(1, 2, 4, 8),
+                          help="decode image sequences at 1/N resolution")
+
+    serve = commands.add_parser('serve', help="keep a detector warm and answer requests on localhost")
+    serve.add_argument('--host', default=None, help="address to bind (default: 127.0.0.1)")
+    serve.add_argument('--port', type=int, default=None, help="port to listen on (default: 8765)")
+    serve.add_argument('--no-cache', dest='use_cache', action='store_false', help="do not use the landmark cache")
+
+    args = parser.parse_args(argv)
+    if args.profile:
+        stageProfiler.profile_to(args.profile, args.profile_memory)
+
+    if args.command == 'folder':
+        summary = process_folder(args.input, args.output, workers=args.workers, resume=args.resume,
+                                 output_format=args.output_format, subdivision_levels=args.subdivision,
+                                 use_cache=args.use_cache)
+        return 1 if summary['failed'] else 0
+
+    if args.command == 'sequence':
+        summary = process_sequence(args.source, args.output, prefetch=args.prefetch, roi=args.roi,
+                                   roi_scale=args.roi_scale, reduction=args.reduction,
+                                   output_format=args.output_format, subdivision_levels=args.subdivision)
+        print(f"Sequence finished: {summary}")
+        return 0
+
+    from landmarkService import serve_forever
+    serve_forever(args.host, args.port, use_cache=args.use_cache)
+    return 0
+
+
+# (워커 프로세스가 이 모듈을 다시 import 할 때 배치가 실행되지 않도록 main 에서만 실행합니다)
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+import multiprocessing
+from multiprocessing import util
+
+import numpy as np
+
+from stageProfiler import stage
+
+# FaceMesh 기본 설정 (기존 get_face_mesh_coordinates 와 같은 값)
+DEFAULT_DETECTOR_SETTINGS = {
+    'static_image_mode': True,
+    'max_num_faces': 1,
+    'refine_landmarks': True,
+}
+
+
+# landmark 목록(protobuf)을 (N, 3) float32 배열로 바꿉니다. 이미 배열이면 그대로 돌려줍니다.
+def landmarks_to_array(landmarks):
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32)
+
+
+# FaceMesh 그래프를 한 번만 만들어 여러 이미지에 재사용하는 세션입니다.
+# with 문으로 사용하거나, 다 쓴 뒤 close()를 호출해 네이티브 리소스를 해제합니다.
+# mediapipe와 cv2는 불러오는 데 수 초가 걸리므로 landmark 배열만 다루는 모듈이 이 파일을 import 해도
+# 비용이 들지 않도록 세션을 처음 만들 때 불러옵니다.
+class FaceMeshSession:
+    def __init__(self, **settings):
+        import mediapipe as mp
+        self.settings = dict(DEFAULT_DETECTOR_SETTINGS, **settings)
+        self._face_mesh = mp.solutions.face_mesh.FaceMesh(**self.settings)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._face_mesh is None
+
+    def close(self):
+        if self._face_mesh is not None:
+            self._face_mesh.close()
+            self._face_mesh = None
+
+    # BGR 이미지에서 첫 번째 얼굴의 landmark 목록을 돌려줍니다. 얼굴이 없으면 None
+    def process(self, image):
+        if self._face_mesh is None:
+            raise RuntimeError("FaceMeshSession is closed")
+
+        import cv2
+        with stage('color_convert'):
+            rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        with stage('face_mesh'):
+            results = self._face_mesh.process(rgb)
+        if results.multi_face_landmarks:
+            return results.multi_face_landmarks[0].landmark
+        return None
+
+    def process_file(self, image_path):
+        import cv2
+        with stage('decode'):
+            image = cv2.imread(image_path)
+        if image is None:
+            raise OSError(f"Could not read image: {image_path}")
+        return self.process(image)
+
+
+# ------------------워커 프로세스 부분-------------------------
+
+# 각 워커 프로세스가 가지고 있는 세션
+_worker_session = None
+
+
+# 워커 프로세스 안에서 실행되는 함수가 현재 프로세스의 세션을 가져올 때 사용합니다.
+def get_worker_session():
+    if _worker_session is None:
+        raise RuntimeError("No FaceMesh session in this process; call from a DetectorPool worker")
+    return _worker_session
+
+
+def _init_worker(settings):
+    global _worker_session
+    _worker_session = FaceMeshSession(**settings)
+    # 워커가 종료될 때 세션도 함께 닫습니다.
+    util.Finalize(None, _worker_session.close, exitpriority=10)
+
+
+def _detect_file(image_path):
+    landmarks = _worker_session.process_file(image_path)
+    if landmarks is None:
+        return image_path, None
+    # protobuf 객체는 프로세스 간에 보낼 수 없으므로 배열로 바꿔서 돌려줍니다.
+    return image_path, landmarks_to_array(landmarks)
+
+
+# 워커 프로세스 N개가 각자 세션을 하나씩 유지하면서 이미지를 나눠서 처리합니다.
+class DetectorPool:
+    def __init__(self, processes=None, **settings):
+        self.settings = dict(DEFAULT_DETECTOR_SETTINGS, **settings)
+        self.processes = processes or multiprocessing.cpu_count()
+        # MediaPipe가 만든 네이티브 스레드를 fork로 복제하지 않도록 spawn 방식으로 워커를 띄웁니다.
+        context = multiprocessing.get_context("spawn")
+        self._pool = context.Pool(self.processes, initializer=_init_worker, initargs=(self.settings,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    # (image_path, landmark 배열 또는 None)을 입력 순서대로 돌려줍니다.
+    def imap(self, image_paths, chunksize=1):
+        return self._pool.imap(_detect_file, image_paths, chunksize)
+
+    # 임의의 함수를 워커에서 실행합니다. 함수 안에서는 get_worker_session()으로 세션을 가져옵니다.
+    def apply_async(self, func, args=()):
+        return self._pool.apply_async(func, args)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def terminate(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
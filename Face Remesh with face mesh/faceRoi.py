@@ -0,0 +1,135 @@
+import numpy as np
+
+from faceDetector import FaceMeshSession, landmarks_to_array
+
+# 이미지를 읽을 때 해상도를 줄여서 디코딩하는 OpenCV 플래그 이름
+# (cv2는 불러오는 시간이 길어서 실제로 이미지를 읽을 때 불러옵니다)
+REDUCED_DECODE_FLAGS = {
+    1: 'IMREAD_COLOR',
+    2: 'IMREAD_REDUCED_COLOR_2',
+    4: 'IMREAD_REDUCED_COLOR_4',
+    8: 'IMREAD_REDUCED_COLOR_8',
+}
+
+
+# 이미지를 1/reduction 해상도로 읽습니다. (reduction은 1, 2, 4, 8 중 하나)
+def imread_reduced(image_path, reduction=1):
+    if reduction not in REDUCED_DECODE_FLAGS:
+        raise ValueError(f"reduction must be one of {sorted(REDUCED_DECODE_FLAGS)}")
+    import cv2
+    return cv2.imread(image_path, getattr(cv2, REDUCED_DECODE_FLAGS[reduction]))
+
+
+# 정규화된 landmark 좌표에서 얼굴 영역을 구합니다.
+# 결과는 (중심 x, 중심 y, 한 변의 픽셀 크기)이며, margin은 얼굴 크기에 대한 여백 비율입니다.
+def estimate_face_box(landmarks, width, height, margin=0.25):
+    points = landmarks_to_array(landmarks)
+    x0, y0 = points[:, 0].min(), points[:, 1].min()
+    x1, y1 = points[:, 0].max(), points[:, 1].max()
+
+    size = max((x1 - x0) * width, (y1 - y0) * height) * (1 + 2 * margin)
+    size = int(min(np.ceil(size), width, height))
+    return float((x0 + x1) / 2), float((y0 + y1) / 2), size
+
+
+# 얼굴 영역을 프레임 안쪽의 픽셀 경계(x0, y0, x1, y1)로 바꿉니다.
+# 영역이 프레임 밖으로 나가면 크기는 유지한 채 안쪽으로 밀어 넣어서 잘린 이미지 크기가 항상 같도록 합니다.
+def box_to_pixels(box, width, height):
+    center_x, center_y, size = box
+    px0 = int(np.clip(round(center_x * width - size / 2), 0, width - size))
+    py0 = int(np.clip(round(center_y * height - size / 2), 0, height - size))
+    return px0, py0, px0 + size, py0 + size
+
+
+# 이미지에서 얼굴 영역만 잘라냅니다. 자르기는 복사 없이 배열 view로 처리되며
+# scale이 1보다 작으면 잘라낸 영역만 축소합니다.
+def crop_face(image, box, scale=1.0):
+    height, width = image.shape[:2]
+    px0, py0, px1, py1 = box_to_pixels(box, width, height)
+    crop = image[py0:py1, px0:px1]
+
+    if scale != 1.0:
+        import cv2
+        crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # 실제로 잘린 픽셀 경계를 정규화 좌표로 함께 돌려줍니다.
+    crop_box = (px0 / width, py0 / height, px1 / width, py1 / height)
+    return crop, crop_box
+
+
+# 잘라낸 영역 기준의 landmark 좌표를 전체 프레임 기준의 정규화 좌표로 되돌립니다.
+# MediaPipe의 z는 이미지 너비와 같은 스케일이므로 영역 너비 비율만큼 같이 줄여 줍니다.
+def map_to_full_frame(landmarks, crop_box):
+    points = landmarks_to_array(landmarks).astype(np.float32, copy=True)
+    x0, y0, x1, y1 = crop_box
+    box_width = x1 - x0
+    box_height = y1 - y0
+
+    points[:, 0] = x0 + points[:, 0] * box_width
+    points[:, 1] = y0 + points[:, 1] * box_height
+    points[:, 2] *= box_width
+    return points
+
+
+# FaceMeshSession을 감싸서 얼굴 영역만 잘라 변환과 추론을 수행하는 ROI 모드입니다.
+# 첫 프레임(또는 얼굴을 놓친 프레임)은 전체 프레임에서 찾고, 이후에는 이전 프레임의 landmark로 영역을 옮깁니다.
+# 결과는 항상 전체 프레임 기준의 정규화 좌표 배열이라 export_landmarks_to_obj에 그대로 넘길 수 있습니다.
+#
+# tracking 모드 세션은 입력 크기가 바뀌면 추적을 놓치므로, 잘린 영역의 크기는 고정하고 위치만 옮기며
+# 전체 프레임 검출은 별도의 static 세션으로 처리합니다.
+class RoiFaceMesh:
+    def __init__(self, session, margin=0.25, scale=1.0):
+        self.session = session
+        self.margin = margin
+        self.scale = scale
+        self.box = None
+
+        if session.settings.get('static_image_mode', True):
+            self._full_frame_session = session
+        else:
+            settings = dict(session.settings, static_image_mode=True)
+            self._full_frame_session = FaceMeshSession(**settings)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # 따로 만든 static 세션만 닫습니다. 넘겨받은 세션은 호출한 쪽에서 닫습니다.
+    def close(self):
+        if self._full_frame_session is not self.session:
+            self._full_frame_session.close()
+
+    def reset(self):
+        self.box = None
+
+    def process(self, image):
+        height, width = image.shape[:2]
+
+        if self.box is not None:
+            crop, crop_box = crop_face(image, self.box, self.scale)
+            landmarks = self.session.process(crop)
+            if landmarks is not None:
+                points = map_to_full_frame(landmarks, crop_box)
+                self._update_box(points, width, height)
+                return points
+
+        # 영역이 없거나 영역 안에서 얼굴을 놓치면 전체 프레임에서 다시 찾습니다.
+        landmarks = self._full_frame_session.process(image)
+        if landmarks is None:
+            self.box = None
+            return None
+
+        points = landmarks_to_array(landmarks)
+        self.box = estimate_face_box(points, width, height, self.margin)
+        return points
+
+    # 영역 크기는 유지하고 중심만 얼굴을 따라 옮깁니다.
+    # 얼굴이 영역보다 커진 경우에만 크기를 다시 정합니다.
+    def _update_box(self, points, width, height):
+        center_x, center_y, size = estimate_face_box(points, width, height, self.margin / 2)
+        if size > self.box[2]:
+            self.box = estimate_face_box(points, width, height, self.margin)
+        else:
+            self.box = (center_x, center_y, self.box[2])
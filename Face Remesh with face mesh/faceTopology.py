@@ -0,0 +1,107 @@
+import os
+from importlib import metadata
+
+import numpy as np
+
+# 캐시 파일 형식이 바뀌면 이 값을 올려서 이전 캐시를 무시하도록 합니다.
+TOPOLOGY_CACHE_VERSION = 1
+
+# 삼각형 테이블 캐시가 저장될 기본 폴더
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "face_remesh")
+
+# 프로세스 안에서 한 번 만든 삼각형 테이블을 재사용하기 위한 저장소
+_triangle_table = None
+
+
+def get_mediapipe_version():
+    try:
+        return metadata.version("mediapipe")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def get_topology_cache_path(cache_dir=None):
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    filename = f"tesselation_v{TOPOLOGY_CACHE_VERSION}_mediapipe-{get_mediapipe_version()}.npy"
+    return os.path.join(cache_dir, filename)
+
+
+# FACEMESH_TESSELATION 연결 정보에서 삼각형 인덱스 배열(N x 3, int32)을 만듭니다.
+# faceConstruction.create_faces 와 같은 규칙으로 면을 찾지만 정점 객체 없이 인덱스만 다룹니다.
+def build_triangles(connections):
+    edge_hash_table = {}
+    for idx1, idx2 in connections:
+        edge_hash_table.setdefault(idx1, []).append(idx2)
+
+    triangles = []
+    used_edges = set()
+    existing_faces = set()  # 이미 생성된 면을 추적하기 위한 집합
+
+    for v_id in sorted(edge_hash_table):
+        for next_vertex_id in edge_hash_table[v_id]:
+            if (v_id, next_vertex_id) in used_edges:
+                continue
+
+            if next_vertex_id not in edge_hash_table:
+                continue
+
+            for third_vertex_id in edge_hash_table[next_vertex_id]:
+                if third_vertex_id == v_id or (next_vertex_id, third_vertex_id) in used_edges:
+                    continue
+
+                sorted_vertex_ids = tuple(sorted([v_id, next_vertex_id, third_vertex_id]))
+
+                if v_id in edge_hash_table.get(third_vertex_id, ()):  # 면 완성 확인
+                    if sorted_vertex_ids not in existing_faces:  # 면 중복 확인
+                        triangles.append((v_id, next_vertex_id, third_vertex_id))
+                        used_edges.add((v_id, next_vertex_id))
+                        existing_faces.add(sorted_vertex_ids)
+                        break
+
+    return np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+
+
+def _load_cached_triangles(cache_path):
+    try:
+        triangles = np.load(cache_path, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+    if triangles.dtype != np.int32 or triangles.ndim != 2 or triangles.shape[1] != 3:
+        return None
+    return triangles
+
+
+def _save_cached_triangles(cache_path, triangles):
+    # 여러 프로세스가 동시에 쓰더라도 깨진 파일이 남지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.save(file, triangles)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write topology cache: {e}")
+
+
+# 얼굴 메쉬의 삼각형 테이블을 돌려줍니다.
+# 메모리 -> 디스크 캐시 -> MediaPipe 연결 정보 순서로 찾고, 한 번 만든 결과는 계속 재사용합니다.
+def get_face_triangles(cache_dir=None, use_disk_cache=True):
+    global _triangle_table
+
+    if _triangle_table is not None:
+        return _triangle_table
+
+    cache_path = get_topology_cache_path(cache_dir)
+    triangles = _load_cached_triangles(cache_path) if use_disk_cache else None
+
+    if triangles is None:
+        import mediapipe as mp
+        triangles = build_triangles(mp.solutions.face_mesh.FACEMESH_TESSELATION)
+        if use_disk_cache:
+            _save_cached_triangles(cache_path, triangles)
+
+    # 모든 프레임이 같은 배열을 공유하므로 실수로 수정되지 않도록 읽기 전용으로 둡니다.
+    triangles.setflags(write=False)
+    _triangle_table = triangles
+    return _triangle_table
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from faceTopology import DEFAULT_CACHE_DIR, get_mediapipe_version
+
+# 이미지 내용 해시로 찾는 landmark 캐시입니다.
+# 같은 이미지를 같은 FaceMesh 설정으로 다시 처리할 때 디코딩과 추론을 건너뛰고 저장해 둔 (N, 3) 배열을 사용합니다.
+# 키는 (이미지 SHA1, 검출기 설정, mediapipe 버전)이므로 설정이나 모델이 바뀌면 자연스럽게 새로 계산합니다.
+# 파일마다 landmark 배열 하나를 .npy로 저장하고, 전체 크기가 max_bytes를 넘으면 가장 오래 쓰지 않은 파일부터 지웁니다.
+# (사용 시각은 파일 mtime으로 기록하므로 여러 프로세스가 같은 폴더를 함께 써도 됩니다)
+# 전체 크기는 프로세스마다 자기가 쓴 만큼 더해 가다가, max_bytes * RESCAN_RATIO 만큼 쓸 때마다 폴더를 다시 훑어서
+# 다른 프로세스(DetectorPool 워커 등)가 쓴 파일까지 반영합니다. 그래서 워커가 여럿이어도 폴더는 대략
+# max_bytes * (1 + 워커 수 * RESCAN_RATIO) 안에서 정리됩니다.
+
+# 캐시 파일 형식이 바뀌면 이 값을 올려서 이전 캐시를 무시하도록 합니다.
+LANDMARK_CACHE_VERSION = 1
+
+# 기본 크기 제한 (478개 landmark 기준 파일 하나가 약 6KB)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# 크기 제한을 넘으면 이 비율까지 줄여서 쓸 때마다 정리하지 않도록 합니다.
+EVICT_TARGET_RATIO = 0.9
+
+# 이 비율만큼 쓸 때마다 폴더 전체 크기를 다시 계산합니다.
+RESCAN_RATIO = 0.02
+
+# 얼굴을 찾지 못한 결과는 (0, 3) 배열로 저장해서 다음에도 추론하지 않습니다.
+_NO_FACE = np.empty((0, 3), dtype=np.float32)
+
+# 프로세스마다 폴더/설정별 캐시 객체를 하나씩 두고 크기 계산을 공유합니다.
+_caches = {}
+
+
+class LandmarkCache:
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, settings=None):
+        self._root = cache_dir
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"landmarks_v{LANDMARK_CACHE_VERSION}")
+        self.max_bytes = max_bytes
+        self.settings = dict(settings or {})
+        settings_text = json.dumps(self.settings, sort_keys=True)
+        self._salt = f"{settings_text}|mediapipe-{get_mediapipe_version()}".encode('utf-8')
+        self._size = None  # 처음 쓸 때 폴더를 훑어서 계산합니다.
+        self._unscanned = 0  # 마지막으로 폴더를 훑은 뒤 이 프로세스가 쓴 크기
+
+    # 워커 프로세스로 보낼 때는 설정만 보내고, 워커 안에서는 그 프로세스의 캐시 객체를 사용합니다.
+    def __reduce__(self):
+        return get_landmark_cache, (self._root, self.max_bytes, self.settings)
+
+    def key_for(self, content_hash):
+        return hashlib.sha1(self._salt + content_hash.encode('ascii')).hexdigest()
+
+    def path_for(self, content_hash):
+        key = self.key_for(content_hash)
+        return os.path.join(self.cache_dir, key[:2], key + ".npy")
+
+    # (찾았는지 여부, landmark 배열 또는 얼굴이 없으면 None)을 돌려줍니다.
+    def get(self, content_hash):
+        path = self.path_for(content_hash)
+        try:
+            landmarks = np.load(path, allow_pickle=False)
+        except (OSError, ValueError):
+            return False, None
+
+        if landmarks.dtype != np.float32 or landmarks.ndim != 2 or landmarks.shape[1] != 3:
+            return False, None
+
+        # 최근에 사용한 파일이 마지막에 지워지도록 사용 시각을 갱신합니다.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True, (landmarks if len(landmarks) else None)
+
+    def put(self, content_hash, landmarks):
+        path = self.path_for(content_hash)
+        landmarks = _NO_FACE if landmarks is None else np.ascontiguousarray(landmarks, dtype=np.float32)
+
+        # 여러 프로세스가 동시에 쓰더라도 깨진 파일이 남지 않도록 임시 파일에 쓴 뒤 교체합니다.
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as file:
+                np.save(file, landmarks)
+            # 같은 키를 다시 쓰면 기존 파일을 덮어쓰므로 늘어난 크기만 더합니다.
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            written = os.path.getsize(path) - replaced
+        except OSError as e:
+            print(f"Could not write landmark cache: {e}")
+            return
+
+        self._unscanned += written
+        if self._size is None or self._unscanned >= self.max_bytes * RESCAN_RATIO:
+            self._size = self._scan_size()
+            self._unscanned = 0
+        else:
+            self._size += written
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        for root, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith(".npy"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, filename))
+                except OSError:
+                    continue  # 다른 프로세스가 먼저 지운 파일
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(root, filename)))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    # 전체 크기가 max_bytes * EVICT_TARGET_RATIO 이하가 될 때까지 가장 오래 쓰지 않은 파일부터 지웁니다.
+    def evict(self):
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            size -= entry_size
+        self._size = size
+        self._unscanned = 0
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._size = 0
+        self._unscanned = 0
+
+
+# 같은 폴더와 설정이면 현재 프로세스에서 이미 만든 캐시 객체를 돌려줍니다.
+def get_landmark_cache(cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, settings=None):
+    key = (cache_dir, max_bytes, json.dumps(settings or {}, sort_keys=True))
+    if key not in _caches:
+        _caches[key] = LandmarkCache(cache_dir, max_bytes, settings)
+    return _caches[key]
@@ -0,0 +1,77 @@
+import numpy as np
+
+from faceDetector import landmarks_to_array
+
+
+# 정점 위치, 삼각형, 정점별 속성을 각각 하나의 배열로 들고 있는 얼굴 메쉬입니다.
+# (기존 Vertex/Face 객체 목록 대신 사용합니다)
+#
+#   positions  : (N, 3) float32
+#   triangles  : (T, 3) int32, 보통 faceTopology의 읽기 전용 테이블을 모든 프레임이 공유합니다.
+#   attributes : {이름: (N, ...) 배열} 형태의 정점별 추가 데이터
+#
+# 정점 하나, 좌표축 하나를 꺼낼 때는 복사 없이 배열 view를 돌려줍니다.
+class LandmarkMesh:
+    __slots__ = ('positions', 'triangles', 'attributes')
+
+    def __init__(self, positions, triangles, attributes=None):
+        self.positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        self.triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+        self.attributes = {}
+
+        for name, values in (attributes or {}).items():
+            self.set_attribute(name, values)
+
+    # MediaPipe landmark 목록(또는 (N, 3) 배열)에서 메쉬를 만듭니다.
+    @classmethod
+    def from_landmarks(cls, landmarks, triangles):
+        return cls(landmarks_to_array(landmarks), triangles)
+
+    @property
+    def vertex_count(self):
+        return len(self.positions)
+
+    @property
+    def triangle_count(self):
+        return len(self.triangles)
+
+    # 좌표축별 view
+    @property
+    def x(self):
+        return self.positions[:, 0]
+
+    @property
+    def y(self):
+        return self.positions[:, 1]
+
+    @property
+    def z(self):
+        return self.positions[:, 2]
+
+    def vertex(self, index):
+        return self.positions[index]
+
+    # 삼각형별 꼭짓점 좌표 (T, 3, 3)
+    def triangle_positions(self):
+        return self.positions[self.triangles]
+
+    def set_attribute(self, name, values):
+        values = np.asarray(values)
+        if len(values) != self.vertex_count:
+            raise ValueError(f"Attribute '{name}' has {len(values)} values for {self.vertex_count} vertices")
+        self.attributes[name] = values
+
+    def get_attribute(self, name, default=None):
+        return self.attributes.get(name, default)
+
+    # 삼각형 테이블과 속성은 공유하고 위치만 바꾼 새 메쉬를 돌려줍니다.
+    def with_positions(self, positions):
+        mesh = LandmarkMesh.__new__(LandmarkMesh)
+        mesh.positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        mesh.triangles = self.triangles
+        mesh.attributes = self.attributes
+        return mesh
+
+    def copy(self):
+        return LandmarkMesh(self.positions.copy(), self.triangles,
+                            {name: values.copy() for name, values in self.attributes.items()})
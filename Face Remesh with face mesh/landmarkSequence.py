@@ -0,0 +1,173 @@
+import os
+import struct
+
+import numpy as np
+
+# 여러 프레임의 landmark 좌표를 파일 하나에 담는 시퀀스 형식입니다.
+#
+#   [헤더 64 bytes][삼각형 테이블 int32 (T, 3)][패딩][프레임 float32 (F, N, 3)]
+#
+# 삼각형 테이블은 모든 프레임이 공유하므로 한 번만 저장하고, 프레임 블록은 64 bytes 경계에서 시작하여
+# numpy.memmap으로 바로 열 수 있습니다. 프레임은 파일 끝에 이어 붙이며 헤더의 프레임 수만 갱신합니다.
+# 블렌더의 파이썬에도 numpy가 있으므로 블렌더 안에서도 이 모듈로 바로 읽을 수 있습니다.
+
+SEQUENCE_MAGIC = b'FRLMSEQ\0'
+SEQUENCE_VERSION = 1
+SEQUENCE_EXTENSION = '.lmseq'
+
+# magic, version, 정점 수, 삼각형 수, 프레임 수, 프레임 블록 시작 위치
+_HEADER = struct.Struct('<8sIIIIQ')
+HEADER_SIZE = 64
+FRAME_ALIGNMENT = 64
+
+_FRAME_COUNT_OFFSET = 8 + 4 * 3
+
+
+def _frames_offset(triangle_count):
+    end = HEADER_SIZE + triangle_count * 3 * 4
+    return (end + FRAME_ALIGNMENT - 1) // FRAME_ALIGNMENT * FRAME_ALIGNMENT
+
+
+def read_header(file):
+    file.seek(0)
+    data = file.read(_HEADER.size)
+    if len(data) < _HEADER.size:
+        raise ValueError("Not a landmark sequence file (file too short)")
+
+    magic, version, landmark_count, triangle_count, frame_count, frames_offset = _HEADER.unpack(data)
+    if magic != SEQUENCE_MAGIC:
+        raise ValueError("Not a landmark sequence file")
+    if version != SEQUENCE_VERSION:
+        raise ValueError(f"Unsupported landmark sequence version: {version}")
+
+    return {
+        'landmark_count': landmark_count,
+        'triangle_count': triangle_count,
+        'frame_count': frame_count,
+        'frames_offset': frames_offset,
+    }
+
+
+# 빈 시퀀스 파일(프레임 0개)을 만듭니다.
+def create_sequence(filename, triangles, landmark_count):
+    triangles = np.ascontiguousarray(triangles, dtype='<i4').reshape(-1, 3)
+    frames_offset = _frames_offset(len(triangles))
+
+    header = _HEADER.pack(SEQUENCE_MAGIC, SEQUENCE_VERSION, landmark_count, len(triangles), 0, frames_offset)
+    with open(filename, 'wb') as file:
+        file.write(header.ljust(HEADER_SIZE, b'\0'))
+        file.write(triangles.tobytes())
+        file.write(b'\0' * (frames_offset - file.tell()))
+
+
+# 시퀀스 파일 끝에 프레임을 이어 붙입니다. 스트리밍 처리 중에 한 프레임씩 추가할 수 있으며,
+# 파일이 이미 있으면 삼각형 테이블과 정점 수가 같은지 확인한 뒤 그 뒤에 이어서 씁니다.
+class SequenceWriter:
+    def __init__(self, filename, triangles, landmark_count):
+        triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+
+        if not os.path.exists(filename):
+            create_sequence(filename, triangles, landmark_count)
+
+        self.filename = filename
+        self.landmark_count = landmark_count
+        self._file = open(filename, 'r+b')
+
+        header = read_header(self._file)
+        self._file.seek(HEADER_SIZE)
+        stored = np.frombuffer(self._file.read(header['triangle_count'] * 12), dtype='<i4').reshape(-1, 3)
+        if header['landmark_count'] != landmark_count or not np.array_equal(stored, triangles):
+            self._file.close()
+            raise ValueError(f"Existing sequence has a different topology: {filename}")
+
+        self.frame_count = header['frame_count']
+        self._frame_size = landmark_count * 3 * 4
+        self._frames_offset = header['frames_offset']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.frame_count
+
+    # 프레임 하나를 추가합니다. None을 넘기면 얼굴을 찾지 못한 프레임으로 보고 NaN으로 채웁니다.
+    def append(self, positions):
+        if positions is None:
+            frame = np.full((self.landmark_count, 3), np.nan, dtype='<f4')
+        else:
+            frame = np.ascontiguousarray(positions, dtype='<f4')
+            if frame.shape != (self.landmark_count, 3):
+                raise ValueError(f"Expected frame shape ({self.landmark_count}, 3), got {frame.shape}")
+
+        # 중간에 끊긴 쓰기가 있더라도 헤더의 프레임 수 위치부터 덮어씁니다.
+        self._file.seek(self._frames_offset + self.frame_count * self._frame_size)
+        self._file.write(frame.tobytes())
+        self.frame_count += 1
+
+        # 프레임을 다 쓴 뒤에 헤더를 갱신해서, 중단되더라도 헤더는 완전한 프레임만 가리키도록 합니다.
+        self._file.seek(_FRAME_COUNT_OFFSET)
+        self._file.write(struct.pack('<I', self.frame_count))
+        return self.frame_count - 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+# 시퀀스 파일을 memmap으로 엽니다. 어떤 프레임이든 텍스트 파싱 없이 바로 접근할 수 있습니다.
+class LandmarkSequence:
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, 'rb') as file:
+            header = read_header(file)
+
+        self.landmark_count = header['landmark_count']
+        self.frame_count = header['frame_count']
+
+        self.triangles = np.memmap(filename, dtype='<i4', mode='r', offset=HEADER_SIZE,
+                                   shape=(header['triangle_count'], 3))
+        if self.frame_count:
+            self.frames = np.memmap(filename, dtype='<f4', mode='r', offset=header['frames_offset'],
+                                    shape=(self.frame_count, self.landmark_count, 3))
+        else:
+            self.frames = np.empty((0, self.landmark_count, 3), dtype='<f4')
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, index):
+        return self.frames[index]
+
+    # 얼굴을 찾지 못해 NaN으로 채워진 프레임인지 확인합니다.
+    def is_missing(self, index):
+        return bool(np.isnan(self.frames[index, 0, 0]))
+
+
+def open_sequence(filename):
+    return LandmarkSequence(filename)
+
+
+# OBJ(Y-up) 좌표를 블렌더(Z-up) 좌표로 바꾸는 회전 (블렌더 OBJ import 기본 축 설정과 같음)
+OBJ_TO_BLENDER_AXES = np.array([
+    [1.0, 0.0, 0.0],
+    [0.0, 0.0, -1.0],
+    [0.0, 1.0, 0.0],
+])
+
+
+# 블렌더 메쉬의 정점 좌표를 시퀀스의 한 프레임으로 바꿉니다.
+# mesh는 bpy.types.Mesh이며, 정점 순서는 시퀀스의 landmark 순서와 같아야 합니다.
+# OBJ를 import 해서 만든 메쉬라면 axes=OBJ_TO_BLENDER_AXES 를 넘겨 import 때와 같은 축 변환을 적용합니다.
+def apply_frame_to_mesh(mesh, sequence, index, axes=None):
+    frame = np.asarray(sequence[index], dtype=np.float32)
+    if axes is not None:
+        frame = frame @ np.asarray(axes, dtype=np.float32).T
+    frame = np.ascontiguousarray(frame)
+    mesh.vertices.foreach_set("co", frame.ravel())
+    mesh.update()
@@ -0,0 +1,225 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from faceDetector import DEFAULT_DETECTOR_SETTINGS, FaceMeshSession, landmarks_to_array
+from faceTopology import get_face_triangles
+from landmarkCache import DEFAULT_MAX_BYTES, get_landmark_cache
+from landmarkMesh import LandmarkMesh
+from meshIO import MESH_FORMATS, encode_mesh
+from meshSubdivision import MAX_SUBDIVISION_LEVELS
+from stageProfiler import stage
+
+# FaceMesh 세션을 띄워 둔 채로 요청을 받는 localhost HTTP 서비스입니다.
+# 블렌더 세션처럼 매번 새 파이썬 프로세스를 띄우면 mediapipe를 불러오는 데만 수 초가 걸리므로,
+# 서비스를 한 번 실행해 두고 이미지 바이트나 경로를 보내서 landmark 배열이나 메쉬 파일 내용을 받습니다.
+#
+#   python faceConstruction.py serve --port 8765
+#
+#   POST /landmarks?format=<형식>&subdivision=<단계>
+#       본문: 이미지 파일 바이트, 또는 {"path": "<이미지 경로>"} (Content-Type: application/json)
+#       format: landmarks (정규화 좌표 .npy, 기본값), json, obj, ply, npy (카메라 좌표 메쉬, faceConstruction 출력과 같음)
+#       subdivision: 0 ~ MAX_SUBDIVISION_LEVELS (범위를 벗어나면 400)
+#       얼굴을 찾지 못하면 422를 돌려줍니다.
+#   GET /health
+#
+# 서버 컴퓨터의 파일 경로를 받을 수 있으므로 기본적으로 127.0.0.1에만 연결합니다.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+RESPONSE_FORMATS = ('landmarks', 'json') + tuple(MESH_FORMATS)
+
+# 한 요청에서 받는 이미지의 최대 크기
+MAX_REQUEST_BYTES = 256 * 1024 * 1024
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# 세션 하나를 여러 요청 스레드가 나눠 쓰므로 추론 부분만 잠급니다. (디코딩과 응답 변환은 동시에 진행)
+class LandmarkService:
+    def __init__(self, settings=None, use_cache=True, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+        self.settings = dict(DEFAULT_DETECTOR_SETTINGS, **(settings or {}))
+        self.session = FaceMeshSession(**self.settings)
+        self.cache = get_landmark_cache(cache_dir, cache_max_bytes, self.settings) if use_cache else None
+        self.triangles = get_face_triangles()
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    def close(self):
+        self.session.close()
+
+    # 이미지 바이트에서 (N, 3) 정규화 landmark 배열을 찾습니다. 얼굴이 없으면 None
+    def detect(self, data):
+        content_hash = hashlib.sha1(data).hexdigest()
+        if self.cache is not None:
+            with stage('cache_lookup'):
+                cached, landmarks = self.cache.get(content_hash)
+            if cached:
+                return landmarks
+
+        import cv2
+        with stage('decode'):
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise RequestError(400, "Could not decode image")
+
+        with self._lock:
+            landmarks = self.session.process(image)
+        if landmarks is not None:
+            landmarks = landmarks_to_array(landmarks)
+        if self.cache is not None:
+            self.cache.put(content_hash, landmarks)
+        return landmarks
+
+    # 응답 (Content-Type, 본문)을 만듭니다.
+    def encode(self, landmarks, response_format, subdivision_levels=0):
+        if response_format == 'landmarks':
+            buffer = io.BytesIO()
+            np.save(buffer, np.asarray(landmarks, dtype=np.float32))
+            return 'application/octet-stream', buffer.getvalue()
+        if response_format == 'json':
+            return 'application/json', json.dumps({'landmarks': landmarks.tolist()}).encode('utf-8')
+
+        from faceConstruction import export_arrays
+        mesh = LandmarkMesh(landmarks, self.triangles)
+        positions, triangles = export_arrays(mesh, subdivision_levels=subdivision_levels)
+        content_type = 'text/plain' if response_format == 'obj' else 'application/octet-stream'
+        return content_type, encode_mesh(positions, triangles, response_format)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if urllib.parse.urlparse(self.path).path != '/health':
+            self._send_error(RequestError(404, "Unknown path"))
+            return
+        service = self.server.service
+        body = json.dumps({'status': 'ok', 'settings': service.settings, 'requests': service.requests})
+        self._send(200, 'application/json', body.encode('utf-8'))
+
+    def do_POST(self):
+        try:
+            url = urllib.parse.urlparse(self.path)
+            if url.path != '/landmarks':
+                raise RequestError(404, "Unknown path")
+            query = urllib.parse.parse_qs(url.query)
+            response_format = query.get('format', ['landmarks'])[0]
+            if response_format not in RESPONSE_FORMATS:
+                raise RequestError(400, f"format must be one of {', '.join(RESPONSE_FORMATS)}")
+            try:
+                subdivision_levels = int(query.get('subdivision', ['0'])[0])
+            except ValueError:
+                raise RequestError(400, "subdivision must be an integer")
+            if not 0 <= subdivision_levels <= MAX_SUBDIVISION_LEVELS:
+                raise RequestError(400, f"subdivision must be between 0 and {MAX_SUBDIVISION_LEVELS}")
+
+            service = self.server.service
+            with stage('request', format=response_format):
+                landmarks = service.detect(self._read_image())
+            service.requests += 1
+            if landmarks is None:
+                raise RequestError(422, "Face not detected")
+            self._send(200, *service.encode(landmarks, response_format, subdivision_levels))
+        except RequestError as e:
+            self._send_error(e)
+        except Exception as e:
+            self._send_error(RequestError(500, f"{type(e).__name__}: {e}"))
+
+    def _read_image(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if length <= 0 or length > MAX_REQUEST_BYTES:
+            raise RequestError(400, "Request body must contain an image")
+        data = self.rfile.read(length)
+
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            try:
+                path = json.loads(data)['path']
+                with open(path, 'rb') as file:
+                    return file.read()
+            except (ValueError, KeyError, TypeError):
+                raise RequestError(400, 'JSON body must be {"path": "<image path>"}')
+            except OSError as e:
+                raise RequestError(400, f"Could not read image: {e}")
+        return data
+
+    def _send(self, status, content_type, body, close=False):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if close:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    # 오류가 난 요청은 본문을 다 읽지 않았을 수 있으므로 (너무 큰 이미지 등) 응답 후 연결을 닫습니다.
+    # 연결을 유지하면 남은 본문이 다음 요청으로 읽힙니다.
+    def _send_error(self, error):
+        self._send(error.status, 'application/json', json.dumps({'error': str(error)}).encode('utf-8'), close=True)
+
+    # 요청마다 출력하지 않습니다.
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(host=None, port=None, **service_options):
+    server = ThreadingHTTPServer((host or DEFAULT_HOST, DEFAULT_PORT if port is None else port), _RequestHandler)
+    server.daemon_threads = True
+    server.service = LandmarkService(**service_options)
+    return server
+
+
+# Ctrl+C로 멈출 때까지 요청을 처리합니다.
+def serve_forever(host=None, port=None, **service_options):
+    server = create_server(host, port, **service_options)
+    host, port = server.server_address[:2]
+    print(f"Landmark service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+
+
+# ------------------클라이언트 부분-------------------------
+
+# 블렌더 등 다른 프로세스에서 서비스에 요청을 보냅니다. (표준 라이브러리와 numpy만 사용)
+# image는 이미지 바이트 또는 파일 경로입니다. 얼굴을 찾지 못하면 None을 돌려줍니다.
+def request_mesh(image, response_format='obj', subdivision_levels=0, host=None, port=None, timeout=30.0):
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        body, content_type = bytes(image), 'application/octet-stream'
+    else:
+        body, content_type = json.dumps({'path': os.path.abspath(image)}).encode('utf-8'), 'application/json'
+
+    query = urllib.parse.urlencode({'format': response_format, 'subdivision': subdivision_levels})
+    url = f"http://{host or DEFAULT_HOST}:{DEFAULT_PORT if port is None else port}/landmarks?{query}"
+    request = urllib.request.Request(url, data=body, headers={'Content-Type': content_type})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read()
+    except urllib.error.HTTPError as e:
+        if e.code == 422:
+            return None
+        raise RuntimeError(f"Landmark service error {e.code}: {e.read().decode('utf-8', 'replace')}") from None
+
+
+# 정규화 landmark 배열 (N, 3) float32를 받습니다.
+def request_landmarks(image, host=None, port=None, timeout=30.0):
+    data = request_mesh(image, 'landmarks', host=host, port=port, timeout=timeout)
+    return None if data is None else np.load(io.BytesIO(data), allow_pickle=False)
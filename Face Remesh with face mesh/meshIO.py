@@ -0,0 +1,310 @@
+import io
+import os
+
+import numpy as np
+
+# 렌더링 환경 기본값 (Readme: Orthographic, Orthographic scale = 1, 1920x1080)
+DEFAULT_RENDER_WIDTH = 1920
+DEFAULT_RENDER_HEIGHT = 1080
+DEFAULT_ORTHO_SCALE = 1.0
+
+# 지원하는 출력 형식과 확장자
+MESH_FORMATS = {
+    'obj': '.obj',
+    'ply': '.ply',
+    'npy': '.npy',
+}
+
+
+# 정규화된 landmark 좌표를 블렌더 카메라 좌표로 옮기는 변환 (center, scale)을 만듭니다.
+# 변환은 (points - center) * scale 로 한 번에 적용됩니다.
+# 블렌더의 orthographic scale은 긴 변의 길이에 해당하고, MediaPipe의 z는 이미지 너비 기준 값입니다.
+def orthographic_transform(width=DEFAULT_RENDER_WIDTH, height=DEFAULT_RENDER_HEIGHT, ortho_scale=DEFAULT_ORTHO_SCALE):
+    if width >= height:
+        scale_x = ortho_scale
+        scale_y = ortho_scale * height / width
+    else:
+        scale_x = ortho_scale * width / height
+        scale_y = ortho_scale
+
+    center = np.array([0.5, 0.5, 0.0])
+    # 이미지의 y축은 아래 방향, MediaPipe의 z축은 카메라 쪽이 음수이므로 부호를 뒤집습니다.
+    scale = np.array([scale_x, -scale_y, -scale_x])
+    return center, scale
+
+
+DEFAULT_CAMERA_TRANSFORM = orthographic_transform()
+
+
+# (N, 3) landmark 배열 전체에 카메라 변환을 적용합니다. 결과는 float64 배열입니다.
+def apply_camera_transform(points, transform=None):
+    center, scale = transform if transform is not None else DEFAULT_CAMERA_TRANSFORM
+    return (np.asarray(points, dtype=np.float64) - center) * scale
+
+
+# ------------------파일 쓰기 부분-------------------------
+
+# 정점과 면을 하나의 문자열로 만든 뒤 한 번에 씁니다.
+# 정점 값은 파이썬 float의 repr 형식으로 기록되어 기존 OBJ 출력과 같은 숫자가 나옵니다.
+def obj_text(positions, triangles):
+    positions = np.asarray(positions, dtype=np.float64)
+    triangles = np.asarray(triangles)
+
+    buffer = io.StringIO()
+    buffer.write(("v %r %r %r\n" * len(positions)) % tuple(positions.ravel().tolist()))
+    # OBJ 파일의 인덱스는 1부터 시작하므로 1을 더합니다.
+    buffer.write(("f %d %d %d\n" * len(triangles)) % tuple((triangles + 1).ravel().tolist()))
+    return buffer.getvalue()
+
+
+def write_obj(filename, positions, triangles):
+    with open(filename, 'w') as file:
+        file.write(obj_text(positions, triangles))
+
+
+# binary little endian PLY 내용입니다. 정점은 float32, 면은 (개수, 인덱스 3개) 형식입니다.
+def ply_bytes(positions, triangles):
+    positions = np.ascontiguousarray(positions, dtype='<f4')
+    triangles = np.asarray(triangles)
+
+    faces = np.empty(len(triangles), dtype=[('count', 'u1'), ('indices', '<i4', (3,))])
+    faces['count'] = 3
+    faces['indices'] = triangles
+
+    header = (
+        "ply\n"
+        "format binary_little_endian 1.0\n"
+        f"element vertex {len(positions)}\n"
+        "property float x\n"
+        "property float y\n"
+        "property float z\n"
+        f"element face {len(faces)}\n"
+        "property list uchar int vertex_indices\n"
+        "end_header\n"
+    )
+    return header.encode('ascii') + positions.tobytes() + faces.tobytes()
+
+
+def write_ply(filename, positions, triangles):
+    with open(filename, 'wb') as file:
+        file.write(ply_bytes(positions, triangles))
+
+
+# 정점 좌표만 (N, 3) float32 .npy 파일로 씁니다. 삼각형 테이블은 faceTopology 캐시와 같으므로 저장하지 않습니다.
+def npy_bytes(positions, triangles=None):
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(positions, dtype=np.float32))
+    return buffer.getvalue()
+
+
+def write_npy(filename, positions, triangles=None):
+    np.save(filename, np.asarray(positions, dtype=np.float32))
+
+
+MESH_WRITERS = {
+    'obj': write_obj,
+    'ply': write_ply,
+    'npy': write_npy,
+}
+
+# 파일 대신 메모리에서 바로 보낼 때 (landmarkService 응답 등) 사용하는 형식별 바이트 변환
+MESH_ENCODERS = {
+    'obj': lambda positions, triangles: obj_text(positions, triangles).encode('ascii'),
+    'ply': ply_bytes,
+    'npy': npy_bytes,
+}
+
+
+def format_from_filename(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    for mesh_format, format_extension in MESH_FORMATS.items():
+        if extension == format_extension:
+            return mesh_format
+    raise ValueError(f"Unsupported mesh format: {filename}")
+
+
+# 파일 확장자(또는 mesh_format)에 맞는 형식으로 메쉬를 씁니다.
+def write_mesh(filename, positions, triangles, mesh_format=None):
+    mesh_format = mesh_format or format_from_filename(filename)
+    if mesh_format not in MESH_WRITERS:
+        raise ValueError(f"Unsupported mesh format: {mesh_format}")
+    MESH_WRITERS[mesh_format](filename, positions, triangles)
+
+
+def encode_mesh(positions, triangles, mesh_format):
+    if mesh_format not in MESH_ENCODERS:
+        raise ValueError(f"Unsupported mesh format: {mesh_format}")
+    return MESH_ENCODERS[mesh_format](positions, triangles)
+
+
+# ------------------파일 읽기 부분-------------------------
+
+# 읽은 메쉬는 블렌더 메쉬와 같은 형태의 배열로 돌려줍니다.
+#   positions   : (N, 3) float64
+#   loop_vertices: 모든 면의 정점 인덱스를 이어 붙인 배열
+#   loop_totals : 면별 정점 수
+
+# OBJ의 정점(v)과 면(f) 줄만 골라서 한 번에 숫자 배열로 바꿉니다.
+# 면 인덱스의 텍스처/노멀 부분(1/2/3)은 버리고, 음수 인덱스는 전체 정점 수 기준으로 바꿉니다.
+def read_obj(filename):
+    with open(filename, 'rb') as file:
+        lines = file.read().splitlines()
+
+    vertex_lines = [line[2:] for line in lines if line.startswith(b'v ')]
+    tokens = b' '.join(vertex_lines).split()
+    if len(tokens) == 3 * len(vertex_lines):
+        positions = np.array(tokens, dtype=np.float64).reshape(-1, 3)
+    else:
+        # 정점 색(v x y z r g b)처럼 값이 더 있는 줄은 앞의 세 값만 사용
+        positions = np.array([line.split()[:3] for line in vertex_lines], dtype=np.float64).reshape(-1, 3)
+
+    face_lines = [line[2:] for line in lines if line.startswith(b'f ')]
+    face_data = b' '.join(face_lines)
+    tokens = face_data.split()
+    if b'/' not in face_data and len(tokens) == 3 * len(face_lines):
+        # 면은 최소 3개의 정점을 가지므로 전체 개수가 3배이면 모두 삼각형입니다.
+        loop_totals = np.full(len(face_lines), 3, dtype=np.int32)
+        loop_vertices = np.array(tokens, dtype=np.int64)
+    else:
+        faces = [line.split() for line in face_lines]
+        loop_totals = np.array([len(face) for face in faces], dtype=np.int32)
+        loop_vertices = np.array([corner.split(b'/', 1)[0] for face in faces for corner in face], dtype=np.int64)
+    loop_vertices = np.where(loop_vertices < 0, loop_vertices + len(positions), loop_vertices - 1)
+
+    return {'positions': positions, 'loop_vertices': loop_vertices, 'loop_totals': loop_totals}
+
+
+_PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+
+def _read_ply_header(file):
+    if file.readline().strip() != b'ply':
+        raise ValueError("Not a PLY file")
+
+    mesh_format = None
+    elements = []
+    while True:
+        line = file.readline()
+        if not line:
+            raise ValueError("Unexpected end of PLY header")
+        words = line.decode('ascii').split()
+        if not words or words[0] in ('comment', 'obj_info'):
+            continue
+        if words[0] == 'end_header':
+            return mesh_format, elements
+        if words[0] == 'format':
+            mesh_format = words[1]
+        elif words[0] == 'element':
+            elements.append({'name': words[1], 'count': int(words[2]), 'properties': []})
+        elif words[0] == 'property':
+            if words[1] == 'list':
+                elements[-1]['properties'].append((words[4], _PLY_TYPES[words[2]], _PLY_TYPES[words[3]]))
+            else:
+                elements[-1]['properties'].append((words[2], _PLY_TYPES[words[1]], None))
+
+
+# 가변 길이 면 목록을 (loop_vertices, loop_totals)로 읽습니다.
+# 모든 면이 같은 정점 수라면(보통 삼각형) 고정 크기 레코드로 한 번에 읽습니다.
+def _read_ply_binary_faces(data, offset, count, count_type, index_type):
+    if count == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32), offset
+
+    first = int(np.frombuffer(data, count_type, 1, offset)[0])
+    record = np.dtype([('count', count_type), ('indices', index_type, (first,))])
+    if offset + record.itemsize * count <= len(data):
+        faces = np.frombuffer(data, record, count, offset)
+        if np.all(faces['count'] == first):
+            return (faces['indices'].astype(np.int64).ravel(), faces['count'].astype(np.int32),
+                    offset + record.itemsize * count)
+
+    count_size = np.dtype(count_type).itemsize
+    index_size = np.dtype(index_type).itemsize
+    totals = np.empty(count, dtype=np.int32)
+    loops = []
+    for face in range(count):
+        total = int(np.frombuffer(data, count_type, 1, offset)[0])
+        offset += count_size
+        loops.append(np.frombuffer(data, index_type, total, offset))
+        offset += index_size * total
+        totals[face] = total
+    return np.concatenate(loops).astype(np.int64), totals, offset
+
+
+# ascii와 binary(little/big endian) PLY를 읽습니다. vertex의 x, y, z와 face의 정점 목록만 사용합니다.
+def read_ply(filename):
+    with open(filename, 'rb') as file:
+        mesh_format, elements = _read_ply_header(file)
+        data = file.read()
+
+    byte_order = {'binary_little_endian': '<', 'binary_big_endian': '>'}.get(mesh_format)
+    positions = np.empty((0, 3))
+    loop_vertices = np.empty(0, dtype=np.int64)
+    loop_totals = np.empty(0, dtype=np.int32)
+
+    if byte_order is None:
+        if mesh_format != 'ascii':
+            raise ValueError(f"Unsupported PLY format: {mesh_format}")
+        lines = iter(data.splitlines())
+        for element in elements:
+            rows = [next(lines).split() for _ in range(element['count'])]
+            if element['name'] == 'vertex':
+                names = [name for name, _, _ in element['properties']]
+                columns = [names.index(axis) for axis in ('x', 'y', 'z')]
+                positions = np.array([[row[i] for i in columns] for row in rows], dtype=np.float64).reshape(-1, 3)
+            elif element['name'] == 'face':
+                loop_totals = np.array([int(row[0]) for row in rows], dtype=np.int32)
+                loop_vertices = np.array([index for row in rows for index in row[1:1 + int(row[0])]], dtype=np.int64)
+        return {'positions': positions, 'loop_vertices': loop_vertices, 'loop_totals': loop_totals}
+
+    offset = 0
+    for element in elements:
+        properties = element['properties']
+        if all(list_type is None for _, _, list_type in properties):
+            record = np.dtype([(name, byte_order + value_type) for name, value_type, _ in properties])
+            rows = np.frombuffer(data, record, element['count'], offset)
+            offset += record.itemsize * element['count']
+            if element['name'] == 'vertex':
+                positions = np.stack([rows[axis].astype(np.float64) for axis in ('x', 'y', 'z')], axis=1)
+        elif element['name'] == 'face' and len(properties) == 1:
+            _, count_type, index_type = properties[0]
+            loop_vertices, loop_totals, offset = _read_ply_binary_faces(
+                data, offset, element['count'], byte_order + count_type, byte_order + index_type)
+        else:
+            raise ValueError(f"Unsupported PLY element layout: {element['name']}")
+
+    return {'positions': positions, 'loop_vertices': loop_vertices, 'loop_totals': loop_totals}
+
+
+MESH_READERS = {
+    'obj': read_obj,
+    'ply': read_ply,
+}
+
+
+def read_mesh(filename, mesh_format=None):
+    mesh_format = mesh_format or format_from_filename(filename)
+    if mesh_format not in MESH_READERS:
+        raise ValueError(f"Unsupported mesh format: {mesh_format}")
+    return MESH_READERS[mesh_format](filename)
+
+
+# 다각형 면을 부채꼴(fan)로 삼각형 분할합니다. (삼각형, 삼각형별 원래 면 인덱스)를 돌려줍니다.
+def polygons_to_triangles(loop_vertices, loop_totals):
+    loop_totals = np.asarray(loop_totals, dtype=np.int64)
+    loop_starts = np.cumsum(loop_totals) - loop_totals
+    triangle_counts = np.maximum(loop_totals - 2, 0)
+
+    triangle_polygons = np.repeat(np.arange(len(loop_totals)), triangle_counts)
+    # 각 삼각형이 자기 면에서 몇 번째인지 (0, 1, 2, ...)
+    local = np.arange(len(triangle_polygons)) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts)
+    starts = loop_starts[triangle_polygons]
+
+    loop_vertices = np.asarray(loop_vertices, dtype=np.int64)
+    triangles = np.stack([loop_vertices[starts], loop_vertices[starts + local + 1], loop_vertices[starts + local + 2]],
+                         axis=1)
+    return triangles, triangle_polygons
@@ -0,0 +1,753 @@
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# scipy가 있으면 희소 행렬 분해를 사용하고, 없으면(블렌더 기본 파이썬) numpy 밀집 행렬로 계산합니다.
+try:
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.linalg import splu
+except ImportError:
+    coo_matrix = None
+    splu = None
+
+# 얼굴 메쉬 정점을 타겟 오브젝트 표면으로 옮기기 위한 투영 도구입니다.
+# 블렌더 오브젝트에서는 foreach_get으로 배열만 읽고, 계산은 모두 numpy로 처리하므로
+# 블렌더 밖에서도 (positions, triangles) 배열만 있으면 사용할 수 있습니다.
+
+
+# 블렌더 오브젝트의 평가된(모디파이어 적용) 메쉬를 월드 좌표 배열로 읽습니다.
+def read_object_triangles(obj, depsgraph):
+    evaluated = obj.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", co)
+        triangles = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", triangles)
+    finally:
+        evaluated.to_mesh_clear()
+
+    matrix = np.array(evaluated.matrix_world, dtype=np.float64)
+    positions = co.reshape(-1, 3) @ matrix[:3, :3].T + matrix[:3, 3]
+    return positions, triangles.reshape(-1, 3)
+
+
+# 오브젝트 정점 좌표를 (N, 3) 배열로 읽고 씁니다. (로컬 좌표)
+def read_vertex_positions(mesh):
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return co.reshape(-1, 3).astype(np.float64)
+
+
+def write_vertex_positions(mesh, positions):
+    mesh.vertices.foreach_set("co", np.ascontiguousarray(positions, dtype=np.float32).ravel())
+    mesh.update()
+
+
+def read_edges(mesh):
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    return edges.reshape(-1, 2)
+
+
+def to_world(matrix, positions):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return positions @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def to_local(matrix, positions):
+    return to_world(np.linalg.inv(np.asarray(matrix, dtype=np.float64)), positions)
+
+
+# 방향 벡터를 로컬 z축으로 보내는 회전 행렬 (행: u, v, direction)
+def ray_basis(direction):
+    direction = np.asarray(direction, dtype=np.float64)
+    direction = direction / np.linalg.norm(direction)
+    helper = np.array([1.0, 0.0, 0.0]) if abs(direction[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    u = np.cross(helper, direction)
+    u /= np.linalg.norm(u)
+    v = np.cross(direction, u)
+    return np.stack([u, v, direction])
+
+
+# ------------------평행 광선 투영 부분-------------------------
+
+# 모든 광선이 같은 방향인 경우(orthographic 카메라)의 일괄 레이캐스트입니다.
+# 타겟 삼각형을 광선 방향 좌표계로 돌리면 광선은 모두 z축과 평행한 직선이 되므로,
+# 삼각형을 xy 평면의 균일 격자에 한 번만 나눠 담아 두고 모든 정점을 한 번에 격자 칸으로 찾아 검사합니다.
+# 타겟 오브젝트의 삼각형만 담기 때문에 투영하는 메쉬 자신에 부딪히는 경우는 생기지 않습니다.
+class OrthographicRayCaster:
+    def __init__(self, positions, triangles, direction, cells_per_triangle=1.0):
+        self.rotation = ray_basis(direction)
+        self.direction = self.rotation[2]
+
+        positions = np.asarray(positions, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        corners = positions[self.triangles]
+        self.corners = corners @ self.rotation.T  # (T, 3, 3) 광선 좌표계
+
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+        self._build_grid(cells_per_triangle)
+
+    def _build_grid(self, cells_per_triangle):
+        xy = self.corners[:, :, :2]
+        triangle_min = xy.min(axis=1)
+        triangle_max = xy.max(axis=1)
+
+        if len(xy):
+            self.grid_min = triangle_min.min(axis=0)
+            extent = np.maximum(triangle_max.max(axis=0) - self.grid_min, 1e-12)
+        else:
+            self.grid_min = np.zeros(2)
+            extent = np.ones(2)
+
+        # 칸 수는 삼각형 수 정도로 맞추고, 가로세로 비율은 영역 비율을 따릅니다.
+        cell_count = max(1.0, len(xy) * cells_per_triangle)
+        cell_size = np.sqrt(extent[0] * extent[1] / cell_count)
+        # 칸이 보통 크기의 삼각형보다 작으면 삼각형 하나가 너무 많은 칸에 들어가므로 그보다 작게 만들지 않습니다.
+        if len(xy):
+            cell_size = max(cell_size, float(np.median((triangle_max - triangle_min).max(axis=1))))
+        cell_size = max(cell_size, extent.max() / 4096)
+        self.cell_size = cell_size
+        self.grid_shape = np.maximum(np.ceil(extent / cell_size).astype(np.int64), 1)
+
+        low = self._cells(triangle_min)
+        high = self._cells(triangle_max)
+        spans = high - low + 1
+        counts = spans[:, 0] * spans[:, 1]
+
+        # 삼각형마다 bounding box가 덮는 칸을 모두 나열 (셀 번호, 삼각형 번호)
+        owners = np.repeat(np.arange(len(xy)), counts)
+        local = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cell_x = low[owners, 0] + local % spans[owners, 0]
+        cell_y = low[owners, 1] + local // spans[owners, 0]
+        cells = cell_y * self.grid_shape[0] + cell_x
+
+        order = np.argsort(cells, kind='stable')
+        self.cell_triangles = owners[order]
+        self.cell_offsets = np.zeros(int(self.grid_shape.prod()) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=int(self.grid_shape.prod())), out=self.cell_offsets[1:])
+
+    def _cells(self, xy):
+        cells = np.floor((xy - self.grid_min) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, self.grid_shape - 1)
+
+    # 월드 좌표의 시작점들에서 광선 방향으로 가장 가까운 교차점을 찾습니다.
+    # (hit 여부, 교차 위치, 면 노멀, 삼각형 인덱스, 거리)를 돌려주며, 닿지 않은 광선의 값은 nan / -1 입니다.
+    def cast(self, origins, max_distance=np.inf):
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        local = origins @ self.rotation.T
+        count = len(origins)
+
+        distance = np.full(count, np.inf)
+        face_index = np.full(count, -1, dtype=np.int64)
+
+        cells = self._cells(local[:, :2])
+        inside = np.all((local[:, :2] >= self.grid_min) &
+                        (local[:, :2] <= self.grid_min + self.grid_shape * self.cell_size), axis=1)
+        rays = np.flatnonzero(inside)
+        cell_ids = cells[rays, 1] * self.grid_shape[0] + cells[rays, 0]
+
+        # (광선, 후보 삼각형) 쌍을 한 번에 만들어 검사
+        starts = self.cell_offsets[cell_ids]
+        counts = self.cell_offsets[cell_ids + 1] - starts
+        pair_rays = np.repeat(rays, counts)
+        pair_slots = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        pair_triangles = self.cell_triangles[pair_slots]
+
+        point = local[pair_rays]
+        a, b, c = (self.corners[pair_triangles, i] for i in range(3))
+        weights, depth = barycentric_depth(point[:, :2], a, b, c)
+        # 시작점보다 앞쪽(광선 방향)에 있는 교차만 사용
+        t = depth - point[:, 2]
+        valid = np.all(weights >= -1e-9, axis=1) & (t >= 0) & (t <= max_distance)
+
+        pair_rays, pair_triangles, t = pair_rays[valid], pair_triangles[valid], t[valid]
+        # 같은 광선의 후보 중 가장 가까운 것 (거리가 같으면 앞 번호 삼각형)
+        order = np.lexsort((pair_triangles, t, pair_rays))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pair_rays[order][1:] != pair_rays[order][:-1]
+        nearest = order[first]
+        distance[pair_rays[nearest]] = t[nearest]
+        face_index[pair_rays[nearest]] = pair_triangles[nearest]
+
+        hit = face_index >= 0
+        locations = np.full((count, 3), np.nan)
+        locations[hit] = origins[hit] + distance[hit, None] * self.direction
+        normals = np.full((count, 3), np.nan)
+        normals[hit] = self.normals[face_index[hit]]
+        distance[~hit] = np.nan
+        return hit, locations, normals, face_index, distance
+
+
+# 2D 점의 무게중심 좌표와 삼각형 평면 위의 z값을 구합니다. (광선과 평행한 삼각형은 nan)
+def barycentric_depth(point, a, b, c):
+    ab = b[:, :2] - a[:, :2]
+    ac = c[:, :2] - a[:, :2]
+    ap = point - a[:, :2]
+    denominator = ab[:, 0] * ac[:, 1] - ab[:, 1] * ac[:, 0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        w1 = (ap[:, 0] * ac[:, 1] - ap[:, 1] * ac[:, 0]) / denominator
+        w2 = (ab[:, 0] * ap[:, 1] - ab[:, 1] * ap[:, 0]) / denominator
+        w0 = 1.0 - w1 - w2
+        depth = w0 * a[:, 2] + w1 * b[:, 2] + w2 * c[:, 2]
+    return np.stack([w0, w1, w2], axis=1), depth
+
+
+# ------------------깊이 맵 투영 부분-------------------------
+
+# 한 번에 래스터화하는 (삼각형, 픽셀) 쌍의 최대 개수. 임시 배열 크기를 제한합니다.
+RASTER_CHUNK_PIXELS = 4000000
+
+
+# orthographic 카메라 기준으로 타겟을 한 번 래스터화해 두고, 정점 투영은 버퍼 조회로 처리합니다.
+# 버퍼에는 카메라 앞쪽 거리(depth)와 그 픽셀을 덮는 삼각형 번호가 들어 있고,
+# 조회할 때는 주변 네 픽셀의 depth를 bilinear 보간해서 픽셀보다 작은 위치 차이도 반영합니다.
+class DepthMap:
+    def __init__(self, positions, triangles, camera_matrix, ortho_scale, width, height):
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+        self.width = int(width)
+        self.height = int(height)
+
+        # 블렌더의 sensor fit(AUTO)처럼 긴 변이 ortho_scale 길이가 됩니다.
+        if self.width >= self.height:
+            self.view_size = np.array([ortho_scale, ortho_scale * self.height / self.width])
+        else:
+            self.view_size = np.array([ortho_scale * self.width / self.height, ortho_scale])
+
+        positions = np.asarray(positions, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        camera_positions = to_local(self.camera_matrix, positions)
+
+        corners = positions[self.triangles]
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+        self.depth = np.full(self.height * self.width, np.inf)
+        self.face_index = np.full(self.height * self.width, -1, dtype=np.int64)
+        self._rasterize(camera_positions)
+        self.depth = self.depth.reshape(self.height, self.width)
+        self.face_index = self.face_index.reshape(self.height, self.width)
+
+    # 카메라 좌표 (x, y)를 픽셀 좌표로 바꿉니다. 정수 값이 픽셀 중심이며, 행 0이 이미지 위쪽입니다.
+    def _to_pixels(self, xy):
+        u = (xy[..., 0] / self.view_size[0] + 0.5) * self.width - 0.5
+        v = (0.5 - xy[..., 1] / self.view_size[1]) * self.height - 0.5
+        return u, v
+
+    def _rasterize(self, camera_positions):
+        corners = camera_positions[self.triangles]
+        u, v = self._to_pixels(corners[:, :, :2])
+        pixels = np.stack([u, v, -corners[:, :, 2]], axis=2)  # (T, 3, [u, v, depth])
+
+        low_x = np.clip(np.ceil(u.min(axis=1)), 0, self.width).astype(np.int64)
+        high_x = np.clip(np.floor(u.max(axis=1)), -1, self.width - 1).astype(np.int64)
+        low_y = np.clip(np.ceil(v.min(axis=1)), 0, self.height).astype(np.int64)
+        high_y = np.clip(np.floor(v.max(axis=1)), -1, self.height - 1).astype(np.int64)
+        span_x = np.maximum(high_x - low_x + 1, 0)
+        span_y = np.maximum(high_y - low_y + 1, 0)
+        counts = span_x * span_y
+
+        # 덮는 픽셀 수가 RASTER_CHUNK_PIXELS 정도가 되도록 삼각형을 나눠서 처리
+        bounds = np.searchsorted(np.cumsum(counts), np.arange(RASTER_CHUNK_PIXELS, counts.sum() + RASTER_CHUNK_PIXELS,
+                                                              RASTER_CHUNK_PIXELS), side='right')
+        start = 0
+        for stop in np.unique(np.append(bounds, len(counts))).tolist():
+            if stop <= start:
+                continue
+            chunk = np.arange(start, stop)
+            chunk_counts = counts[chunk]
+            owners = np.repeat(chunk, chunk_counts)
+            local = np.arange(len(owners)) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+            pixel_x = low_x[owners] + local % np.maximum(span_x[owners], 1)
+            pixel_y = low_y[owners] + local // np.maximum(span_x[owners], 1)
+
+            point = np.stack([pixel_x, pixel_y], axis=1).astype(np.float64)
+            a, b, c = (pixels[owners, i] for i in range(3))
+            weights, depth = barycentric_depth(point, a, b, c)
+            inside = np.all(weights >= -1e-9, axis=1)
+            self._store(pixel_y[inside] * self.width + pixel_x[inside], depth[inside], owners[inside])
+            start = stop
+
+    # 가장 가까운(depth가 가장 작은) 삼각형만 버퍼에 남깁니다.
+    def _store(self, pixel_ids, depth, owners):
+        order = np.lexsort((owners, depth, pixel_ids))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pixel_ids[order][1:] != pixel_ids[order][:-1]
+        nearest = order[first]
+
+        pixel_ids, depth, owners = pixel_ids[nearest], depth[nearest], owners[nearest]
+        closer = depth < self.depth[pixel_ids]
+        self.depth[pixel_ids[closer]] = depth[closer]
+        self.face_index[pixel_ids[closer]] = owners[closer]
+
+    # 월드 좌표의 시작점들을 카메라 방향으로 투영합니다. OrthographicRayCaster.cast와 같은 값을 돌려줍니다.
+    def cast(self, origins, max_distance=np.inf):
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        camera_points = to_local(self.camera_matrix, origins)
+        u, v = self._to_pixels(camera_points[:, :2])
+        count = len(origins)
+
+        x0 = np.floor(u).astype(np.int64)
+        y0 = np.floor(v).astype(np.int64)
+        fx = u - x0
+        fy = v - y0
+
+        # 주변 네 픽셀 (프레임 밖은 빈 픽셀로 취급)
+        samples = []
+        for dy, dx in ((0, 0), (0, 1), (1, 0), (1, 1)):
+            x, y = x0 + dx, y0 + dy
+            inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+            values = np.full(count, np.inf)
+            values[inside] = self.depth[y[inside], x[inside]]
+            samples.append(values)
+        d00, d01, d10, d11 = samples
+        depth = (d00 * (1 - fx) * (1 - fy) + d01 * fx * (1 - fy) + d10 * (1 - fx) * fy + d11 * fx * fy)
+
+        # 네 픽셀 중 비어 있는 픽셀이 있으면(실루엣 경계) 가장 가까운 픽셀 값만 사용
+        nearest_x = np.clip(np.rint(u).astype(np.int64), 0, self.width - 1)
+        nearest_y = np.clip(np.rint(v).astype(np.int64), 0, self.height - 1)
+        in_frame = (u > -0.5) & (u < self.width - 0.5) & (v > -0.5) & (v < self.height - 0.5)
+        nearest_depth = np.where(in_frame, self.depth[nearest_y, nearest_x], np.inf)
+        depth = np.where(np.isfinite(depth), depth, nearest_depth)
+        face_index = np.where(in_frame, self.face_index[nearest_y, nearest_x], -1)
+
+        distance = depth + camera_points[:, 2]
+        hit = np.isfinite(depth) & (face_index >= 0) & (distance >= 0) & (distance <= max_distance)
+
+        direction = self.camera_matrix[:3, :3] @ np.array([0.0, 0.0, -1.0])
+        direction /= np.linalg.norm(direction)
+        locations = np.full((count, 3), np.nan)
+        locations[hit] = origins[hit] + distance[hit, None] * direction
+        normals = np.full((count, 3), np.nan)
+        normals[hit] = self.normals[face_index[hit]]
+        face_index = np.where(hit, face_index, -1)
+        distance = np.where(hit, distance, np.nan)
+        return hit, locations, normals, face_index, distance
+
+
+# ------------------가장 가까운 표면 점 부분-------------------------
+
+# 삼각형 위에서 점과 가장 가까운 위치를 구합니다. (점, a, b, c 모두 (K, 3) 배열)
+# Ericson, Real-Time Collision Detection 5.1.5의 영역 판별을 배열 연산으로 옮긴 것입니다.
+def closest_points_on_triangles(point, a, b, c):
+    ab, ac, ap = b - a, c - a, point - a
+    d1 = np.einsum('ij,ij->i', ab, ap)
+    d2 = np.einsum('ij,ij->i', ac, ap)
+    bp = point - b
+    d3 = np.einsum('ij,ij->i', ab, bp)
+    d4 = np.einsum('ij,ij->i', ac, bp)
+    cp = point - c
+    d5 = np.einsum('ij,ij->i', ab, cp)
+    d6 = np.einsum('ij,ij->i', ac, cp)
+
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 면 내부
+        denominator = va + vb + vc
+        v = vb / denominator
+        w = vc / denominator
+        result = a + ab * v[:, None] + ac * w[:, None]
+
+        # 변 BC, CA, AB 위
+        t_bc = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        edge_bc = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        result = np.where(edge_bc[:, None], b + (c - b) * t_bc[:, None], result)
+        t_ac = d2 / (d2 - d6)
+        edge_ac = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        result = np.where(edge_ac[:, None], a + ac * t_ac[:, None], result)
+        t_ab = d1 / (d1 - d3)
+        edge_ab = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        result = np.where(edge_ab[:, None], a + ab * t_ab[:, None], result)
+
+    # 꼭짓점 영역 (나중에 적용한 조건이 우선)
+    result = np.where(((d6 >= 0) & (d5 <= d6))[:, None], c, result)
+    result = np.where(((d3 >= 0) & (d4 <= d3))[:, None], b, result)
+    result = np.where(((d1 <= 0) & (d2 <= 0))[:, None], a, result)
+
+    # 넓이가 0인 삼각형은 세 변 중 가장 가까운 점을 사용
+    degenerate = ~np.isfinite(result).all(axis=1)
+    if degenerate.any():
+        candidates = [closest_points_on_segments(point[degenerate], p, q)
+                      for p, q in ((a[degenerate], b[degenerate]), (b[degenerate], c[degenerate]),
+                                   (c[degenerate], a[degenerate]))]
+        distances = np.stack([np.linalg.norm(candidate - point[degenerate], axis=1) for candidate in candidates])
+        result[degenerate] = np.stack(candidates)[np.argmin(distances, axis=0), np.arange(np.count_nonzero(degenerate))]
+    return result
+
+
+def closest_points_on_segments(point, p, q):
+    pq = q - p
+    length = np.einsum('ij,ij->i', pq, pq)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.clip(np.einsum('ij,ij->i', point - p, pq) / length, 0.0, 1.0)
+    t = np.where(length > 0, t, 0.0)
+    return p + pq * t[:, None]
+
+
+# 정렬된(같은 값끼리 이어진) 배열에서 값이 바뀌는 위치와 덩어리 크기
+def _group_bounds(values):
+    starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+    return starts, np.diff(np.r_[starts, len(values)])
+
+
+# 타겟 표면에서 가장 가까운 점을 찾는 3D 균일 격자 인덱스입니다. (Shrinkwrap의 Nearest Surface Point와 같은 역할)
+# 점마다 자기 칸 주변 (2k+1)^3 칸의 삼각형만 검사하고, 찾은 거리가 검사한 영역 안쪽으로 보장되지 않는 점만
+# k를 늘려 다시 검사하므로 모든 정점을 한 번의 호출로 처리합니다.
+class ClosestPointIndex:
+    MAX_CELLS = 1 << 22
+    SEARCH_CHUNK_CELLS = 1 << 20
+
+    def __init__(self, positions, triangles):
+        positions = np.asarray(positions, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.corners = positions[self.triangles]
+
+        normals = np.cross(self.corners[:, 1] - self.corners[:, 0], self.corners[:, 2] - self.corners[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.normals = normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+        triangle_min = self.corners.min(axis=1)
+        triangle_max = self.corners.max(axis=1)
+        self.box_min, self.box_max = triangle_min, triangle_max
+        self.centroids = self.corners.mean(axis=1)
+        if len(self.corners):
+            self.grid_min = triangle_min.min(axis=0)
+            extent = np.maximum(triangle_max.max(axis=0) - self.grid_min, 1e-12)
+            cell_size = float(np.median((triangle_max - triangle_min).max(axis=1)))
+        else:
+            self.grid_min = np.zeros(3)
+            extent = np.ones(3)
+            cell_size = 1.0
+        cell_size = max(cell_size, float(extent.max()) / 1024, 1e-12)
+        while np.prod(np.ceil(extent / cell_size)) > self.MAX_CELLS:
+            cell_size *= 2
+        self.cell_size = cell_size
+        self.grid_shape = np.maximum(np.ceil(extent / cell_size).astype(np.int64), 1)
+
+        low = self._cells(triangle_min)
+        spans = self._cells(triangle_max) - low + 1
+        counts = spans.prod(axis=1)
+        owners = np.repeat(np.arange(len(self.corners)), counts)
+        local = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = low[owners] + np.stack([local % spans[owners, 0],
+                                        local // spans[owners, 0] % spans[owners, 1],
+                                        local // (spans[owners, 0] * spans[owners, 1])], axis=1)
+        cell_ids = self._cell_ids(cells)
+
+        order = np.argsort(cell_ids, kind='stable')
+        self.cell_triangles = owners[order]
+        cell_count = int(self.grid_shape.prod())
+        self.cell_offsets = np.zeros(cell_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cell_ids, minlength=cell_count), out=self.cell_offsets[1:])
+
+    def _cells(self, points):
+        cells = np.floor((points - self.grid_min) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, self.grid_shape - 1)
+
+    def _cell_ids(self, cells):
+        return (cells[:, 2] * self.grid_shape[1] + cells[:, 1]) * self.grid_shape[0] + cells[:, 0]
+
+    # 점들의 가장 가까운 표면 점을 찾습니다. max_distance보다 먼 점은 찾지 않은 것으로 처리합니다.
+    # (찾았는지 여부, 표면 위치, 면 노멀, 삼각형 인덱스, 거리)를 돌려줍니다.
+    def find_nearest(self, points, max_distance=np.inf):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        count = len(points)
+        distance = np.full(count, np.inf)
+        locations = np.full((count, 3), np.nan)
+        face_index = np.full(count, -1, dtype=np.int64)
+
+        point_cells = self._cells(points)
+        pending = np.arange(count) if len(self.corners) else np.empty(0, dtype=np.int64)
+
+        # 격자 상자 바깥쪽 거리: 어떤 삼각형까지의 거리도 이보다 가까울 수 없습니다.
+        # 이 거리가 max_distance보다 먼 점(부분 스캔의 반대편 등)은 검사하지 않습니다.
+        grid_max = self.grid_min + self.grid_shape * self.cell_size
+        outside = np.maximum(np.maximum(self.grid_min - points, points - grid_max), 0) ** 2
+        pending = pending[outside[pending].sum(axis=1) <= max_distance ** 2]
+        ring = 1
+        while len(pending):
+            low = np.maximum(point_cells[pending] - ring, 0)
+            high = np.minimum(point_cells[pending] + ring, self.grid_shape - 1)
+
+            # 검사할 칸이 삼각형 수보다 많아지면 (표면에서 먼 점) 모든 삼각형을 직접 검사하는 편이 빠릅니다.
+            cell_counts = (high - low + 1).prod(axis=1)
+            brute = cell_counts >= len(self.corners)
+            if brute.any():
+                self._search_all(points, pending[brute], distance, locations, face_index, max_distance)
+                low[brute] = 0
+                high[brute] = self.grid_shape - 1
+
+            # 한 번에 나열하는 칸 수를 SEARCH_CHUNK_CELLS 정도로 나눠서 메모리 사용량을 제한
+            queries = np.flatnonzero(~brute)
+            bounds = np.cumsum(cell_counts[queries]) // self.SEARCH_CHUNK_CELLS
+            for chunk in np.split(queries, np.flatnonzero(np.diff(bounds)) + 1):
+                if len(chunk):
+                    self._search(points, pending[chunk], low[chunk], high[chunk], distance, locations, face_index,
+                                 max_distance)
+
+            # 검사한 칸 영역의 경계까지 거리보다 가까운 결과만 확정합니다.
+            region_low = self.grid_min + low * self.cell_size
+            region_high = self.grid_min + (high + 1) * self.cell_size
+            covers_all = np.all((low == 0) & (high == self.grid_shape - 1), axis=1)
+            # 격자의 바깥쪽 면은 더 찾을 칸이 없으므로 경계로 보지 않습니다.
+            lower_margin = np.where(low == 0, np.inf, points[pending] - region_low)
+            upper_margin = np.where(high == self.grid_shape - 1, np.inf, region_high - points[pending])
+            # 남은 칸은 모두 격자 안에 있으므로, 격자 밖의 점은 다른 축의 바깥쪽 거리만큼 더 떨어져 있습니다.
+            pending_outside = outside[pending]
+            margin = np.minimum(lower_margin, upper_margin) ** 2 - pending_outside + pending_outside.sum(axis=1)[:, None]
+            margin = np.sqrt(margin.min(axis=1))
+            resolved = covers_all | (distance[pending] <= margin) | (margin > max_distance)
+            pending = pending[~resolved]
+            ring *= 2
+
+        found = distance <= max_distance
+        locations[~found] = np.nan
+        face_index[~found] = -1
+        normals = np.full((count, 3), np.nan)
+        normals[found] = self.normals[face_index[found]]
+        distance[~found] = np.nan
+        return found, locations, normals, face_index, distance
+
+    def _search_all(self, points, queries, distance, locations, face_index, max_distance=np.inf):
+        chunk_size = max(1, self.SEARCH_CHUNK_CELLS // len(self.corners))
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            pair_queries = np.repeat(chunk, len(self.corners))
+            pair_triangles = np.tile(np.arange(len(self.corners)), len(chunk))
+            self._update_nearest(points, pair_queries, pair_triangles, distance, locations, face_index, max_distance)
+
+    def _search(self, points, queries, low, high, distance, locations, face_index, max_distance=np.inf):
+        # 검사할 칸 영역이 같은 점들(같은 칸의 점들)은 후보 삼각형을 영역마다 한 번만, 중복 없이 모은 뒤 나눠 줍니다.
+        # (삼각형이 여러 칸에 걸쳐 있어도 같은 점-삼각형 쌍을 여러 번 계산하지 않습니다)
+        box_keys = self._cell_ids(low) * int(self.grid_shape.prod()) + self._cell_ids(high)
+        _, first, box_of_query = np.unique(box_keys, return_index=True, return_inverse=True)
+        low, high = low[first], high[first]
+
+        spans = high - low + 1
+        counts = spans.prod(axis=1)
+        owners = np.repeat(np.arange(len(first)), counts)
+        local = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = low[owners] + np.stack([local % spans[owners, 0],
+                                        local // spans[owners, 0] % spans[owners, 1],
+                                        local // (spans[owners, 0] * spans[owners, 1])], axis=1)
+        cell_ids = self._cell_ids(cells)
+
+        starts = self.cell_offsets[cell_ids]
+        triangle_counts = self.cell_offsets[cell_ids + 1] - starts
+        slots = (np.repeat(starts - (np.cumsum(triangle_counts) - triangle_counts), triangle_counts) +
+                 np.arange(triangle_counts.sum()))
+        if not len(slots):
+            return
+        box_owners, box_triangles = np.repeat(owners, triangle_counts), self.cell_triangles[slots]
+        # 정렬 비용이 있으므로 여러 점이 같은 영역을 쓰는 경우(스캔 정점처럼 점이 촘촘할 때)에만 중복을 없앱니다.
+        if 2 * len(first) <= len(queries):
+            keys = np.unique(box_owners * len(self.corners) + box_triangles)
+            box_owners, box_triangles = keys // len(self.corners), keys % len(self.corners)
+        box_starts = np.searchsorted(box_owners, np.arange(len(first)))
+        box_counts = np.searchsorted(box_owners, np.arange(len(first)), side='right') - box_starts
+
+        # 점마다 자기 영역의 후보 삼각형 목록을 펼칩니다.
+        query_counts = box_counts[box_of_query]
+        pair_queries = np.repeat(queries, query_counts)
+        pair_slots = (np.repeat(box_starts[box_of_query] - (np.cumsum(query_counts) - query_counts), query_counts) +
+                      np.arange(query_counts.sum()))
+        pair_triangles = box_triangles[pair_slots]
+        if not len(pair_triangles):
+            return
+
+        self._update_nearest(points, pair_queries, pair_triangles, distance, locations, face_index, max_distance)
+
+    # (점, 삼각형) 쌍들의 가장 가까운 점을 계산하고, 지금까지 찾은 것보다 가까우면 결과를 바꿉니다.
+    def _update_nearest(self, points, pair_queries, pair_triangles, distance, locations, face_index,
+                        max_distance=np.inf):
+        # 삼각형 중심까지 거리로 점마다 가장 가까운 거리의 상한을 먼저 구하고 (max_distance보다 클 필요는 없음),
+        # bounding box까지 거리가 그 상한보다 먼 삼각형은 정확한 계산에서 뺍니다.
+        # 쌍은 점마다 한 덩어리로 이어져 있으므로 (_search, _search_all) 점별 최솟값은 reduceat으로 구합니다.
+        point = points[pair_queries]
+        starts, sizes = _group_bounds(pair_queries)
+        centroid_offset = self.centroids[pair_triangles] - point
+        upper = np.minimum.reduceat(np.einsum('ij,ij->i', centroid_offset, centroid_offset), starts)
+        upper = np.minimum(upper, np.minimum(distance[pair_queries[starts]], max_distance) ** 2)
+        gap = np.maximum(np.maximum(self.box_min[pair_triangles] - point, point - self.box_max[pair_triangles]), 0)
+        keep = np.einsum('ij,ij->i', gap, gap) <= np.repeat(upper, sizes)
+        pair_queries, pair_triangles, point = pair_queries[keep], pair_triangles[keep], point[keep]
+        if not len(pair_queries):
+            return
+
+        corners = self.corners[pair_triangles]
+        closest = closest_points_on_triangles(point, corners[:, 0], corners[:, 1], corners[:, 2])
+        offset = closest - point
+        pair_distance = np.einsum('ij,ij->i', offset, offset)
+
+        # 점마다 가장 가까운 쌍 (거리가 같으면 삼각형 번호가 작은 쪽)
+        starts, sizes = _group_bounds(pair_queries)
+        is_min = pair_distance == np.repeat(np.minimum.reduceat(pair_distance, starts), sizes)
+        best_triangle = np.minimum.reduceat(np.where(is_min, pair_triangles, len(self.corners)), starts)
+        is_best = is_min & (pair_triangles == np.repeat(best_triangle, sizes))
+        nearest = np.minimum.reduceat(np.where(is_best, np.arange(len(is_best)), len(is_best)), starts)
+
+        query = pair_queries[nearest]
+        nearest_distance = np.sqrt(pair_distance[nearest])
+        better = nearest_distance < distance[query]
+        query, nearest = query[better], nearest[better]
+        distance[query] = nearest_distance[better]
+        locations[query] = closest[nearest]
+        face_index[query] = pair_triangles[nearest]
+
+    # 점들을 가장 가까운 표면 점으로 옮깁니다. offset만큼 면 노멀 방향으로 띄웁니다.
+    # 결과는 (새 위치, 옮겼는지 여부)이며 max_distance보다 먼 점은 그대로 둡니다.
+    def snap(self, points, max_distance=np.inf, offset=0.0):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        found, locations, normals, _, _ = self.find_nearest(points, max_distance)
+        snapped = points.copy()
+        snapped[found] = locations[found] + offset * normals[found]
+        return snapped, found
+
+
+# ------------------빈 정점 채우기 부분-------------------------
+
+# 고정된 정점(fixed)으로부터 변을 따라 닿을 수 있는 정점을 찾습니다.
+def reachable_from(edges, fixed):
+    reachable = np.asarray(fixed, dtype=bool).copy()
+    first, second = edges[:, 0], edges[:, 1]
+    while True:
+        grown = reachable.copy()
+        grown[second[reachable[first]]] = True
+        grown[first[reachable[second]]] = True
+        if np.array_equal(grown, reachable):
+            return reachable
+        reachable = grown
+
+
+# 타겟에 닿지 않은 정점을 닿은 정점을 경계 조건으로 하는 라플라스 방정식(L_uu x_u = A_ub x_b)으로 한 번에 채웁니다.
+# 각 빈 정점은 이웃 정점 위치의 평균이 되므로 넓은 빈 영역도 경계 사이를 매끄럽게 잇습니다.
+# 행렬 분해는 토폴로지와 빈 정점 집합이 같으면 다시 사용하므로 프레임마다 대입 계산만 합니다.
+class HarmonicFill:
+    def __init__(self, edges, vertex_count, fixed):
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        fixed = np.asarray(fixed, dtype=bool)
+
+        # 닿은 정점과 이어지지 않은 빈 정점은 풀 수 없으므로 원래 위치에 둡니다.
+        self.free = np.flatnonzero(~fixed & reachable_from(edges, fixed))
+        self.boundary = np.setdiff1d(np.arange(vertex_count), self.free)
+
+        local = np.full(vertex_count, -1, dtype=np.int64)
+        local[self.free] = np.arange(len(self.free))
+        boundary_local = np.full(vertex_count, -1, dtype=np.int64)
+        boundary_local[self.boundary] = np.arange(len(self.boundary))
+
+        rows = np.concatenate([edges[:, 0], edges[:, 1]])
+        columns = np.concatenate([edges[:, 1], edges[:, 0]])
+        degree = np.bincount(rows, minlength=vertex_count).astype(np.float64)
+
+        free_rows = local[rows] >= 0
+        interior = free_rows & (local[columns] >= 0)
+        to_boundary = free_rows & (local[columns] < 0)
+
+        # L_uu = D - A (빈 정점끼리),  A_ub (빈 정점 -> 경계 정점)
+        uu = (np.concatenate([local[self.free], local[rows[interior]]]),
+              np.concatenate([local[self.free], local[columns[interior]]]),
+              np.concatenate([degree[self.free], -np.ones(np.count_nonzero(interior))]))
+        ub = (local[rows[to_boundary]], boundary_local[columns[to_boundary]], np.ones(np.count_nonzero(to_boundary)))
+        free_count, boundary_count = len(self.free), len(self.boundary)
+
+        if splu is not None:
+            self._lu = splu(coo_matrix((uu[2], (uu[0], uu[1])), shape=(free_count, free_count)).tocsc())
+            self._coupling = coo_matrix((ub[2], (ub[0], ub[1])), shape=(free_count, boundary_count)).tocsr()
+        else:
+            laplacian = np.zeros((free_count, free_count))
+            np.add.at(laplacian, (uu[0], uu[1]), uu[2])
+            coupling = np.zeros((free_count, boundary_count))
+            np.add.at(coupling, (ub[0], ub[1]), ub[2])
+            # 밀집 행렬에서는 L_uu^-1 A_ub를 미리 곱해 두고 프레임마다 행렬 곱 한 번으로 처리합니다.
+            self._lu = None
+            self._coupling = np.linalg.solve(laplacian, coupling) if free_count else coupling
+
+    # 경계 정점 위치를 그대로 두고 빈 정점 위치를 채운 새 배열을 돌려줍니다.
+    def solve(self, positions):
+        positions = np.array(positions, dtype=np.float64)
+        if not len(self.free):
+            return positions
+
+        rhs = self._coupling @ positions[self.boundary]
+        positions[self.free] = self._lu.solve(rhs) if self._lu is not None else rhs
+        return positions
+
+
+# ------------------캐시 부분-------------------------
+
+# 같은 타겟(모양과 위치가 같은)과 같은 광선 방향이면 만들어 둔 투영 구조를 다시 사용합니다.
+# 구조 종류마다 따로 LRU를 두므로, 시퀀스 부착에서 프레임마다 다른 채우기 구조가 생겨도 투영 구조와 스냅 인덱스는 밀려나지 않습니다.
+PROJECTION_CACHE_SIZES = {
+    'rays': 4,
+    'depth': 4,
+    'fill': 16,
+    'nearest': 4,
+}
+_projection_caches = {kind: OrderedDict() for kind in PROJECTION_CACHE_SIZES}
+
+
+# 배열 내용과 모양, 자료형을 모두 넣은 blake2b 해시를 키로 사용합니다. (다른 타겟이 같은 키를 갖지 않도록)
+def geometry_key(*arrays):
+    digest = hashlib.blake2b(digest_size=20)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.dtype.str}{array.shape};".encode('ascii'))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def get_cached(kind, key, build):
+    cache = _projection_caches[kind]
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    value = build()
+    cache[key] = value
+    while len(cache) > PROJECTION_CACHE_SIZES[kind]:
+        cache.popitem(last=False)
+    return value
+
+
+def clear_cache():
+    for cache in _projection_caches.values():
+        cache.clear()
+
+
+# 타겟 표면(위치, 삼각형)의 해시. 같은 타겟으로 여러 구조를 찾을 때는 한 번만 구해서 surface_key로 넘깁니다.
+def target_key(positions, triangles):
+    return geometry_key(np.asarray(positions, dtype=np.float64), np.asarray(triangles, dtype=np.int64))
+
+
+def get_ray_caster(positions, triangles, direction, surface_key=None):
+    key = (surface_key or target_key(positions, triangles), geometry_key(np.asarray(direction, dtype=np.float64)))
+    return get_cached('rays', key, lambda: OrthographicRayCaster(positions, triangles, direction))
+
+
+def get_depth_map(positions, triangles, camera_matrix, ortho_scale, width, height, surface_key=None):
+    key = (surface_key or target_key(positions, triangles),
+           geometry_key(np.asarray(camera_matrix, dtype=np.float64),
+                        np.array([ortho_scale, width, height], dtype=np.float64)))
+    return get_cached('depth', key, lambda: DepthMap(positions, triangles, camera_matrix, ortho_scale, width, height))
+
+
+def get_harmonic_fill(edges, vertex_count, fixed):
+    key = geometry_key(np.asarray(edges, dtype=np.int64), np.asarray(fixed, dtype=bool), np.array([vertex_count]))
+    return get_cached('fill', key, lambda: HarmonicFill(edges, vertex_count, fixed))
+
+
+def get_closest_point_index(positions, triangles, surface_key=None):
+    key = surface_key or target_key(positions, triangles)
+    return get_cached('nearest', key, lambda: ClosestPointIndex(positions, triangles))
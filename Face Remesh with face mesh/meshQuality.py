@@ -0,0 +1,701 @@
+import numpy as np
+
+from meshProjection import get_closest_point_index
+from stageProfiler import stage
+
+# evaluateMesh.py의 메쉬 품질 지표를 numpy 배열 연산으로 한 번에 계산합니다.
+# bpy에 의존하지 않으므로 블렌더 밖에서도 테스트하거나 벤치마크할 수 있습니다.
+#
+#   positions : (N, 3) 정점 좌표 (월드 좌표계)
+#   triangles : (T, 3) 삼각형 정점 인덱스
+#
+# 모든 지표는 삼각형 순서대로 (T,) 배열로 돌려줍니다.
+
+
+# ------------------계산에 필요한 함수 정의-------------------------
+
+# 삼각형 세 변의 길이 (T, 3): [|v1 - v0|, |v2 - v1|, |v0 - v2|]
+def triangle_edge_lengths(positions, triangles):
+    corners = np.asarray(positions, dtype=np.float64)[triangles]
+    edges = np.roll(corners, -1, axis=1) - corners
+    return np.linalg.norm(edges, axis=2)
+
+
+# 삼각형 면적 (외적의 크기 / 2)
+def triangle_areas(positions, triangles):
+    corners = np.asarray(positions, dtype=np.float64)[triangles]
+    cross = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    return 0.5 * np.linalg.norm(cross, axis=1)
+
+
+# 삼각형 각 꼭짓점의 내각 (T, 3), 단위는 도(degree)
+# 길이가 0인 변이 있으면 각도를 정의할 수 없으므로 nan이 됩니다.
+def triangle_angles(positions, triangles):
+    corners = np.asarray(positions, dtype=np.float64)[triangles]
+    to_prev = np.roll(corners, 1, axis=1) - corners
+    to_next = np.roll(corners, -1, axis=1) - corners
+
+    dot = np.einsum('ijk,ijk->ij', to_prev, to_next)
+    norms = np.linalg.norm(to_prev, axis=2) * np.linalg.norm(to_next, axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cosine = np.clip(dot / norms, -1.0, 1.0)
+    return np.degrees(np.arccos(cosine))
+
+
+# Aspect Ratio: 가장 긴 변 / 가장 짧은 변
+def aspect_ratios(edge_lengths):
+    max_length = edge_lengths.max(axis=1)
+    min_length = edge_lengths.min(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(min_length > 0, max_length / min_length, np.inf)
+
+
+# Skewness: 정삼각형(60도)에서 벗어난 정도
+def skewness(angles):
+    theta_max = angles.max(axis=1)
+    theta_min = angles.min(axis=1)
+    return np.maximum((theta_max - 60) / (180 - 60), (60 - theta_min) / 60)
+
+
+# Shape Factor: 면적 / 외접원 반지름으로 만든 정삼각형 면적
+def shape_factors(edge_lengths, areas):
+    a, b, c = edge_lengths[:, 0], edge_lengths[:, 1], edge_lengths[:, 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        radius = (a * b * c) / (4 * areas)
+        ideal_area = (np.sqrt(3) / 4) * radius ** 2
+        return np.where(ideal_area > 0, areas / ideal_area, np.inf)
+
+
+# 삼각형 꼭짓점 좌표 (T, 3, 3)에서 size ratio를 제외한 모든 지표를 한 번에 계산합니다.
+# 변 벡터를 한 번만 만들고 변 길이, 면적, 각도를 모두 여기서 얻습니다.
+def corner_metrics(corners):
+    edges = np.roll(corners, -1, axis=1) - corners  # [v1 - v0, v2 - v1, v0 - v2]
+    edge_lengths = np.linalg.norm(edges, axis=2)
+    areas = 0.5 * np.linalg.norm(np.cross(edges[:, 0], -edges[:, 2]), axis=1)
+
+    # 꼭짓점 i의 내각: (이전 꼭짓점 방향) = -edges[i - 1], (다음 꼭짓점 방향) = edges[i]
+    dot = -np.einsum('ijk,ijk->ij', np.roll(edges, 1, axis=1), edges)
+    norms = np.roll(edge_lengths, 1, axis=1) * edge_lengths
+    with np.errstate(divide='ignore', invalid='ignore'):
+        angles = np.degrees(np.arccos(np.clip(dot / norms, -1.0, 1.0)))
+
+    return {
+        'areas': areas,
+        'aspect_ratios': aspect_ratios(edge_lengths),
+        'skewness_values': skewness(angles),
+        'shape_factors': shape_factors(edge_lengths, areas),
+    }
+
+
+# 변을 공유하는 삼각형 쌍 (a, b)를 구합니다. 한 쌍은 양방향 모두 포함됩니다.
+# 세 개 이상의 면이 한 변을 공유하는 경우(non-manifold)도 모든 쌍을 만듭니다.
+def triangle_neighbor_pairs(triangles):
+    triangles = np.asarray(triangles, dtype=np.int64)
+    edges = np.stack([triangles, np.roll(triangles, -1, axis=1)], axis=2).reshape(-1, 2)
+    edges.sort(axis=1)
+    vertex_limit = int(triangles.max()) + 1 if len(triangles) else 1
+    keys = edges[:, 0] * vertex_limit + edges[:, 1]
+    owners = np.repeat(np.arange(len(triangles)), 3)
+
+    order = np.argsort(keys, kind='stable')
+    return sorted_key_pairs(keys[order], owners[order])
+
+
+# 정렬된 변 키에서 같은 변을 가진 삼각형 쌍 (a, b)를 양방향으로 만듭니다.
+def sorted_key_pairs(keys, owners):
+    pairs_a = []
+    pairs_b = []
+    offset = 1
+    # 같은 변을 가진 항목은 정렬 후 붙어 있으므로, 거리(offset)별로 비교해서 쌍을 만듭니다.
+    while offset < len(keys):
+        same = keys[offset:] == keys[:-offset]
+        if not same.any():
+            break
+        first = owners[:-offset][same]
+        second = owners[offset:][same]
+        valid = first != second
+        pairs_a.extend((first[valid], second[valid]))
+        pairs_b.extend((second[valid], first[valid]))
+        offset += 1
+
+    if not pairs_a:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    return np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+
+# Size Ratio: 자신과 변을 공유하는 이웃 삼각형들 중 가장 큰 면적 / 가장 작은 면적
+def size_ratios(areas, neighbor_pairs):
+    max_area = areas.copy()
+    min_area = areas.copy()
+    pairs_a, pairs_b = neighbor_pairs
+    np.maximum.at(max_area, pairs_a, areas[pairs_b])
+    np.minimum.at(min_area, pairs_a, areas[pairs_b])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(min_area > 0, max_area / min_area, np.inf)
+
+
+# 정점 밀도: 정점 수 / 전체 면적
+def vertex_density(vertex_count, total_area):
+    return vertex_count / total_area if total_area > 0 else 0
+
+
+# 토폴로지 분석(점, 선, 면, 끊어진 선, 끊어진 점)
+#   edges            : (E, 2) 변의 정점 인덱스
+#   face_edge_indices: 모든 면(loop)이 사용하는 변 인덱스 목록
+def topology_counts(vertex_count, edges, face_count, face_edge_indices):
+    edges = np.asarray(edges).reshape(-1, 2)
+    faces_per_edge = np.bincount(np.asarray(face_edge_indices, dtype=np.int64), minlength=len(edges))
+    edges_per_vertex = np.bincount(edges.ravel(), minlength=vertex_count)
+
+    return {
+        'vertices_count': int(vertex_count),
+        'edges_count': int(len(edges)),
+        'faces_count': int(face_count),
+        'non_manifold_edges': int(np.count_nonzero(faces_per_edge != 2)),
+        'loose_verts': int(np.count_nonzero(edges_per_vertex == 0)),
+    }
+
+
+# 면(loop) 목록에서 고유한 변 목록과 loop별 변 인덱스를 만듭니다. (블렌더의 edges, loops.edge_index와 같은 형태)
+def polygon_edges(loop_vertices, loop_totals):
+    loop_vertices = np.asarray(loop_vertices, dtype=np.int64)
+    loop_totals = np.asarray(loop_totals, dtype=np.int64)
+    loop_starts = np.repeat(np.cumsum(loop_totals) - loop_totals, loop_totals)
+    loop_ends = np.repeat(np.cumsum(loop_totals), loop_totals)
+
+    # 각 loop의 다음 정점 (면의 마지막 정점은 첫 정점으로 돌아감)
+    following = np.arange(len(loop_vertices)) + 1
+    following = np.where(following == loop_ends, loop_starts, following)
+    first = np.minimum(loop_vertices, loop_vertices[following])
+    second = np.maximum(loop_vertices, loop_vertices[following])
+
+    # (작은 정점, 큰 정점) 쌍을 정수 하나로 묶어서 정렬/중복 제거
+    vertex_limit = int(second.max()) + 1 if len(second) else 1
+    keys, loop_edges = np.unique(first * vertex_limit + second, return_inverse=True)
+    edges = np.stack([keys // vertex_limit, keys % vertex_limit], axis=1)
+    return edges, loop_edges.ravel()
+
+
+# ------------------연산 수행 부분-------------------------
+
+# 삼각형 메쉬의 면별 품질 지표를 모두 계산합니다.
+def evaluate_triangles(positions, triangles):
+    return evaluate_quality(positions, triangles).metrics
+
+
+# 면별 지표 배열에서 평균값과 가장 큰/작은 요소를 구합니다.
+def summarize(metrics):
+    areas = metrics['areas']
+    summary = {
+        'total_aspect_ratio': float(np.mean(metrics['aspect_ratios'])),
+        'total_skewness': float(np.mean(metrics['skewness_values'])),
+        'total_size_ratio': float(np.mean(metrics['size_ratios'])),
+        'total_shape_factor': float(np.mean(metrics['shape_factors'])),
+    }
+
+    if len(areas):
+        max_face_index = int(np.argmax(areas))
+        min_face_index = int(np.argmin(areas))
+        summary.update(max_face_index=max_face_index, max_area=float(areas[max_face_index]),
+                       min_face_index=min_face_index, min_area=float(areas[min_face_index]))
+    else:
+        summary.update(max_face_index=-1, max_area=0.0, min_face_index=-1, min_area=float('inf'))
+    return summary
+
+
+# ------------------결과 요약 부분-------------------------
+
+# 면별 지표 이름과 표시 이름, 그리고 나쁜 값의 방향(True이면 값이 클수록 나쁨)
+METRICS = (
+    ('aspect_ratios', "Aspect Ratio", True),
+    ('skewness_values', "Skewness", True),
+    ('size_ratios', "Size Ratio", True),
+    ('shape_factors', "Shape Factor", False),
+)
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+# 지표 하나의 분포를 요약합니다. inf/nan 값은 따로 세고 통계에서는 제외합니다.
+def metric_statistics(values, percentiles=DEFAULT_PERCENTILES):
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    stats = {
+        'count': int(len(values)),
+        'non_finite': int(len(values) - len(finite)),
+    }
+
+    if len(finite):
+        stats.update(mean=float(finite.mean()), min=float(finite.min()), max=float(finite.max()))
+        for percentile, value in zip(percentiles, np.percentile(finite, percentiles)):
+            stats[f'p{percentile}'] = float(value)
+    return stats
+
+
+# 가장 나쁜 면부터 offset번째 이후 count개의 인덱스를 돌려줍니다. (페이지 단위 목록용)
+# 전체를 정렬하지 않고 필요한 개수만 골라낸 뒤 정렬합니다. 값이 같으면 면 번호 순서이며, 페이지가 달라도 순서가 이어집니다.
+def worst_faces(values, count, offset=0, higher_is_worse=True):
+    values = np.asarray(values, dtype=np.float64)
+    keys = np.nan_to_num(-values if higher_is_worse else values, nan=np.inf, posinf=np.inf, neginf=-np.inf)
+    limit = min(offset + count, len(keys))
+    if limit <= offset:
+        return np.empty(0, dtype=np.int64)
+
+    if limit < len(keys):
+        # 경계 값과 같은 면은 argpartition이 임의로 고르므로 모두 후보에 넣은 뒤 번호 순으로 자릅니다.
+        threshold = keys[np.argpartition(keys, limit - 1)[limit - 1]]
+        candidates = np.flatnonzero(keys <= threshold)
+    else:
+        candidates = np.arange(len(keys))
+    ordered = candidates[np.lexsort((candidates, keys[candidates]))]
+    return ordered[offset:limit]
+
+
+# 삼각형별 값을 원래 면(polygon)별 값으로 모읍니다. 한 면에 여러 삼각형이 있으면 가장 나쁜 값을 사용합니다.
+def triangles_to_polygons(values, triangle_polygons, polygon_count, higher_is_worse=True):
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        if higher_is_worse:
+            result = np.full(polygon_count, -np.inf)
+            np.maximum.at(result, triangle_polygons, values)
+        else:
+            result = np.full(polygon_count, np.inf)
+            np.minimum.at(result, triangle_polygons, values)
+    return result
+
+
+# 값을 low~high 범위로 정규화한 뒤 파랑(좋음) -> 초록 -> 빨강(나쁨) 색으로 바꿉니다. (N, 4) RGBA float32
+def heatmap_colors(values, low, high, higher_is_worse=True):
+    values = np.asarray(values, dtype=np.float64)
+    span = high - low if high > low else 1.0
+    t = np.clip(np.nan_to_num((values - low) / span, nan=1.0, posinf=1.0, neginf=0.0), 0.0, 1.0)
+    if not higher_is_worse:
+        t = 1.0 - t
+
+    colors = np.empty((len(t), 4), dtype=np.float32)
+    colors[:, 0] = np.clip(2.0 * t - 1.0, 0.0, 1.0)
+    colors[:, 1] = 1.0 - np.abs(2.0 * t - 1.0)
+    colors[:, 2] = np.clip(1.0 - 2.0 * t, 0.0, 1.0)
+    colors[:, 3] = 1.0
+    return colors
+
+
+# ------------------부분 재계산 부분-------------------------
+
+# CSR 형식(offsets, indices)으로 행별 목록을 만듭니다. rows[i]에 속한 값들이 indices[offsets[i]:offsets[i+1]]에 들어갑니다.
+def build_csr(rows, values, row_count):
+    order = np.argsort(rows, kind='stable')
+    offsets = np.zeros(row_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=row_count), out=offsets[1:])
+    return offsets, np.asarray(values)[order]
+
+
+# CSR의 여러 행을 순서대로 이어 붙입니다. (중복 제거 없음)
+def csr_rows(csr, rows):
+    offsets, indices = csr
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = offsets[rows]
+    counts = offsets[rows + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        return np.empty(0, dtype=indices.dtype)
+    positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return indices[positions]
+
+
+# 여러 행의 CSR 목록을 한 번에 모읍니다. (중복 제거, 정렬됨)
+def csr_gather(csr, rows):
+    return np.unique(csr_rows(csr, rows))
+
+
+# 이전 좌표와 비교해 움직인 정점 인덱스를 찾습니다.
+def find_dirty_vertices(previous_positions, positions, tolerance=0.0):
+    difference = np.abs(np.asarray(positions, dtype=np.float64) - previous_positions)
+    return np.flatnonzero(np.any(difference > tolerance, axis=1))
+
+
+# 지표 하나의 합계를 유한값의 합과 inf/nan 개수로 나눠서 보관합니다.
+# np.mean과 같은 결과(inf나 nan이 섞이면 inf/nan)를 전체 배열을 다시 보지 않고 낼 수 있습니다.
+def metric_totals(values):
+    finite = np.isfinite(values)
+    return np.array([values[finite].sum(), np.count_nonzero(np.isposinf(values)), np.count_nonzero(np.isnan(values)),
+                     np.count_nonzero(np.isneginf(values))])
+
+
+def mean_from_totals(totals, count):
+    finite_sum, posinf_count, nan_count, neginf_count = totals
+    if count == 0 or nan_count or (posinf_count and neginf_count):
+        return float('nan')
+    if posinf_count:
+        return float('inf')
+    if neginf_count:
+        return float('-inf')
+    return float(finite_sum / count)
+
+
+# 한 메쉬의 품질 평가 결과를 보관하고, 정점이 조금 움직였을 때 영향을 받는 면만 다시 계산합니다.
+# (처음 평가는 EvaluationTask 또는 evaluate_quality()로 만듭니다)
+#
+#   - 움직인 정점에 붙은 삼각형: 모든 지표를 다시 계산
+#   - 그 삼각형과 변을 공유하는 이웃(one-ring): 이웃 면적이 바뀌므로 size ratio만 다시 계산
+#   - 평균값: 바뀐 면의 이전 값을 빼고 새 값을 더하는 누적 합계로 갱신
+class QualityEvaluation:
+    def __init__(self, positions, triangles, metrics, neighbors, totals, max_face_index, min_face_index):
+        self.positions = positions
+        self.triangles = triangles
+        self.metrics = metrics
+        self.neighbors = neighbors
+        self.totals = totals
+        self.max_face_index = max_face_index
+        self.min_face_index = min_face_index
+        self.last_updated_count = len(triangles)
+        # 정점 -> 삼각형 목록은 처음 update 할 때 만듭니다.
+        self._vertex_triangles = None
+
+    @property
+    def vertex_triangles(self):
+        if self._vertex_triangles is None:
+            triangle_count = len(self.triangles)
+            self._vertex_triangles = build_csr(self.triangles.ravel(), np.repeat(np.arange(triangle_count), 3),
+                                               len(self.positions))
+        return self._vertex_triangles
+
+    def _update_area_extremes(self):
+        areas = self.metrics['areas']
+        self.max_face_index = int(np.argmax(areas)) if len(areas) else -1
+        self.min_face_index = int(np.argmin(areas)) if len(areas) else -1
+
+    # 새 좌표를 받아 바뀐 부분만 다시 계산합니다. 다시 계산한 삼각형 수를 돌려줍니다.
+    def update(self, positions, tolerance=0.0):
+        positions = np.asarray(positions, dtype=np.float64)
+        dirty_vertices = find_dirty_vertices(self.positions, positions, tolerance)
+        self.positions[dirty_vertices] = positions[dirty_vertices]
+        if not len(dirty_vertices):
+            self.last_updated_count = 0
+            return 0
+
+        changed = csr_gather(self.vertex_triangles, dirty_vertices)
+        ring = np.union1d(changed, csr_gather(self.neighbors, changed))
+
+        old_values = {key: self.metrics[key][ring].copy() for key, _, _ in METRICS}
+
+        # 움직인 삼각형의 면적/변/각도 기반 지표
+        for key, values in corner_metrics(self.positions[self.triangles[changed]]).items():
+            self.metrics[key][changed] = values
+
+        # size ratio는 이웃 면적에 따라 달라지므로 one-ring까지 다시 계산
+        self.metrics['size_ratios'][ring] = neighbor_size_ratios(self.metrics['areas'], self.neighbors, ring)
+
+        for key, _, _ in METRICS:
+            self.totals[key] += metric_totals(self.metrics[key][ring]) - metric_totals(old_values[key])
+
+        self._update_extremes_after(changed)
+        self.last_updated_count = len(ring)
+        return len(ring)
+
+    # 가장 큰/작은 면이 바뀐 면 안에 있었다면 전체에서 다시 찾고, 아니면 바뀐 면과만 비교합니다.
+    def _update_extremes_after(self, changed):
+        areas = self.metrics['areas']
+        changed_areas = areas[changed]
+        if self.max_face_index in changed or self.min_face_index in changed:
+            self._update_area_extremes()
+            return
+
+        candidate = changed[int(np.argmax(changed_areas))]
+        if areas[candidate] > areas[self.max_face_index] or \
+                (areas[candidate] == areas[self.max_face_index] and candidate < self.max_face_index):
+            self.max_face_index = int(candidate)
+        candidate = changed[int(np.argmin(changed_areas))]
+        if areas[candidate] < areas[self.min_face_index] or \
+                (areas[candidate] == areas[self.min_face_index] and candidate < self.min_face_index):
+            self.min_face_index = int(candidate)
+
+    def summary(self):
+        count = len(self.triangles)
+        areas = self.metrics['areas']
+        summary = {
+            'total_aspect_ratio': mean_from_totals(self.totals['aspect_ratios'], count),
+            'total_skewness': mean_from_totals(self.totals['skewness_values'], count),
+            'total_size_ratio': mean_from_totals(self.totals['size_ratios'], count),
+            'total_shape_factor': mean_from_totals(self.totals['shape_factors'], count),
+            'max_face_index': self.max_face_index,
+            'min_face_index': self.min_face_index,
+            'max_area': float(areas[self.max_face_index]) if count else 0.0,
+            'min_area': float(areas[self.min_face_index]) if count else float('inf'),
+        }
+        return summary
+
+
+# faces에 속한 삼각형들의 size ratio를 이웃 CSR로 계산합니다.
+def neighbor_size_ratios(areas, neighbors, faces):
+    offsets = neighbors[0]
+    counts = offsets[faces + 1] - offsets[faces]
+    owner = np.repeat(np.arange(len(faces)), counts)
+    neighbor_faces = csr_rows(neighbors, faces)
+
+    max_area = areas[faces].copy()
+    min_area = areas[faces].copy()
+    np.maximum.at(max_area, owner, areas[neighbor_faces])
+    np.minimum.at(min_area, owner, areas[neighbor_faces])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(min_area > 0, max_area / min_area, np.inf)
+
+
+# ------------------나눠서 계산하는 부분-------------------------
+
+# 한 번에 처리하는 삼각형 수. 임시 배열 크기가 이 값에 비례하므로 최대 메모리 사용량이 제한됩니다.
+DEFAULT_CHUNK_SIZE = 100000
+
+
+# 변을 공유하는 이웃 목록(CSR)을 여러 단계로 나눠서 만듭니다.
+# 모든 변 키를 한 번에 정렬하지 않고, 작은 쪽 정점 번호 구간으로 변을 버킷에 나눠 담은 뒤 버킷마다 정렬합니다.
+# 같은 변은 항상 같은 버킷에 들어가므로 버킷 안에서 쌍을 모두 찾을 수 있고, 단계마다 임시 배열은 chunk_size 정도로 제한됩니다.
+#   edge_counts    : 삼각형 덩어리별로 버킷 크기 세기
+#   edge_scatter   : 삼각형 덩어리별로 변 키를 버킷 위치에 나눠 담기
+#   neighbor_pairs : 버킷별 정렬 후 이웃 쌍 찾기
+#   neighbor_csr   : 버킷별 이웃 쌍을 CSR 위치에 채우기
+class NeighborBuilder:
+    def __init__(self, triangles, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.chunk_size = max(1, int(chunk_size))
+        triangle_count = len(self.triangles)
+        self.vertex_limit = int(self.triangles.max()) + 1 if triangle_count else 1
+        self.bucket_count = max(1, -(-3 * triangle_count // self.chunk_size))
+
+        self._bucket_counts = np.zeros(self.bucket_count, dtype=np.int64)
+        self._bucket_starts = None
+        self._cursor = None
+        self._keys = np.empty(3 * triangle_count, dtype=np.int64)
+        self._owners = np.empty(3 * triangle_count, dtype=np.int64)
+        self._pairs = [None] * self.bucket_count
+        self._row_counts = np.zeros(triangle_count, dtype=np.int64)
+        self._fill = None
+        self.offsets = None
+        self.indices = None
+
+        if triangle_count:
+            chunks = range(0, triangle_count, self.chunk_size)
+            buckets = range(self.bucket_count)
+            self._steps = ([('edge_counts', start) for start in chunks] + [('edge_scatter', start) for start in chunks]
+                           + [('neighbor_pairs', bucket) for bucket in buckets]
+                           + [('neighbor_csr', bucket) for bucket in buckets])
+        else:
+            self._steps = []
+            self.offsets = np.zeros(1, dtype=np.int64)
+            self.indices = np.empty(0, dtype=np.int64)
+        self._step_index = 0
+
+    @property
+    def step_count(self):
+        return len(self._steps)
+
+    @property
+    def done(self):
+        return self._step_index >= len(self._steps)
+
+    @property
+    def csr(self):
+        return self.offsets, self.indices
+
+    # 한 단계를 처리합니다. 모든 단계가 끝나면 True를 돌려줍니다.
+    def step(self):
+        if self.done:
+            return True
+        phase, argument = self._steps[self._step_index]
+        getattr(self, '_' + phase)(argument)
+        self._step_index += 1
+        if self.done:
+            self._keys = self._owners = self._pairs = self._fill = None
+        return self.done
+
+    def _chunk_edges(self, start):
+        triangles = self.triangles[start:start + self.chunk_size]
+        edges = np.stack([triangles, np.roll(triangles, -1, axis=1)], axis=2).reshape(-1, 2)
+        edges.sort(axis=1)
+        keys = edges[:, 0] * self.vertex_limit + edges[:, 1]
+        owners = np.repeat(np.arange(start, start + len(triangles)), 3)
+        buckets = edges[:, 0] * self.bucket_count // self.vertex_limit
+        return keys, owners, buckets
+
+    def _edge_counts(self, start):
+        buckets = self._chunk_edges(start)[2]
+        self._bucket_counts += np.bincount(buckets, minlength=self.bucket_count)
+
+    def _edge_scatter(self, start):
+        if self._cursor is None:
+            self._bucket_starts = np.zeros(self.bucket_count + 1, dtype=np.int64)
+            np.cumsum(self._bucket_counts, out=self._bucket_starts[1:])
+            self._cursor = self._bucket_starts[:-1].copy()
+
+        keys, owners, buckets = self._chunk_edges(start)
+        order = np.argsort(buckets, kind='stable')
+        sorted_buckets = buckets[order]
+        counts = np.bincount(buckets, minlength=self.bucket_count)
+        ranks = np.arange(len(order)) - (np.cumsum(counts) - counts)[sorted_buckets]
+        positions = self._cursor[sorted_buckets] + ranks
+        self._keys[positions] = keys[order]
+        self._owners[positions] = owners[order]
+        self._cursor += counts
+
+    def _neighbor_pairs(self, bucket):
+        start, stop = self._bucket_starts[bucket], self._bucket_starts[bucket + 1]
+        keys = self._keys[start:stop]
+        order = np.argsort(keys, kind='stable')
+        pairs = sorted_key_pairs(keys[order], self._owners[start:stop][order])
+        self._pairs[bucket] = pairs
+
+        rows, counts = np.unique(pairs[0], return_counts=True)
+        self._row_counts[rows] += counts
+
+    def _neighbor_csr(self, bucket):
+        if self.offsets is None:
+            self.offsets = np.zeros(len(self.triangles) + 1, dtype=np.int64)
+            np.cumsum(self._row_counts, out=self.offsets[1:])
+            self.indices = np.empty(int(self.offsets[-1]), dtype=np.int64)
+            self._fill = self.offsets[:-1].copy()
+
+        pairs_a, pairs_b = self._pairs[bucket]
+        self._pairs[bucket] = None
+        order = np.argsort(pairs_a, kind='stable')
+        sorted_rows = pairs_a[order]
+        rows, first, counts = np.unique(sorted_rows, return_index=True, return_counts=True)
+        ranks = np.arange(len(sorted_rows)) - np.repeat(first, counts)
+        self.indices[self._fill[sorted_rows] + ranks] = pairs_b[order]
+        self._fill[rows] += counts
+
+
+# 면을 chunk_size개씩 나눠서 평가하는 작업입니다. step()을 부를 때마다 한 덩어리씩 처리하므로
+# 블렌더의 modal 오퍼레이터처럼 중간에 진행률을 보여주거나 취소할 수 있습니다.
+#
+#   1단계: 면적/aspect ratio/skewness/shape factor를 한 번의 좌표 gather로 계산하고 합계, 최대/최소 면을 누적
+#   2단계: 변을 공유하는 이웃 목록(CSR) 생성 (NeighborBuilder, 여러 단계로 나눠서)
+#   3단계: 이웃 면적으로 size ratio 계산 및 합계 누적
+class EvaluationTask:
+    def __init__(self, positions, triangles, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.positions = np.array(positions, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        self.chunk_size = max(1, int(chunk_size))
+
+        triangle_count = len(self.triangles)
+        self.metrics = {key: np.empty(triangle_count) for key in ('areas',) + tuple(k for k, _, _ in METRICS)}
+        self.totals = {key: np.zeros(4) for key, _, _ in METRICS}
+        self.neighbors = None
+        self.max_face_index = -1
+        self.min_face_index = -1
+
+        self._neighbor_builder = NeighborBuilder(self.triangles, self.chunk_size)
+        if self._neighbor_builder.done:
+            self.neighbors = self._neighbor_builder.csr
+        self._steps = [('metrics', start) for start in range(0, triangle_count, self.chunk_size)]
+        self._steps += [('neighbors', index) for index in range(self._neighbor_builder.step_count)]
+        self._steps += [('size_ratios', start) for start in range(0, triangle_count, self.chunk_size)]
+        self._step_index = 0
+        self.evaluation = None
+
+    @property
+    def done(self):
+        return self._step_index >= len(self._steps)
+
+    @property
+    def progress(self):
+        return self._step_index / len(self._steps) if self._steps else 1.0
+
+    # 한 단계를 처리합니다. 모든 단계가 끝나면 True를 돌려줍니다.
+    def step(self):
+        if self.done:
+            return True
+
+        phase, start = self._steps[self._step_index]
+        stop = min(start + self.chunk_size, len(self.triangles))
+        with stage(phase, faces=stop - start):
+            if phase == 'metrics':
+                self._metrics_step(start, stop)
+            elif phase == 'neighbors':
+                if self._neighbor_builder.step():
+                    self.neighbors = self._neighbor_builder.csr
+            else:
+                faces = np.arange(start, stop)
+                values = neighbor_size_ratios(self.metrics['areas'], self.neighbors, faces)
+                self.metrics['size_ratios'][start:stop] = values
+                self.totals['size_ratios'] += metric_totals(values)
+
+        self._step_index += 1
+        if self.done:
+            self.evaluation = QualityEvaluation(self.positions, self.triangles, self.metrics, self.neighbors,
+                                                self.totals, self.max_face_index, self.min_face_index)
+        return self.done
+
+    def _metrics_step(self, start, stop):
+        chunk = corner_metrics(self.positions[self.triangles[start:stop]])
+        for key, values in chunk.items():
+            self.metrics[key][start:stop] = values
+            if key in self.totals:
+                self.totals[key] += metric_totals(values)
+
+        # 최대/최소 면적 요소를 덩어리마다 누적 (같은 값이면 앞쪽 인덱스 유지)
+        areas = chunk['areas']
+        local_max = start + int(np.argmax(areas))
+        local_min = start + int(np.argmin(areas))
+        all_areas = self.metrics['areas']
+        if self.max_face_index < 0 or all_areas[local_max] > all_areas[self.max_face_index]:
+            self.max_face_index = local_max
+        if self.min_face_index < 0 or all_areas[local_min] < all_areas[self.min_face_index]:
+            self.min_face_index = local_min
+
+    def run(self):
+        while not self.step():
+            pass
+        return self.evaluation
+
+
+# 메쉬 전체를 평가한 QualityEvaluation을 돌려줍니다.
+def evaluate_quality(positions, triangles, chunk_size=DEFAULT_CHUNK_SIZE):
+    return EvaluationTask(positions, triangles, chunk_size).run()
+
+
+# ------------------기준 메쉬 비교 부분-------------------------
+
+# 평가하는 메쉬가 기준 메쉬(원본 스캔 등)의 표면과 얼마나 가까운지 계산합니다.
+# 거리는 한쪽 메쉬의 정점에서 다른 쪽 표면(삼각형)까지의 가장 가까운 거리이며,
+# 두 메쉬의 최근접점 인덱스는 meshProjection 캐시에 보관되므로 같은 기준 메쉬와 여러 번 비교해도 한 번만 만듭니다.
+# max_distance보다 먼 정점(부분 스캔이 덮지 않는 영역 등)은 비교에서 빼고 'missing'으로 셉니다.
+
+# 한 방향 거리 분포: Hausdorff (최대), 평균, RMS
+def deviation_statistics(distances):
+    distances = np.asarray(distances, dtype=np.float64)
+    finite = distances[np.isfinite(distances)]
+    stats = {
+        'count': int(len(finite)),
+        'missing': int(len(distances) - len(finite)),
+    }
+
+    if len(finite):
+        stats.update(hausdorff=float(finite.max()), mean=float(finite.mean()),
+                     rms=float(np.sqrt(np.mean(finite ** 2))))
+    return stats
+
+
+# 평가 메쉬 -> 기준 메쉬, 기준 메쉬 -> 평가 메쉬 양쪽 거리를 계산합니다.
+# vertex_error는 평가 메쉬 정점별 거리 (N,)이며, 대칭 Hausdorff는 두 방향 최대 거리 중 큰 값입니다.
+def compare_surfaces(positions, triangles, reference_positions, reference_triangles, max_distance=np.inf):
+    with stage('reference_index'):
+        reference_index = get_closest_point_index(reference_positions, reference_triangles)
+    with stage('forward_distance', points=len(positions)):
+        vertex_error = reference_index.find_nearest(positions, max_distance)[4]
+
+    with stage('mesh_index'):
+        mesh_index = get_closest_point_index(positions, triangles)
+    with stage('backward_distance', points=len(reference_positions)):
+        reference_error = mesh_index.find_nearest(reference_positions, max_distance)[4]
+
+    forward = deviation_statistics(vertex_error)
+    backward = deviation_statistics(reference_error)
+    directed = [stats['hausdorff'] for stats in (forward, backward) if 'hausdorff' in stats]
+    return {
+        'vertex_error': vertex_error,
+        'forward': forward,
+        'backward': backward,
+        'hausdorff': max(directed) if directed else float('nan'),
+    }
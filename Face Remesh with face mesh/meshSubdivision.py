@@ -0,0 +1,216 @@
+import hashlib
+import os
+
+import numpy as np
+
+# scipy가 있으면 CSR 행렬 곱을 사용하고, 없으면 numpy로 같은 계산을 합니다.
+try:
+    from scipy.sparse import csr_matrix
+except ImportError:
+    csr_matrix = None
+
+from faceTopology import DEFAULT_CACHE_DIR
+from meshQuality import polygon_edges
+
+# 고정된 얼굴 메쉬 토폴로지를 여러 단계로 세분화하는 stencil 행렬입니다.
+# 세분화 후의 정점은 모두 원래 정점의 가중합이므로, 단계별 가중치를 희소 행렬(행, 열, 가중치) 하나로 합쳐 두면
+# 프레임마다 (새 정점 수 x 원래 정점 수) 희소 행렬과 좌표의 곱 한 번으로 고해상도 메쉬를 만들 수 있습니다.
+
+# 캐시 파일 형식이나 가중치 규칙이 바뀌면 이 값을 올려서 이전 캐시를 무시하도록 합니다.
+SUBDIVISION_CACHE_VERSION = 1
+
+SUBDIVISION_SCHEMES = ('loop', 'linear')
+
+# 단계마다 삼각형 수가 4배가 되므로 명령줄 도구와 서비스에서 받는 단계 수를 제한합니다.
+# (얼굴 메쉬 기준 4단계에서 약 23만 개)
+MAX_SUBDIVISION_LEVELS = 4
+
+# 프로세스 안에서 한 번 만든 stencil을 재사용하기 위한 저장소
+_stencils = {}
+
+
+# 세분화 행렬 (행 순서로 정렬된 행, 열, 가중치)과 세분화된 삼각형 테이블
+class SubdivisionStencil:
+    def __init__(self, rows, columns, weights, vertex_count, source_count, triangles):
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.lexsort((columns, rows))
+        self.rows = rows[order]
+        self.columns = np.asarray(columns, dtype=np.int64)[order]
+        self.weights = np.asarray(weights, dtype=np.float64)[order]
+        self.vertex_count = int(vertex_count)
+        self.source_count = int(source_count)
+        self.triangles = np.asarray(triangles, dtype=np.int32).reshape(-1, 3)
+
+        # 행마다 가중치가 시작하는 위치 (모든 새 정점은 가중치를 하나 이상 가집니다)
+        self._row_starts = np.searchsorted(self.rows, np.arange(self.vertex_count))
+        self._matrix = None
+        if csr_matrix is not None:
+            self._matrix = csr_matrix((self.weights, (self.rows, self.columns)),
+                                      shape=(self.vertex_count, self.source_count))
+
+    # 원래 정점 좌표 (N, 3) 또는 여러 프레임 (F, N, 3)에서 세분화된 좌표를 만듭니다.
+    # 여러 프레임은 (N, F * 3) 행렬 하나로 묶어서 행렬 곱 한 번으로 처리합니다.
+    def apply(self, positions):
+        positions = np.asarray(positions, dtype=np.float64)
+        frames = positions.reshape(-1, self.source_count, 3)
+        columns = np.ascontiguousarray(frames.transpose(1, 0, 2)).reshape(self.source_count, -1)
+
+        if self._matrix is not None:
+            result = self._matrix @ columns
+        else:
+            result = np.add.reduceat(columns[self.columns] * self.weights[:, None], self._row_starts, axis=0)
+
+        result = result.reshape(self.vertex_count, len(frames), 3).transpose(1, 0, 2)
+        return result.reshape(positions.shape[:-2] + (self.vertex_count, 3))
+
+
+# 두 희소 행렬의 곱 (second @ first)을 (행, 열, 가중치)로 구합니다.
+def compose(second, first, first_count):
+    second_rows, second_columns, second_weights = second
+    first_rows, first_columns, first_weights = first
+
+    # first의 행별 가중치 목록을 second의 열에 맞춰 펼칩니다.
+    order = np.argsort(first_rows, kind='stable')
+    first_rows, first_columns, first_weights = first_rows[order], first_columns[order], first_weights[order]
+    starts = np.searchsorted(first_rows, second_columns)
+    counts = np.searchsorted(first_rows, second_columns, side='right') - starts
+
+    owners = np.repeat(np.arange(len(second_rows)), counts)
+    slots = np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+    keys = second_rows[owners] * first_count + first_columns[slots]
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    weights = np.bincount(inverse.ravel(), weights=second_weights[owners] * first_weights[slots])
+    return unique_keys // first_count, unique_keys % first_count, weights
+
+
+# 한 단계 세분화: 삼각형마다 변 중점 3개를 추가해서 4개로 나눕니다.
+# 결과는 ((행, 열, 가중치), 새 정점 수, 새 삼각형)이며 새 정점 번호는 [원래 정점, 변 정점] 순서입니다.
+def subdivide_once(triangles, vertex_count, scheme='loop'):
+    if scheme not in SUBDIVISION_SCHEMES:
+        raise ValueError(f"Unknown subdivision scheme: {scheme}")
+
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    edges, loop_edges = polygon_edges(triangles.ravel(), np.full(len(triangles), 3))
+    corner_edges = loop_edges.reshape(-1, 3)  # 꼭짓점 i -> i+1 변
+    edge_faces = np.bincount(loop_edges, minlength=len(edges))
+    edge_vertices = vertex_count + np.arange(len(edges))
+
+    # 새 삼각형: (a, ab, ca), (ab, b, bc), (ca, bc, c), (ab, bc, ca)
+    ab, bc, ca = (edge_vertices[corner_edges[:, i]] for i in range(3))
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    new_triangles = np.stack([np.stack([a, ab, ca], 1), np.stack([ab, b, bc], 1),
+                              np.stack([ca, bc, c], 1), np.stack([ab, bc, ca], 1)], axis=1).reshape(-1, 3)
+
+    # 변 정점: 기본은 두 끝점의 중점
+    rows = [np.repeat(edge_vertices, 2)]
+    columns = [edges.ravel()]
+    weights = [np.full(2 * len(edges), 0.5)]
+
+    if scheme == 'linear':
+        rows.append(np.arange(vertex_count))
+        columns.append(np.arange(vertex_count))
+        weights.append(np.ones(vertex_count))
+        stencil = (np.concatenate(rows), np.concatenate(columns), np.concatenate(weights))
+        return stencil, vertex_count + len(edges), new_triangles
+
+    # Loop: 면 두 개가 공유하는 안쪽 변은 3/8 (끝점), 1/8 (양쪽 면의 반대편 꼭짓점)
+    interior = edge_faces == 2
+    weights[0] = np.where(np.repeat(interior, 2), 3 / 8, 0.5)
+    opposite = np.roll(triangles, -2, axis=1).ravel()  # 변 (i, i+1)의 반대편 꼭짓점 i+2
+    interior_corners = interior[loop_edges]
+    rows.append(edge_vertices[loop_edges[interior_corners]])
+    columns.append(opposite[interior_corners])
+    weights.append(np.full(np.count_nonzero(interior_corners), 1 / 8))
+
+    # 원래 정점: 경계(면이 하나인 변) 정점은 경계 이웃 두 개와 3/4, 1/8, 1/8
+    # 안쪽 정점은 이웃 n개와 Loop의 beta 가중치. 경계가 두 갈래 이상 만나는 정점과 떨어진 정점은 그대로 둡니다.
+    boundary_edges = edges[edge_faces != 2]
+    boundary_degree = np.bincount(boundary_edges.ravel(), minlength=vertex_count)
+    degree = np.bincount(edges.ravel(), minlength=vertex_count)
+    fixed = (boundary_degree > 0) & (boundary_degree != 2) | (degree == 0)
+    on_boundary = (boundary_degree == 2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = (5 / 8 - (3 / 8 + np.cos(2 * np.pi / degree) / 4) ** 2) / degree
+    beta = np.where(degree > 0, beta, 0.0)
+    self_weight = np.where(fixed, 1.0, np.where(on_boundary, 3 / 4, 1 - degree * beta))
+    rows.append(np.arange(vertex_count))
+    columns.append(np.arange(vertex_count))
+    weights.append(self_weight)
+
+    both = np.concatenate([edges, edges[:, ::-1]])
+    interior_vertex = ~fixed & ~on_boundary
+    use = interior_vertex[both[:, 0]]
+    rows.append(both[use, 0])
+    columns.append(both[use, 1])
+    weights.append(beta[both[use, 0]])
+
+    boundary_both = np.concatenate([boundary_edges, boundary_edges[:, ::-1]])
+    use = on_boundary[boundary_both[:, 0]]
+    rows.append(boundary_both[use, 0])
+    columns.append(boundary_both[use, 1])
+    weights.append(np.full(np.count_nonzero(use), 1 / 8))
+
+    stencil = (np.concatenate(rows), np.concatenate(columns), np.concatenate(weights))
+    return stencil, vertex_count + len(edges), new_triangles
+
+
+# levels 단계만큼 세분화하는 stencil을 한 행렬로 합쳐서 만듭니다.
+def build_stencil(triangles, vertex_count, levels, scheme='loop'):
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    stencil = (np.arange(vertex_count), np.arange(vertex_count), np.ones(vertex_count))
+    current_count = vertex_count
+
+    for _ in range(levels):
+        level, next_count, triangles = subdivide_once(triangles, current_count, scheme)
+        stencil = compose(level, stencil, vertex_count)
+        current_count = next_count
+
+    return SubdivisionStencil(*stencil, current_count, vertex_count, triangles)
+
+
+# ------------------캐시 부분-------------------------
+
+def get_stencil_cache_path(triangles, vertex_count, levels, scheme, cache_dir=None):
+    digest = hashlib.sha1(np.ascontiguousarray(triangles, dtype='<i4').tobytes()).hexdigest()[:16]
+    filename = f"subdivision_v{SUBDIVISION_CACHE_VERSION}_{scheme}_{levels}_{vertex_count}_{digest}.npz"
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, filename)
+
+
+def _load_cached_stencil(cache_path, source_count):
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            return SubdivisionStencil(data['rows'], data['columns'], data['weights'], int(data['vertex_count']),
+                                      source_count, data['triangles'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save_cached_stencil(cache_path, stencil):
+    # 여러 프로세스가 동시에 쓰더라도 깨진 파일이 남지 않도록 임시 파일에 쓴 뒤 교체합니다.
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.savez(file, rows=stencil.rows.astype(np.int32), columns=stencil.columns.astype(np.int32),
+                     weights=stencil.weights, vertex_count=stencil.vertex_count, triangles=stencil.triangles)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not write subdivision cache: {e}")
+
+
+# 토폴로지와 단계 수에 맞는 stencil을 돌려줍니다. 메모리 -> 디스크 캐시 -> 새로 계산 순서로 찾습니다.
+def get_subdivision_stencil(triangles, vertex_count, levels, scheme='loop', cache_dir=None, use_disk_cache=True):
+    cache_path = get_stencil_cache_path(triangles, vertex_count, levels, scheme, cache_dir)
+    if cache_path in _stencils:
+        return _stencils[cache_path]
+
+    stencil = _load_cached_stencil(cache_path, vertex_count) if use_disk_cache else None
+    if stencil is None:
+        stencil = build_stencil(triangles, vertex_count, levels, scheme)
+        if use_disk_cache:
+            _save_cached_stencil(cache_path, stencil)
+
+    stencil.triangles.setflags(write=False)
+    _stencils[cache_path] = stencil
+    return stencil
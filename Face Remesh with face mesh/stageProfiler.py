@@ -0,0 +1,289 @@
+import atexit
+import glob
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+
+# 파이프라인 단계별 시간, 호출 횟수, 최대 메모리를 기록하는 가벼운 계측 도구입니다.
+# 계측하지 않을 때는 stage()가 미리 만들어 둔 빈 context manager를 돌려주므로 비용이 거의 없습니다.
+#
+#   with stage('face_mesh'):
+#       landmarks = session.process(image)
+#
+# 켜는 방법:
+#   - 코드에서 enable() (블렌더 스크립트 등), 끝난 뒤 write_chrome_trace(path), print(format_summary())
+#   - faceConstruction.py / evaluateFolder.py 의 --profile <trace.json> (--profile-memory) 옵션
+#   - 환경 변수 FACE_REMESH_PROFILE=<trace.json> : 프로세스가 끝날 때 trace와 요약 표를 자동으로 남깁니다.
+#     FACE_REMESH_PROFILE_MEMORY=1 을 같이 주면 단계별 최대 메모리도 기록합니다. (tracemalloc 사용으로 느려짐)
+#     tracemalloc의 최대값은 프로세스 전체 값이므로, 다른 스레드의 단계와 겹쳐서 실행된 단계는 메모리를 기록하지 않습니다.
+#     (process_sequence처럼 스레드가 동시에 도는 경우 메모리가 필요하면 workers=1 등으로 단계를 겹치지 않게 실행하세요)
+# trace 파일은 chrome://tracing 또는 https://ui.perfetto.dev 에서 열 수 있습니다.
+# 워커 프로세스(faceBatch의 workers > 1)는 환경 변수를 물려받아 각자 <이름>.<pid>.json 으로 trace를 쓰고,
+# 메인 프로세스가 끝날 때 이 파일들을 모아서 하나의 trace와 요약 표로 합칩니다.
+
+PROFILE_ENV = "FACE_REMESH_PROFILE"
+PROFILE_MEMORY_ENV = "FACE_REMESH_PROFILE_MEMORY"
+
+_enabled = False
+_trace_memory = False
+_events = []
+_local = threading.local()
+# 단계가 열려 있는 스레드별 깊이와, 다른 스레드의 단계와 겹칠 때마다 늘어나는 번호 (메모리 기록 여부 판단용)
+_memory_lock = threading.Lock()
+_memory_threads = {}
+_memory_overlaps = 0
+_origin = time.perf_counter()
+_started = time.time()
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('name', 'args', 'start', 'memory_start', 'peak', 'overlaps')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = _stack()
+        if _trace_memory and _enter_memory_stage():
+            current, peak = tracemalloc.get_traced_memory()
+            # 바깥 단계의 최대값을 먼저 넘겨준 뒤, 이 단계의 최대값을 새로 잽니다.
+            if stack and stack[-1].overlaps is not None:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.memory_start, self.peak = current, current
+            self.overlaps = _memory_overlaps
+        else:
+            self.overlaps = None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        end = time.perf_counter()
+        stack = _stack()
+        stack.pop()
+
+        event = {'name': self.name, 'start': self.start, 'duration': end - self.start,
+                 'thread': threading.get_ident()}
+        if self.args:
+            event['args'] = self.args
+        if _trace_memory:
+            solo = _exit_memory_stage(self.overlaps)
+            if solo:
+                self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+                event['peak_memory'] = self.peak - self.memory_start
+                if stack and stack[-1].overlaps is not None:
+                    stack[-1].peak = max(stack[-1].peak, self.peak)
+        _events.append(event)
+        return False
+
+
+# 단계에 들어갈 때 다른 스레드에 열린 단계가 있으면 양쪽 모두 메모리를 기록하지 않습니다.
+# (겹침 번호를 올려서 이미 열려 있던 다른 스레드의 단계도 끝날 때 알 수 있게 합니다)
+def _enter_memory_stage():
+    global _memory_overlaps
+    thread = threading.get_ident()
+    with _memory_lock:
+        solo = all(other == thread for other in _memory_threads)
+        if not solo:
+            _memory_overlaps += 1
+        _memory_threads[thread] = _memory_threads.get(thread, 0) + 1
+    return solo
+
+
+# 단계가 끝날 때, 들어간 뒤로 다른 스레드와 한 번도 겹치지 않았으면 True를 돌려줍니다.
+def _exit_memory_stage(overlaps):
+    thread = threading.get_ident()
+    with _memory_lock:
+        depth = _memory_threads.get(thread, 0) - 1
+        if depth > 0:
+            _memory_threads[thread] = depth
+        else:
+            _memory_threads.pop(thread, None)
+        return overlaps is not None and overlaps == _memory_overlaps
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+# 단계 하나를 기록하는 context manager. args는 trace에 함께 기록됩니다. (프레임 번호, 파일 이름 등)
+def stage(name, **args):
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name, args)
+
+
+def enable(trace_memory=False):
+    global _enabled, _trace_memory
+    _enabled = True
+    _trace_memory = trace_memory
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def disable():
+    global _enabled, _trace_memory
+    _enabled = False
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _trace_memory = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    _events.clear()
+
+
+# ------------------결과 출력 부분-------------------------
+
+# 단계 이름별 호출 횟수, 전체/평균/최대 시간(초), 최대 메모리(바이트)를 전체 시간이 긴 순서로 돌려줍니다.
+def summary():
+    stages = {}
+    for event in list(_events):
+        entry = stages.setdefault(event['name'], {'stage': event['name'], 'calls': 0, 'total': 0.0, 'max': 0.0})
+        entry['calls'] += 1
+        entry['total'] += event['duration']
+        entry['max'] = max(entry['max'], event['duration'])
+        if 'peak_memory' in event:
+            entry['peak_memory'] = max(entry.get('peak_memory', 0), event['peak_memory'])
+
+    for entry in stages.values():
+        entry['mean'] = entry['total'] / entry['calls']
+    return sorted(stages.values(), key=lambda entry: entry['total'], reverse=True)
+
+
+def format_summary():
+    rows = summary()
+    has_memory = any('peak_memory' in row for row in rows)
+    width = max([len("stage")] + [len(row['stage']) for row in rows])
+
+    header = f"{'stage':<{width}}  {'calls':>7}  {'total s':>9}  {'mean ms':>9}  {'max ms':>9}"
+    if has_memory:
+        header += f"  {'peak MB':>8}"
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        line = (f"{row['stage']:<{width}}  {row['calls']:>7}  {row['total']:>9.3f}  "
+                f"{row['mean'] * 1000:>9.2f}  {row['max'] * 1000:>9.2f}")
+        if has_memory:
+            line += f"  {row.get('peak_memory', 0) / (1024 * 1024):>8.1f}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# Chrome trace 형식 (complete event "X", 시간 단위는 마이크로초)으로 씁니다.
+def write_chrome_trace(trace_path):
+    pid = os.getpid()
+    trace_events = []
+    for event in list(_events):
+        trace_event = {
+            'name': event['name'],
+            'ph': 'X',
+            'ts': (event['start'] - _origin) * 1e6,
+            'dur': event['duration'] * 1e6,
+            'pid': event.get('pid', pid),
+            'tid': event['thread'],
+        }
+        args = dict(event.get('args', {}))
+        if 'peak_memory' in event:
+            args['peak_memory'] = event['peak_memory']
+        if args:
+            trace_event['args'] = {key: value if isinstance(value, (int, float, bool)) else str(value)
+                                   for key, value in args.items()}
+        trace_events.append(trace_event)
+
+    tmp_path = trace_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        # origin: ts가 0인 시점의 벽시계 시간. 워커 trace를 합칠 때 프로세스 사이의 시작 시점 차이를 맞추는 데 씁니다.
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms', 'otherData': {'origin': _started}}, file)
+    os.replace(tmp_path, trace_path)
+
+
+# 이번 실행에서 워커 프로세스가 쓴 <이름>.<pid>.json 파일을 읽어서 기록에 더하고 지웁니다.
+# 워커의 ts는 워커 프로세스의 시작 시점 기준이므로, 두 프로세스의 origin 차이만큼 옮겨서 메인 기준으로 맞춥니다.
+def _merge_worker_traces(trace_path):
+    root, extension = os.path.splitext(trace_path)
+    pattern = re.compile(re.escape(root) + r'\.\d+' + re.escape(extension) + '$')
+    for worker_path in glob.glob(glob.escape(root) + '.*' + extension):
+        if not pattern.match(worker_path):
+            continue
+        try:
+            if os.path.getmtime(worker_path) < _started:
+                continue
+            with open(worker_path, encoding='utf-8') as file:
+                trace = json.load(file)
+            trace_events = trace['traceEvents']
+            offset = float(trace.get('otherData', {}).get('origin', _started)) - _started
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            continue
+
+        for trace_event in trace_events:
+            args = dict(trace_event.get('args', {}))
+            event = {'name': trace_event['name'], 'start': _origin + offset + trace_event['ts'] / 1e6,
+                     'duration': trace_event['dur'] / 1e6, 'thread': trace_event['tid'], 'pid': trace_event['pid']}
+            if 'peak_memory' in args:
+                event['peak_memory'] = args.pop('peak_memory')
+            if args:
+                event['args'] = args
+            _events.append(event)
+        os.remove(worker_path)
+
+
+def _write_on_exit(trace_path, verbose=True):
+    if verbose:
+        _merge_worker_traces(trace_path)
+    if not _events:
+        return
+    write_chrome_trace(trace_path)
+    if verbose:
+        print(format_summary())
+        print(f"Profile trace written to {trace_path}")
+
+
+# 명령줄 도구의 --profile 옵션: 계측을 켜고 프로세스가 끝날 때 trace와 요약 표를 남깁니다.
+# 환경 변수도 같이 설정하므로 이후에 띄우는 워커 프로세스도 각자 trace를 씁니다.
+def profile_to(trace_path, trace_memory=False):
+    os.environ[PROFILE_ENV] = os.path.abspath(trace_path)
+    if trace_memory:
+        os.environ[PROFILE_MEMORY_ENV] = '1'
+    _start_from_environment()
+
+
+def _start_from_environment():
+    import multiprocessing
+    from multiprocessing import util
+
+    enable(trace_memory=os.environ.get(PROFILE_MEMORY_ENV, '') not in ('', '0'))
+    # spawn 워커는 메인 모듈을 다시 import 하는 동안 이 모듈을 불러오므로 parent_process() 대신 이름으로 구분합니다.
+    if multiprocessing.current_process().name == 'MainProcess':
+        atexit.register(_write_on_exit, os.environ[PROFILE_ENV])
+    else:
+        # 워커 프로세스는 atexit을 실행하지 않고 끝나므로 multiprocessing의 종료 처리에 등록합니다.
+        root, extension = os.path.splitext(os.environ[PROFILE_ENV])
+        util.Finalize(None, _write_on_exit, args=(f"{root}.{os.getpid()}{extension}", False), exitpriority=0)
+
+
+# 환경 변수로 켠 경우 이 모듈을 처음 불러올 때 계측을 시작합니다.
+if os.environ.get(PROFILE_ENV):
+    _start_from_environment()
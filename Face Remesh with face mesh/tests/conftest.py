@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 애드온 모듈은 패키지가 아니라 한 폴더에 놓인 스크립트이므로, 테스트에서 같은 이름으로 불러올 수 있도록 경로에 추가합니다.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,22 @@
+import benchmarkSuite
+
+
+# 모든 측정 항목이 small 크기에서 끝까지 실행되는지 확인합니다. (bpy 대용 모듈로 evaluateMesh/attachMesh를 불러오는 것 포함)
+def test_every_benchmark_runs_at_small_scale():
+    results = benchmarkSuite.run_benchmarks('small', repeats=1, memory=False, verbose=False)
+
+    names = {record['benchmark'] for record in results}
+    assert names == {name for name, _, _ in benchmarkSuite.BENCHMARKS}
+    assert all(record['best'] > 0 for record in results)
+
+
+# 대용 bpy가 애드온의 등록/해제에서 쓰는 부분(app.handlers 등)을 갖추고 있는지 확인합니다.
+def test_blender_stand_ins_cover_evaluate_mesh_registration():
+    benchmarkSuite.install_blender_stand_ins()
+    import bpy
+    import evaluateMesh
+
+    evaluateMesh.register()
+    assert evaluateMesh._mark_stale_results in bpy.app.handlers.depsgraph_update_post
+    evaluateMesh.unregister()
+    assert evaluateMesh._mark_stale_results not in bpy.app.handlers.depsgraph_update_post
@@ -0,0 +1,113 @@
+import types
+
+import numpy as np
+import pytest
+
+import benchmarkSuite
+import meshQuality
+
+benchmarkSuite.install_blender_stand_ins()
+
+import bpy  # noqa: E402  (대용 모듈)
+import evaluateMesh  # noqa: E402
+
+
+# read_mesh_arrays가 돌려주는 것과 같은 형태의 배열 (삼각형 면만 있는 메쉬)
+def mesh_arrays(positions, triangles):
+    triangles = np.asarray(triangles, dtype=np.int32)
+    loop_totals = np.full(len(triangles), 3, dtype=np.int32)
+    edges, loop_edges = meshQuality.polygon_edges(triangles.ravel(), loop_totals)
+    return {
+        'positions': np.array(positions, dtype=np.float64),
+        'triangles': triangles,
+        'triangle_polygons': np.arange(len(triangles), dtype=np.int32),
+        'edges': edges,
+        'loop_edges': loop_edges,
+        'polygon_count': len(triangles),
+        'vertex_select': np.zeros(len(positions), dtype=bool),
+        'polygon_select': np.zeros(len(triangles), dtype=bool),
+        'loop_totals': loop_totals,
+    }
+
+
+def stub_object(uid=1, mesh_uid=10):
+    obj = bpy.types.Object()
+    obj.session_uid = uid
+    obj.data = types.SimpleNamespace(session_uid=mesh_uid)
+    obj.mode = 'OBJECT'
+    obj.original = obj
+    return obj
+
+
+def depsgraph_update(obj, geometry=True):
+    update = types.SimpleNamespace(id=obj, is_updated_geometry=geometry, is_updated_transform=False)
+    evaluateMesh._mark_stale_results(None, types.SimpleNamespace(updates=[update]))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    yield
+    for key in list(evaluateMesh._result_cache):
+        evaluateMesh.discard_result(key)
+    evaluateMesh._own_updates.clear()
+
+
+@pytest.fixture
+def stored():
+    positions, triangles = benchmarkSuite.grid(30)
+    obj = stub_object()
+    data = mesh_arrays(positions, triangles)
+    result = evaluateMesh.build_result(data, meshQuality.evaluate_quality(data['positions'], data['triangles']))
+    evaluateMesh.store_result(obj, data, result)
+    return obj, data, result
+
+
+# 정점을 움직이고 패널을 다시 그린 뒤에도 결과가 남아 있어서, 다음 계산이 움직인 주변만 다시 계산하는지 확인합니다.
+def test_vertex_move_keeps_result_for_incremental_update(stored):
+    obj, data, result = stored
+    moved = mesh_arrays(data['positions'], data['triangles'])
+    moved['positions'][100] += (0.01, -0.02, 0.03)
+    depsgraph_update(obj)
+
+    # 패널: 저장된 결과는 그대로 있고 outdated 표시만 읽습니다.
+    assert evaluateMesh.get_cached_result(obj) is result
+    assert evaluateMesh.is_result_outdated(obj)
+
+    # 오퍼레이터: 토폴로지가 같으므로 같은 결과를 증분 계산에 씁니다.
+    assert evaluateMesh.validate_result(obj, moved) is result
+    evaluation = result['evaluation']
+    assert 0 < evaluation.update(moved['positions']) < len(data['triangles']) // 10
+    evaluateMesh.store_result(obj, moved, result)
+    assert not evaluateMesh.is_result_outdated(obj)
+
+    fresh = meshQuality.evaluate_quality(moved['positions'], moved['triangles'])
+    for key, _, _ in meshQuality.METRICS:
+        np.testing.assert_allclose(evaluation.metrics[key], fresh.metrics[key], rtol=1e-12)
+
+
+def test_topology_change_discards_result(stored):
+    obj, data, result = stored
+    changed = mesh_arrays(data['positions'], data['triangles'][:-1])
+    depsgraph_update(obj)
+
+    assert evaluateMesh.validate_result(obj, changed) is None
+    assert evaluateMesh.get_cached_result(obj) is None
+
+
+def test_other_mesh_data_is_not_shown(stored):
+    obj, _, _ = stored
+    obj.data = types.SimpleNamespace(session_uid=11)
+    assert evaluateMesh.get_cached_result(obj) is None
+
+
+# 오퍼레이터가 면 속성을 쓰면서 생긴 갱신은 편집으로 보지 않습니다.
+def test_own_attribute_update_does_not_mark_outdated(stored):
+    obj, data, _ = stored
+    evaluateMesh.expect_own_update(obj)
+    depsgraph_update(obj)
+    assert not evaluateMesh.is_result_outdated(obj)
+
+    depsgraph_update(obj)
+    assert evaluateMesh.is_result_outdated(obj)
+    assert evaluateMesh.validate_result(obj, data) is not None
+    assert not evaluateMesh.is_result_outdated(obj)
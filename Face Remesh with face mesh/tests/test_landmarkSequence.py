@@ -0,0 +1,142 @@
+import types
+
+import numpy as np
+import pytest
+
+import landmarkSequence
+
+
+LANDMARK_COUNT = 20
+
+
+@pytest.fixture
+def triangles():
+    return np.random.default_rng(0).integers(0, LANDMARK_COUNT, size=(7, 3))
+
+
+@pytest.fixture
+def frames():
+    return np.random.default_rng(1).normal(size=(4, LANDMARK_COUNT, 3)).astype(np.float32)
+
+
+# ------------------쓰기/읽기 부분-------------------------
+
+def test_frames_round_trip_through_memmap(tmp_path, triangles, frames):
+    filename = str(tmp_path / f"take{landmarkSequence.SEQUENCE_EXTENSION}")
+    with landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT) as writer:
+        indices = [writer.append(frame) for frame in frames]
+    assert indices == [0, 1, 2, 3]
+
+    sequence = landmarkSequence.open_sequence(filename)
+    assert len(sequence) == len(frames)
+    assert isinstance(sequence.frames, np.memmap)
+    np.testing.assert_array_equal(sequence.triangles, triangles)
+    np.testing.assert_array_equal(sequence[2], frames[2])
+    np.testing.assert_array_equal(sequence.frames, frames)
+    # 프레임 블록은 정렬된 위치에서 시작합니다.
+    assert sequence.frames.offset % landmarkSequence.FRAME_ALIGNMENT == 0
+
+
+def test_missing_faces_are_stored_as_nan_frames(tmp_path, triangles, frames):
+    filename = str(tmp_path / 'take.lmseq')
+    with landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT) as writer:
+        writer.append(frames[0])
+        writer.append(None)
+        writer.append(frames[1])
+
+    sequence = landmarkSequence.open_sequence(filename)
+    assert [sequence.is_missing(index) for index in range(len(sequence))] == [False, True, False]
+    assert np.isnan(sequence[1]).all()
+    np.testing.assert_array_equal(sequence[2], frames[1])
+
+
+def test_empty_sequence_has_no_frames(tmp_path, triangles):
+    filename = str(tmp_path / 'take.lmseq')
+    landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT).close()
+
+    sequence = landmarkSequence.open_sequence(filename)
+    assert len(sequence) == 0
+    assert sequence.frames.shape == (0, LANDMARK_COUNT, 3)
+
+
+def test_writer_appends_to_existing_sequence(tmp_path, triangles, frames):
+    filename = str(tmp_path / 'take.lmseq')
+    with landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT) as writer:
+        writer.append(frames[0])
+        writer.append(frames[1])
+
+    # 중단 후 다시 열면 기존 프레임 뒤에 이어서 씁니다.
+    with landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT) as writer:
+        assert len(writer) == 2
+        assert writer.append(frames[2]) == 2
+
+    np.testing.assert_array_equal(landmarkSequence.open_sequence(filename).frames, frames[:3])
+
+
+def test_header_only_counts_complete_frames(tmp_path, triangles, frames):
+    filename = str(tmp_path / 'take.lmseq')
+    with landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT) as writer:
+        writer.append(frames[0])
+
+    # 헤더를 갱신하기 전에 끊긴 쓰기처럼 파일 끝에 일부 프레임만 남깁니다.
+    with open(filename, 'ab') as file:
+        file.write(frames[1].tobytes()[:100])
+
+    assert len(landmarkSequence.open_sequence(filename)) == 1
+    with landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT) as writer:
+        writer.append(frames[2])
+    np.testing.assert_array_equal(landmarkSequence.open_sequence(filename).frames, frames[[0, 2]])
+
+
+# ------------------검사 부분-------------------------
+
+def test_writer_rejects_different_topology(tmp_path, triangles):
+    filename = str(tmp_path / 'take.lmseq')
+    landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT).close()
+
+    with pytest.raises(ValueError):
+        landmarkSequence.SequenceWriter(filename, triangles[::-1], LANDMARK_COUNT)
+    with pytest.raises(ValueError):
+        landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT + 1)
+
+
+def test_writer_rejects_wrong_frame_shape(tmp_path, triangles):
+    with landmarkSequence.SequenceWriter(str(tmp_path / 'take.lmseq'), triangles, LANDMARK_COUNT) as writer:
+        with pytest.raises(ValueError):
+            writer.append(np.zeros((LANDMARK_COUNT - 1, 3)))
+        assert len(writer) == 0
+
+
+def test_open_rejects_other_files(tmp_path):
+    short = tmp_path / 'short.lmseq'
+    short.write_bytes(b'FRLM')
+    other = tmp_path / 'other.lmseq'
+    other.write_bytes(b'\0' * landmarkSequence.HEADER_SIZE)
+
+    for filename in (short, other):
+        with pytest.raises(ValueError):
+            landmarkSequence.open_sequence(str(filename))
+
+
+# ------------------블렌더 메쉬 적용 부분-------------------------
+
+class StandInVertices:
+    def foreach_set(self, attribute, values):
+        self.values = (attribute, np.array(values))
+
+
+def test_apply_frame_to_mesh_converts_obj_axes(tmp_path, triangles, frames):
+    filename = str(tmp_path / 'take.lmseq')
+    with landmarkSequence.SequenceWriter(filename, triangles, LANDMARK_COUNT) as writer:
+        writer.append(frames[0])
+
+    updates = []
+    mesh = types.SimpleNamespace(vertices=StandInVertices(), update=lambda: updates.append(True))
+    landmarkSequence.apply_frame_to_mesh(mesh, landmarkSequence.open_sequence(filename), 0,
+                                         axes=landmarkSequence.OBJ_TO_BLENDER_AXES)
+
+    attribute, values = mesh.vertices.values
+    x, y, z = frames[0].T
+    assert attribute == "co" and updates == [True]
+    # OBJ import와 같이 (x, y, z) -> (x, -z, y)
+    np.testing.assert_array_equal(values.reshape(-1, 3), np.stack([x, -z, y], axis=1))
@@ -0,0 +1,86 @@
+import types
+
+import numpy as np
+import pytest
+
+import faceConstruction
+import meshIO
+
+
+# MediaPipe landmark처럼 x, y, z 속성을 가진 객체 목록 (값은 float32로 표현 가능한 값)
+@pytest.fixture
+def landmarks():
+    rng = np.random.default_rng(0)
+    points = rng.uniform([0.2, 0.1, -0.08], [0.8, 0.9, 0.05], size=(faceConstruction.FACE_LANDMARK_COUNT, 3))
+    points = points.astype(np.float32).tolist()
+    points[0] = [0.5, 0.5, 0.0]
+    return [types.SimpleNamespace(x=x, y=y, z=z) for x, y, z in points]
+
+
+@pytest.fixture
+def triangles():
+    rng = np.random.default_rng(1)
+    return rng.integers(0, faceConstruction.FACE_LANDMARK_COUNT, size=(900, 3))
+
+
+# 원래 export_landmarks_to_obj의 한 줄씩 쓰는 방식 그대로의 기준 구현
+def baseline_obj(landmarks, faces, filename):
+    with open(filename, 'w') as file:
+        for landmark in landmarks:
+            x = (landmark.x - 0.5) * 1
+            y = (landmark.y - 0.5) * -0.5625
+            z = -landmark.z
+            file.write(f"v {x} {y} {z}\n")
+
+        for v1, v2, v3 in faces:
+            file.write(f"f {v1 + 1} {v2 + 1} {v3 + 1}\n")
+
+
+# ------------------파일 쓰기 부분-------------------------
+
+def test_obj_export_is_byte_identical_to_baseline(tmp_path, landmarks, triangles):
+    baseline_obj(landmarks, triangles.tolist(), tmp_path / 'baseline.obj')
+    faceConstruction.export_landmarks_to_obj(landmarks, triangles, str(tmp_path / 'export.obj'))
+
+    expected = (tmp_path / 'baseline.obj').read_bytes()
+    assert (tmp_path / 'export.obj').read_bytes() == expected
+    positions = [(landmark.x, landmark.y, landmark.z) for landmark in landmarks]
+    assert meshIO.encode_mesh(meshIO.apply_camera_transform(positions), triangles, 'obj') == expected
+
+
+def test_camera_transform_matches_default_render_settings():
+    center, scale = meshIO.orthographic_transform()
+    np.testing.assert_array_equal(center, [0.5, 0.5, 0.0])
+    np.testing.assert_array_equal(scale, [1.0, -0.5625, -1.0])
+
+    # 세로 화면에서는 긴 변(높이)이 orthographic scale이 됩니다.
+    _, scale = meshIO.orthographic_transform(width=1080, height=1920, ortho_scale=2.0)
+    np.testing.assert_array_equal(scale, [1.125, -2.0, -1.125])
+
+
+@pytest.mark.parametrize('mesh_format', sorted(meshIO.MESH_FORMATS))
+def test_written_meshes_round_trip(tmp_path, mesh_format, triangles):
+    positions = np.random.default_rng(2).normal(size=(faceConstruction.FACE_LANDMARK_COUNT, 3))
+    filename = str(tmp_path / f"mesh{meshIO.MESH_FORMATS[mesh_format]}")
+    meshIO.write_mesh(filename, positions, triangles)
+
+    with open(filename, 'rb') as file:
+        assert file.read() == meshIO.encode_mesh(positions, triangles, mesh_format)
+
+    if mesh_format == 'npy':
+        # npy는 정점 좌표만 저장합니다.
+        np.testing.assert_array_equal(np.load(filename), positions.astype(np.float32))
+        return
+
+    mesh = meshIO.read_mesh(filename)
+    expected = positions if mesh_format == 'obj' else positions.astype(np.float32)
+    np.testing.assert_array_equal(mesh['positions'], expected)
+    np.testing.assert_array_equal(mesh['loop_totals'], 3)
+    np.testing.assert_array_equal(mesh['loop_vertices'], triangles.ravel())
+
+
+def test_unknown_formats_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        meshIO.write_mesh(str(tmp_path / 'mesh.stl'), np.zeros((3, 3)), [[0, 1, 2]])
+    with pytest.raises(ValueError):
+        meshIO.encode_mesh(np.zeros((3, 3)), [[0, 1, 2]], 'stl')
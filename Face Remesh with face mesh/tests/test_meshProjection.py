@@ -0,0 +1,249 @@
+import numpy as np
+import pytest
+
+import benchmarkSuite
+import meshProjection
+
+
+# 잡음을 넣은 구 (타겟 표면 대용)
+@pytest.fixture(scope='module')
+def sphere():
+    positions, triangles = benchmarkSuite.icosphere(3)
+    positions = positions * (1.0 + np.random.default_rng(0).normal(scale=0.02, size=(len(positions), 1)))
+    return positions, triangles
+
+
+# Möller–Trumbore 교차 검사로 모든 삼각형을 확인하는 기준 레이캐스트 (가장 가까운 교차, 거리가 같으면 앞 번호)
+def moller_trumbore(origins, direction, positions, triangles):
+    a, b, c = (positions[triangles[:, i]] for i in range(3))
+    ab, ac = b - a, c - a
+    hit = np.zeros(len(origins), dtype=bool)
+    distance = np.full(len(origins), np.nan)
+    face_index = np.full(len(origins), -1)
+    for ray, origin in enumerate(origins):
+        p = np.cross(direction, ac)
+        determinant = np.einsum('ij,ij->i', ab, p)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse = 1.0 / determinant
+            s = origin - a
+            u = np.einsum('ij,ij->i', s, p) * inverse
+            q = np.cross(s, ab)
+            v = (q @ direction) * inverse
+            t = np.einsum('ij,ij->i', ac, q) * inverse
+        valid = (np.abs(determinant) > 1e-14) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+        if valid.any():
+            candidates = np.flatnonzero(valid)
+            nearest = candidates[np.lexsort((candidates, t[candidates]))[0]]
+            hit[ray], distance[ray], face_index[ray] = True, t[nearest], nearest
+    return hit, distance, face_index
+
+
+# ------------------평행 광선 투영-------------------------
+
+@pytest.mark.parametrize('direction', [(0.0, 0.0, -1.0), (0.3, -0.2, -1.0), (1.0, 0.0, 0.0)])
+def test_ray_caster_matches_moller_trumbore(sphere, direction):
+    positions, triangles = sphere
+    direction = np.asarray(direction) / np.linalg.norm(direction)
+    rotation = meshProjection.ray_basis(direction)
+    rng = np.random.default_rng(1)
+    # 광선 방향 뒤쪽 평면에서 구보다 넓은 영역에 시작점을 흩뿌립니다. (일부는 빗나감)
+    offsets = rng.uniform(-1.3, 1.3, size=(400, 2))
+    origins = offsets @ rotation[:2] - 3.0 * direction
+
+    caster = meshProjection.OrthographicRayCaster(positions, triangles, direction)
+    hit, locations, normals, face_index, distance = caster.cast(origins)
+    expected_hit, expected_distance, expected_face = moller_trumbore(origins, direction, positions, triangles)
+
+    assert 0 < hit.sum() < len(origins)
+    np.testing.assert_array_equal(hit, expected_hit)
+    np.testing.assert_array_equal(face_index, expected_face)
+    np.testing.assert_allclose(distance[hit], expected_distance[hit], rtol=1e-10)
+    np.testing.assert_allclose(locations[hit], origins[hit] + distance[hit, None] * direction, atol=1e-12)
+    assert np.isnan(distance[~hit]).all() and np.isnan(normals[~hit]).all()
+
+
+def test_ray_caster_respects_max_distance(sphere):
+    positions, triangles = sphere
+    caster = meshProjection.OrthographicRayCaster(positions, triangles, (0.0, 0.0, -1.0))
+    origins = np.array([[0.0, 0.0, 3.0], [0.0, 0.0, 0.0]])
+
+    hit, _, _, _, distance = caster.cast(origins, max_distance=1.5)
+    # 첫 광선은 구까지 약 2 떨어져 있고, 구 안쪽에서 시작한 광선은 아래쪽 면에 닿습니다.
+    np.testing.assert_array_equal(hit, [False, True])
+    assert distance[1] == pytest.approx(1.0, abs=0.1)
+
+
+# ------------------캐시 키-------------------------
+
+def test_geometry_key_changes_with_content_dtype_and_shape():
+    positions = np.random.default_rng(2).normal(size=(50, 3))
+    key = meshProjection.geometry_key(positions)
+    nudged = positions.copy()
+    nudged[10, 1] += 1e-12
+
+    assert meshProjection.geometry_key(positions.copy()) == key
+    assert meshProjection.geometry_key(nudged) != key
+    assert meshProjection.geometry_key(positions.astype(np.float32)) != key
+    assert meshProjection.geometry_key(positions.reshape(3, 50)) != key
+
+
+# 채우기 구조가 많이 생겨도 다른 종류의 캐시(투영, 최근접점)는 밀려나지 않습니다.
+def test_projection_caches_are_separate_per_kind(sphere):
+    positions, triangles = sphere
+    meshProjection.clear_cache()
+    caster = meshProjection.get_ray_caster(positions, triangles, (0.0, 0.0, -1.0))
+    index = meshProjection.get_closest_point_index(positions, triangles)
+
+    edges = np.array([[0, 1], [1, 2], [2, 3]])
+    for size in range(4, 4 + 2 * meshProjection.PROJECTION_CACHE_SIZES['fill']):
+        meshProjection.get_harmonic_fill(edges, size, np.arange(size) != 1)
+
+    key = meshProjection.target_key(positions, triangles)
+    assert meshProjection.get_ray_caster(positions, triangles, (0.0, 0.0, -1.0), key) is caster
+    assert meshProjection.get_closest_point_index(positions, triangles, key) is index
+    assert meshProjection.get_ray_caster(positions, triangles, (0.0, 0.0, 1.0), key) is not caster
+    meshProjection.clear_cache()
+
+
+# ------------------깊이 맵 투영-------------------------
+
+def camera_above(height=5.0):
+    camera_matrix = np.eye(4)
+    camera_matrix[2, 3] = height
+    return camera_matrix
+
+
+# 기울어진 평면의 depth는 픽셀 사이에서 선형이므로 bilinear 조회 결과가 정확한 교차 거리와 같아야 합니다.
+def test_depth_map_is_exact_on_a_plane():
+    positions, triangles = benchmarkSuite.grid(20)
+    positions[:, 2] = 0.3 * positions[:, 0] - 0.2 * positions[:, 1]
+    depth_map = meshProjection.DepthMap(positions, triangles, camera_above(), 2.4, 200, 160)
+
+    xy = np.random.default_rng(3).uniform(-0.9, 0.9, size=(300, 2))
+    origins = np.column_stack([xy, np.full(len(xy), 2.0)])
+    hit, locations, _, _, distance = depth_map.cast(origins)
+
+    assert hit.all()
+    np.testing.assert_allclose(distance, 2.0 - (0.3 * xy[:, 0] - 0.2 * xy[:, 1]), atol=1e-9)
+    np.testing.assert_allclose(locations[:, :2], xy, atol=1e-12)
+
+
+# 곡면에서는 실루엣에서 떨어진 안쪽 점이 레이캐스트와 픽셀 크기 이하의 차이로 같아야 합니다.
+def test_depth_map_matches_ray_caster_inside_silhouette(sphere):
+    positions, triangles = sphere
+    depth_map = meshProjection.DepthMap(positions, triangles, camera_above(), 3.0, 512, 512)
+    caster = meshProjection.OrthographicRayCaster(positions, triangles, (0.0, 0.0, -1.0))
+
+    xy = np.random.default_rng(4).uniform(-0.7, 0.7, size=(300, 2))
+    origins = np.column_stack([xy, np.full(len(xy), 3.0)])
+    hit, _, _, face_index, distance = depth_map.cast(origins)
+    expected_hit, _, _, expected_face, expected_distance = caster.cast(origins)
+
+    np.testing.assert_array_equal(hit, expected_hit)
+    np.testing.assert_allclose(distance, expected_distance, atol=2e-3)
+    # 면 번호는 가장 가까운 픽셀의 면이므로 삼각형 경계 근처가 아니면 같습니다.
+    assert np.mean(face_index == expected_face) > 0.9
+
+
+def test_depth_map_misses_outside_frame_and_behind_camera():
+    positions, triangles = benchmarkSuite.grid(10)
+    depth_map = meshProjection.DepthMap(positions, triangles, camera_above(), 1.0, 64, 64)
+    origins = np.array([[2.0, 0.0, 1.0], [0.1, 0.1, -1.0], [0.1, 0.1, 1.0]])
+
+    hit, _, _, face_index, distance = depth_map.cast(origins)
+    np.testing.assert_array_equal(hit, [False, False, True])
+    np.testing.assert_array_equal(face_index[:2], [-1, -1])
+    assert np.isnan(distance[:2]).all()
+
+
+# ------------------빈 정점 채우기-------------------------
+
+def grid_edges(size):
+    positions, triangles = benchmarkSuite.grid(size)
+    edges = np.unique(np.sort(np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]),
+                              axis=1), axis=0)
+    return positions, edges
+
+
+# 경계 정점이 선형 함수 위에 있으면 (정점마다 이웃이 대칭인 격자에서) 조화 채우기는 같은 선형 함수를 재현합니다.
+@pytest.mark.parametrize('use_scipy', [True, False])
+def test_harmonic_fill_reproduces_linear_field(monkeypatch, use_scipy):
+    if not use_scipy:
+        monkeypatch.setattr(meshProjection, 'splu', None)
+    positions, edges = grid_edges(15)
+    linear = np.column_stack([positions[:, 0], positions[:, 1], 0.4 * positions[:, 0] - 0.7 * positions[:, 1] + 0.2])
+    border = (np.abs(positions[:, 0]) == 1.0) | (np.abs(positions[:, 1]) == 1.0)
+
+    start = linear.copy()
+    start[~border] = np.random.default_rng(5).normal(size=(np.count_nonzero(~border), 3))
+    filled = meshProjection.HarmonicFill(edges, len(positions), border).solve(start)
+
+    np.testing.assert_allclose(filled, linear, atol=1e-10)
+
+
+# 고정된 정점과 이어지지 않은 빈 정점은 풀 수 없으므로 원래 위치에 남습니다.
+def test_harmonic_fill_leaves_unreachable_vertices():
+    edges = np.array([[0, 1], [1, 2], [3, 4]])
+    fixed = np.array([True, False, True, False, False])
+    positions = np.arange(15, dtype=np.float64).reshape(5, 3)
+
+    filled = meshProjection.HarmonicFill(edges, 5, fixed).solve(positions)
+    np.testing.assert_allclose(filled[1], (positions[0] + positions[2]) / 2)
+    np.testing.assert_array_equal(filled[[0, 2, 3, 4]], positions[[0, 2, 3, 4]])
+    np.testing.assert_array_equal(meshProjection.reachable_from(edges, fixed), [True, True, True, False, False])
+
+
+# ------------------가장 가까운 표면 점-------------------------
+
+# 평면에 내린 수선의 발이 삼각형 안이면 평면 거리, 아니면 세 변까지 거리 중 최소 (모든 삼각형 검사)
+def brute_force_distances(points, positions, triangles):
+    a, b, c = (positions[triangles[:, i]] for i in range(3))
+    normals = np.cross(b - a, c - a)
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+
+    def segment_distance(point, p, q):
+        pq = q - p
+        t = np.clip(np.einsum('ij,ij->i', point - p, pq) / np.einsum('ij,ij->i', pq, pq), 0.0, 1.0)
+        return np.linalg.norm(point - (p + t[:, None] * pq), axis=1)
+
+    distances = []
+    for point in points:
+        height = np.einsum('ij,ij->i', point - a, normals)
+        foot = point - height[:, None] * normals
+        inside = np.ones(len(a), dtype=bool)
+        for p, q in ((a, b), (b, c), (c, a)):
+            inside &= np.einsum('ij,ij->i', np.cross(q - p, foot - p), normals) >= 0
+        edge = np.minimum.reduce([segment_distance(point, p, q) for p, q in ((a, b), (b, c), (c, a))])
+        distances.append(np.where(inside, np.abs(height), edge).min())
+    return np.array(distances)
+
+
+def test_closest_point_index_matches_brute_force(sphere):
+    positions, triangles = sphere
+    rng = np.random.default_rng(6)
+    directions = rng.normal(size=(300, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    points = np.vstack([directions * rng.uniform(0.3, 1.6, size=(300, 1)), [[4.0, -3.0, 2.0], [0.0, 0.0, 0.0]]])
+
+    index = meshProjection.ClosestPointIndex(positions, triangles)
+    found, locations, normals, face_index, distance = index.find_nearest(points)
+
+    assert found.all()
+    np.testing.assert_allclose(distance, brute_force_distances(points, positions, triangles), rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(np.linalg.norm(points - locations, axis=1), distance, rtol=1e-9, atol=1e-12)
+    # 찾은 위치는 돌려준 삼각형 위에 있어야 합니다.
+    np.testing.assert_allclose(brute_force_distances(locations[:50], positions, triangles), 0.0, atol=1e-12)
+    corners = positions[triangles[face_index]]
+    np.testing.assert_allclose(np.einsum('ij,ij->i', locations - corners[:, 0], normals), 0.0, atol=1e-12)
+
+
+def test_closest_point_snap_respects_max_distance_and_offset(sphere):
+    positions, triangles = sphere
+    index = meshProjection.ClosestPointIndex(positions, triangles)
+    points = np.array([[0.0, 0.0, 1.2], [0.0, 0.0, 3.0]])
+
+    snapped, moved = index.snap(points, max_distance=0.5, offset=0.01)
+    np.testing.assert_array_equal(moved, [True, False])
+    np.testing.assert_array_equal(snapped[1], points[1])
+    _, location, normal, _, _ = index.find_nearest(points[:1])
+    np.testing.assert_allclose(snapped[0], location[0] + 0.01 * normal[0])
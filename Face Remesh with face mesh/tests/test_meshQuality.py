@@ -0,0 +1,179 @@
+import types
+
+import numpy as np
+import pytest
+
+import benchmarkSuite
+import meshQuality
+
+
+# 잡음을 넣은 얼굴 모양 메쉬와 열린 격자 (경계 변이 있는 메쉬)
+@pytest.fixture(params=['face', 'grid'])
+def mesh(request):
+    if request.param == 'face':
+        positions, triangles = benchmarkSuite.synthetic_face(1)
+        positions = positions + np.random.default_rng(0).normal(scale=1e-3, size=positions.shape)
+    else:
+        positions, triangles = benchmarkSuite.grid(12)
+    return positions, triangles
+
+
+# 배열로 계산한 면별 지표가 기존 bmesh 면 단위 함수의 값과 같은지 확인합니다.
+def test_metrics_match_legacy_per_face_functions(mesh):
+    positions, triangles = mesh
+    metrics = meshQuality.evaluate_triangles(positions, triangles)
+    bm = benchmarkSuite.bmesh_from_arrays(positions, triangles)
+
+    legacy = {
+        'aspect_ratios': [benchmarkSuite.calculate_aspect_ratio(face) for face in bm.faces],
+        'skewness_values': [benchmarkSuite.calculate_skewness(benchmarkSuite.calculate_polygon_angles(bm, face))
+                            for face in bm.faces],
+        'size_ratios': [benchmarkSuite.calculate_size_ratio_for_polygon(bm, face) for face in bm.faces],
+        'shape_factors': [benchmarkSuite.calculate_shape_factor(face) for face in bm.faces],
+    }
+    for key, values in legacy.items():
+        np.testing.assert_allclose(metrics[key], values, rtol=1e-10, atol=1e-12, err_msg=key)
+
+
+def test_summary_matches_legacy_max_min_element(mesh):
+    positions, triangles = mesh
+    summary = meshQuality.summarize(meshQuality.evaluate_triangles(positions, triangles))
+    bm = benchmarkSuite.bmesh_from_arrays(positions, triangles)
+
+    max_face_index, min_face_index, max_area, min_area = benchmarkSuite.calculate_max_min_element(bm)
+    assert (summary['max_face_index'], summary['min_face_index']) == (max_face_index, min_face_index)
+    assert summary['max_area'] == pytest.approx(max_area, rel=1e-12)
+    assert summary['min_area'] == pytest.approx(min_area, rel=1e-12)
+
+
+def test_topology_counts_match_legacy_analyze_topology(mesh):
+    positions, triangles = mesh
+    # 어떤 면에도 쓰이지 않는 정점 하나를 추가
+    positions = np.vstack([positions, [5.0, 5.0, 5.0]])
+    loop_totals = np.full(len(triangles), 3)
+    edges, loop_edges = meshQuality.polygon_edges(np.asarray(triangles).ravel(), loop_totals)
+
+    counts = meshQuality.topology_counts(len(positions), edges, len(triangles), loop_edges)
+    legacy = benchmarkSuite.analyze_topology(
+        types.SimpleNamespace(data=benchmarkSuite.StandInMesh(positions, triangles)))
+    assert (counts['vertices_count'], counts['edges_count'], counts['faces_count'],
+            counts['non_manifold_edges'], counts['loose_verts']) == legacy
+
+
+def test_metric_statistics_excludes_non_finite_values():
+    values = np.array([4.0, 1.0, np.inf, 3.0, np.nan, 2.0])
+    stats = meshQuality.metric_statistics(values)
+
+    assert stats['count'] == 6 and stats['non_finite'] == 2
+    assert (stats['min'], stats['max'], stats['mean']) == (1.0, 4.0, 2.5)
+    assert stats['p50'] == pytest.approx(np.percentile([1.0, 2.0, 3.0, 4.0], 50))
+
+
+# 일부만 골라 정렬한 목록이 전체 정렬의 앞부분과 같은지 확인합니다. (nan은 가장 나쁜 값으로 취급)
+@pytest.mark.parametrize('higher_is_worse', [True, False])
+def test_worst_faces_matches_full_sort(higher_is_worse):
+    values = np.random.default_rng(1).normal(size=500).round(2)
+    values[[3, 70]] = np.nan
+    keys = np.nan_to_num(-values if higher_is_worse else values, nan=np.inf)
+    expected = np.lexsort((np.arange(len(values)), keys))
+
+    pages = [meshQuality.worst_faces(values, 40, offset, higher_is_worse) for offset in range(0, 120, 40)]
+    np.testing.assert_array_equal(np.concatenate(pages), expected[:120])
+
+
+# 변을 공유하는 이웃 면을 변마다 모든 쌍으로 직접 나열한 기준 목록
+def brute_force_neighbors(triangles):
+    faces_by_edge = {}
+    for face, triangle in enumerate(np.asarray(triangles).tolist()):
+        for a, b in zip(triangle, triangle[1:] + triangle[:1]):
+            faces_by_edge.setdefault((min(a, b), max(a, b)), []).append(face)
+
+    rows = [[] for _ in range(len(triangles))]
+    for faces in faces_by_edge.values():
+        for face in faces:
+            rows[face].extend(other for other in faces if other != face)
+    return [sorted(row) for row in rows]
+
+
+# 격자 한가운데 변에 면 두 개를 더 붙여서 세 면 이상이 한 변을 공유하게 만듭니다.
+def non_manifold_grid():
+    positions, triangles = benchmarkSuite.grid(9)
+    a, b = triangles[40, 0], triangles[40, 1]
+    positions = np.vstack([positions, [[0.0, 0.0, 1.0], [0.0, 0.0, -1.0]]])
+    fins = [[a, b, len(positions) - 2], [b, a, len(positions) - 1]]
+    return positions, np.vstack([triangles, fins])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 100000])
+def test_neighbor_builder_matches_brute_force(chunk_size):
+    _, triangles = non_manifold_grid()
+    builder = meshQuality.NeighborBuilder(triangles, chunk_size)
+    steps = 0
+    while not builder.step():
+        steps += 1
+    assert steps < builder.step_count
+
+    offsets, indices = builder.csr
+    rows = [sorted(indices[offsets[face]:offsets[face + 1]].tolist()) for face in range(len(triangles))]
+    assert rows == brute_force_neighbors(triangles)
+
+
+# 작은 덩어리로 나눠 계산한 결과가 한 번에 계산한 결과와 같은지 확인합니다. (modal 오퍼레이터 경로)
+def test_chunked_evaluation_matches_single_pass():
+    positions, triangles = non_manifold_grid()
+    single = meshQuality.evaluate_quality(positions, triangles)
+
+    task = meshQuality.EvaluationTask(positions, triangles, chunk_size=13)
+    progress = [task.progress]
+    while not task.step():
+        progress.append(task.progress)
+    assert progress == sorted(progress) and task.progress == 1.0
+
+    for key in single.metrics:
+        np.testing.assert_array_equal(task.evaluation.metrics[key], single.metrics[key], err_msg=key)
+    # 평균은 덩어리별 합계를 더하므로 더하는 순서만큼의 오차가 있습니다.
+    assert task.evaluation.summary() == pytest.approx(single.summary(), rel=1e-12)
+
+
+# ------------------기준 메쉬 비교-------------------------
+
+# [-1, 1] 정사각형 기준 평면과, 그보다 1.5배 넓고 높이 0.2만큼 떠 있는 평가 평면
+def offset_planes(height=0.2, scale=1.5):
+    reference_positions, triangles = benchmarkSuite.grid(9)
+    reference_positions[:, 2] = 0.0
+    positions = reference_positions * scale
+    positions[:, 2] = height
+    return positions, triangles, reference_positions, triangles
+
+
+# 기준 정사각형까지의 거리는 높이와 정사각형 밖으로 나간 만큼으로 바로 계산됩니다.
+def distance_to_square(points):
+    outside = np.maximum(np.abs(points[:, :2]) - 1.0, 0.0)
+    return np.sqrt(points[:, 2] ** 2 + (outside ** 2).sum(1))
+
+
+def test_compare_surfaces_matches_exact_distances():
+    positions, triangles, reference_positions, reference_triangles = offset_planes()
+    result = meshQuality.compare_surfaces(positions, triangles, reference_positions, reference_triangles)
+
+    expected = distance_to_square(positions)
+    np.testing.assert_allclose(result['vertex_error'], expected, atol=1e-12)
+    assert result['forward']['hausdorff'] == pytest.approx(expected.max(), abs=1e-12)
+    assert result['forward']['mean'] == pytest.approx(expected.mean(), abs=1e-12)
+    # 기준 정점은 모두 넓은 평면 바로 아래에 있습니다.
+    assert result['backward']['hausdorff'] == pytest.approx(0.2, abs=1e-12)
+    assert result['backward']['mean'] == pytest.approx(0.2, abs=1e-12)
+    assert result['hausdorff'] == pytest.approx(expected.max(), abs=1e-12)
+
+
+def test_compare_surfaces_counts_vertices_beyond_max_distance_as_missing():
+    positions, triangles, reference_positions, reference_triangles = offset_planes()
+    result = meshQuality.compare_surfaces(positions, triangles, reference_positions, reference_triangles,
+                                          max_distance=0.3)
+
+    expected = distance_to_square(positions)
+    assert np.isnan(result['vertex_error'][expected > 0.3]).all()
+    assert result['forward']['missing'] == int((expected > 0.3).sum()) > 0
+    assert result['forward']['count'] == int((expected <= 0.3).sum())
+    assert result['backward']['missing'] == 0
+    assert result['forward']['hausdorff'] == pytest.approx(expected[expected <= 0.3].max(), abs=1e-12)
@@ -0,0 +1,143 @@
+import os
+
+import numpy as np
+import pytest
+
+import benchmarkSuite
+import meshSubdivision
+
+
+# 닫힌 구와 경계가 있는 열린 격자
+@pytest.fixture(params=['sphere', 'grid'])
+def mesh(request):
+    if request.param == 'sphere':
+        return benchmarkSuite.icosphere(1)
+    return benchmarkSuite.grid(6)
+
+
+# (행, 열, 가중치)를 밀집 행렬로 펼칩니다. (같은 위치의 가중치는 더해집니다)
+def dense(stencil, shape):
+    rows, columns, weights = stencil
+    matrix = np.zeros(shape)
+    np.add.at(matrix, (rows, columns), weights)
+    return matrix
+
+
+# ------------------한 단계 세분화-------------------------
+
+@pytest.mark.parametrize('scheme', meshSubdivision.SUBDIVISION_SCHEMES)
+def test_subdivide_once_counts_and_row_sums(mesh, scheme):
+    positions, triangles = mesh
+    edge_count = len({tuple(sorted(edge)) for triangle in triangles.tolist()
+                      for edge in zip(triangle, triangle[1:] + triangle[:1])})
+
+    stencil, vertex_count, new_triangles = meshSubdivision.subdivide_once(triangles, len(positions), scheme)
+
+    assert vertex_count == len(positions) + edge_count
+    assert new_triangles.shape == (4 * len(triangles), 3)
+    assert set(np.unique(new_triangles)) == set(range(vertex_count))
+    # 모든 새 정점은 원래 정점의 가중 평균입니다.
+    np.testing.assert_allclose(dense(stencil, (vertex_count, len(positions))).sum(1), 1.0, atol=1e-14)
+
+
+def test_linear_scheme_reproduces_linear_fields(mesh):
+    positions, triangles = mesh
+    stencil = meshSubdivision.build_stencil(triangles, len(positions), 2, scheme='linear')
+    subdivided = stencil.apply(positions)
+
+    # 원래 정점과 변 중점의 선형 필드 값이 그대로 유지되어야 합니다.
+    field = np.array([[0.3, -1.2, 0.7]])
+    np.testing.assert_allclose(subdivided[:len(positions)], positions, atol=1e-14)
+    np.testing.assert_allclose(stencil.apply(positions + field) - subdivided, np.repeat(field, len(subdivided), 0),
+                               atol=1e-13)
+    a, b = stencil.triangles[:, 0], stencil.triangles[:, 1]
+    assert np.all(np.linalg.norm(subdivided[a] - subdivided[b], axis=1) > 0)
+
+
+def test_loop_scheme_keeps_flat_meshes_flat():
+    positions, triangles = benchmarkSuite.grid(6)
+    positions[:, 2] = 0.0
+    subdivided = meshSubdivision.build_stencil(triangles, len(positions), 2).apply(positions)
+
+    np.testing.assert_allclose(subdivided[:, 2], 0.0, atol=1e-15)
+    assert subdivided[:, :2].min() >= -1.0 - 1e-12 and subdivided[:, :2].max() <= 1.0 + 1e-12
+
+
+def test_subdivide_once_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        meshSubdivision.subdivide_once(np.array([[0, 1, 2]]), 3, scheme='catmull-clark')
+
+
+# ------------------여러 단계 stencil-------------------------
+
+def test_compose_matches_dense_product():
+    rng = np.random.default_rng(0)
+    first = (rng.integers(0, 6, 20), rng.integers(0, 4, 20), rng.normal(size=20))
+    second = (rng.integers(0, 5, 15), rng.integers(0, 6, 15), rng.normal(size=15))
+
+    product = meshSubdivision.compose(second, first, 4)
+    np.testing.assert_allclose(dense(product, (5, 4)), dense(second, (5, 6)) @ dense(first, (6, 4)), atol=1e-14)
+
+
+@pytest.mark.parametrize('scheme', meshSubdivision.SUBDIVISION_SCHEMES)
+def test_build_stencil_matches_repeated_single_steps(mesh, scheme):
+    positions, triangles = mesh
+    positions = positions + np.random.default_rng(1).normal(scale=1e-2, size=positions.shape)
+
+    stencil = meshSubdivision.build_stencil(triangles, len(positions), 2, scheme)
+    expected, expected_triangles = benchmarkSuite.subdivide_mesh(positions, triangles, 2, scheme)
+
+    assert stencil.vertex_count == len(expected)
+    np.testing.assert_array_equal(stencil.triangles, expected_triangles)
+    assert len(stencil.triangles) == 16 * len(triangles)
+    np.testing.assert_allclose(stencil.apply(positions), expected, atol=1e-13)
+    np.testing.assert_allclose(dense((stencil.rows, stencil.columns, stencil.weights),
+                                     (stencil.vertex_count, len(positions))).sum(1), 1.0, atol=1e-13)
+
+
+def test_apply_handles_frames_with_and_without_scipy(mesh):
+    positions, triangles = mesh
+    frames = positions[None] + np.random.default_rng(2).normal(scale=1e-2, size=(3,) + positions.shape)
+    stencil = meshSubdivision.build_stencil(triangles, len(positions), 1)
+
+    expected = np.stack([stencil.apply(frame) for frame in frames])
+    np.testing.assert_allclose(stencil.apply(frames), expected, atol=1e-14)
+
+    # numpy 경로 (scipy가 없는 환경)도 같은 결과를 내야 합니다.
+    stencil._matrix = None
+    np.testing.assert_allclose(stencil.apply(frames), expected, atol=1e-13)
+
+
+# ------------------캐시 부분-------------------------
+
+def test_disk_cache_round_trip(tmp_path, monkeypatch):
+    positions, triangles = benchmarkSuite.icosphere(1)
+    monkeypatch.setattr(meshSubdivision, '_stencils', {})
+    built = meshSubdivision.get_subdivision_stencil(triangles, len(positions), 2, cache_dir=str(tmp_path))
+
+    cache_path = meshSubdivision.get_stencil_cache_path(triangles, len(positions), 2, 'loop', str(tmp_path))
+    assert os.path.exists(cache_path)
+    assert meshSubdivision.get_subdivision_stencil(triangles, len(positions), 2, cache_dir=str(tmp_path)) is built
+
+    # 새 프로세스처럼 메모리 캐시를 비우면 디스크에서 같은 stencil을 읽어 와야 합니다.
+    monkeypatch.setattr(meshSubdivision, '_stencils', {})
+    loaded = meshSubdivision.get_subdivision_stencil(triangles, len(positions), 2, cache_dir=str(tmp_path))
+
+    assert loaded is not built
+    np.testing.assert_array_equal(loaded.rows, built.rows)
+    np.testing.assert_array_equal(loaded.columns, built.columns)
+    np.testing.assert_array_equal(loaded.weights, built.weights)
+    np.testing.assert_array_equal(loaded.triangles, built.triangles)
+    assert not loaded.triangles.flags.writeable
+
+
+def test_disk_cache_ignores_corrupt_files(tmp_path, monkeypatch):
+    positions, triangles = benchmarkSuite.icosphere(1)
+    monkeypatch.setattr(meshSubdivision, '_stencils', {})
+    cache_path = meshSubdivision.get_stencil_cache_path(triangles, len(positions), 1, 'loop', str(tmp_path))
+    with open(cache_path, 'wb') as file:
+        file.write(b'not a stencil')
+
+    stencil = meshSubdivision.get_subdivision_stencil(triangles, len(positions), 1, cache_dir=str(tmp_path))
+    expected = meshSubdivision.build_stencil(triangles, len(positions), 1)
+    np.testing.assert_array_equal(stencil.weights, expected.weights)